@@ -0,0 +1,259 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+# Local stand-in for the HybridAnalysis and RecordedFuture APIs used by the benchmarks.
+#
+#   HybridAnalysis:  POST /ha/quick-scan/url    GET /ha/quick-scan/{id}
+#   RecordedFuture:  POST /rf/samples           GET /rf/samples/{id}/summary
+#                    GET /rf/samples?limit=N&offset=CURSOR (sample list, newest first)
+#   Control:         GET /__stats               POST /__reset
+#
+# Every scan gets a completion time drawn from a per-engine lognormal distribution.
+# Latency, 429 and 5xx injection are configurable, and all durations are multiplied
+# by --time-scale so a benchmark can run hours of API time in seconds.
+
+import argparse
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+class MockScanState:
+  def __init__(self, latency: float, rate_limit_ratio: float, error_ratio: float,
+               completion: dict, time_scale: float, seed: int = None):
+    self.latency = latency
+    self.rate_limit_ratio = rate_limit_ratio
+    self.error_ratio = error_ratio
+    self.completion = completion
+    self.time_scale = time_scale
+    self.random = random.Random(seed)
+    self.lock = threading.Lock()
+    self.reset()
+
+  def reset(self) -> None:
+    with self.lock:
+      self.scans = {}
+      self.calls = {}
+      self.time_to_verdict = []
+
+  def count(self, endpoint: str) -> None:
+    with self.lock:
+      self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+  def inject_failure(self):
+    # Returns the status code to fail with, or None to serve the request normally
+    roll = self.random.random()
+    if roll < self.rate_limit_ratio:
+      return 429
+    if roll < self.rate_limit_ratio + self.error_ratio:
+      return 503
+    return None
+
+  def create_scan(self, engine: str) -> str:
+    median, sigma = self.completion[engine]
+    scan_id = uuid.uuid4().hex
+
+    with self.lock:
+      duration = self.random.lognormvariate(0, sigma) * median * self.time_scale
+      now = time.monotonic()
+      self.scans[scan_id] = {
+        "engine": engine, "submitted_at": now, "ready_at": now + duration, "reported": False,
+        # Wall-clock submission time as the real APIs report it
+        "submitted": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+      }
+
+    return scan_id
+
+  def check_scan(self, scan_id: str):
+    with self.lock:
+      scan = self.scans.get(scan_id)
+      if scan is None:
+        return None
+
+      finished = time.monotonic() >= scan["ready_at"]
+      if finished and not scan["reported"]:
+        scan["reported"] = True
+        self.time_to_verdict.append((time.monotonic() - scan["submitted_at"]) / self.time_scale)
+
+      return finished
+
+  def list_samples(self, engine: str, offset: int, limit: int) -> tuple:
+    """One page of an engine's scans, newest first, and the offset of the next page"""
+    now = time.monotonic()
+    with self.lock:
+      scans = [(scan_id, scan) for scan_id, scan in reversed(self.scans.items()) if scan["engine"] == engine]
+
+    page = [
+      {"id": scan_id, "status": "reported" if now >= scan["ready_at"] else "running", "submitted": scan["submitted"]}
+      for scan_id, scan in scans[offset:offset + limit]
+    ]
+    return page, (str(offset + limit) if offset + limit < len(scans) else None)
+
+  def stats(self) -> dict:
+    with self.lock:
+      return {
+        "calls": dict(self.calls),
+        "total_calls": sum(self.calls.values()),
+        "scans": len(self.scans),
+        # Reported in unscaled seconds so results compare across time scales
+        "time_to_verdict": list(self.time_to_verdict)
+      }
+
+class MockScanHandler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+  state: MockScanState = None
+
+  def setup(self):
+    super().setup()
+    # Headers and body are separate writes; without this Nagle adds ~40ms to every response
+    self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+  def log_message(self, *args):
+    pass
+
+  def do_POST(self):
+    self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    if self.path == "/__reset":
+      self.state.reset()
+      return self._send(200, {})
+
+    if self.path == "/ha/quick-scan/url":
+      return self._serve("ha_submit", lambda: self._submitted("HybridAnalysis", "finished"))
+    if self.path == "/rf/samples":
+      return self._serve("rf_submit", lambda: self._submitted("RecordedFuture", "completed"))
+
+    self._send(404, {"message": "Not found"})
+
+  def do_GET(self):
+    if self.path == "/__stats":
+      return self._send(200, self.state.stats())
+
+    match = re.fullmatch(r"/ha/quick-scan/(\w+)", self.path)
+    if match:
+      return self._serve("ha_status", lambda: self._hybrid_analysis_result(match.group(1)))
+
+    match = re.fullmatch(r"/rf/samples/(\w+)/summary", self.path)
+    if match:
+      return self._serve("rf_status", lambda: self._recorded_future_result(match.group(1)))
+
+    parts = urlsplit(self.path)
+    if parts.path == "/rf/samples":
+      query = parse_qs(parts.query)
+      return self._serve("rf_list", lambda: self._recorded_future_list(
+        int(query.get("offset", ["0"])[0]), int(query.get("limit", ["20"])[0])
+      ))
+
+    self._send(404, {"message": "Not found"})
+
+  def _serve(self, endpoint: str, build) -> None:
+    self.state.count(endpoint)
+
+    if self.state.latency:
+      time.sleep(self.state.random.expovariate(1 / self.state.latency) * self.state.time_scale)
+
+    failure = self.state.inject_failure()
+    if failure:
+      headers = {"Retry-After": f"{self.state.time_scale:.3f}"} if failure == 429 else {}
+      return self._send(failure, {"message": "Injected failure"}, headers)
+
+    status, body = build()
+    self._send(status, body)
+
+  def _submitted(self, engine: str, flag: str):
+    scan_id = self.state.create_scan(engine)
+    return 200, {"id": scan_id, flag: False, "submitted": self.state.scans[scan_id]["submitted"]}
+
+  def _hybrid_analysis_result(self, scan_id: str):
+    finished = self.state.check_scan(scan_id)
+    if finished is None:
+      return 404, {"message": "Unknown scan"}
+
+    body = {"id": scan_id, "finished": finished, "scanners_v2": {}}
+    if finished:
+      body["scanners_v2"] = {
+        "urlscan_io": {"status": "no-classification"},
+        "bfore_ai": {"status": "malicious" if hash(scan_id) % 10 == 0 else "no-classification"}
+      }
+    return 200, body
+
+  def _recorded_future_result(self, scan_id: str):
+    finished = self.state.check_scan(scan_id)
+    if finished is None:
+      return 404, {"message": "Unknown sample"}
+
+    body = {"sample": scan_id, "completed": finished, "tasks": {}}
+    if finished:
+      body["tasks"] = {
+        f"{scan_id}-static1": {"status": "reported", "score": 1},
+        f"{scan_id}-urlscan1": {"status": "reported", "score": hash(scan_id) % 10 + 1}
+      }
+    return 200, body
+
+  def _recorded_future_list(self, offset: int, limit: int):
+    page, next_offset = self.state.list_samples("RecordedFuture", offset, limit)
+    return 200, {"data": page, "next": next_offset}
+
+  def _send(self, status: int, body: dict, headers: dict = None) -> None:
+    payload = json.dumps(body).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(payload)))
+    for name, value in (headers or {}).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(payload)
+
+def create_server(host: str = "127.0.0.1", port: int = 0, **state_options) -> ThreadingHTTPServer:
+  handler = type("BoundMockScanHandler", (MockScanHandler,), {"state": MockScanState(**state_options)})
+  server = ThreadingHTTPServer((host, port), handler)
+  server.daemon_threads = True
+  return server
+
+def build_parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description="Mock HybridAnalysis/RecordedFuture API for benchmarks")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8787)
+  parser.add_argument("--latency", type=float, default=0.2, help="Mean response latency in seconds")
+  parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of requests answered with 429")
+  parser.add_argument("--error-ratio", type=float, default=0.0, help="Share of requests answered with 503")
+  parser.add_argument("--ha-completion", type=float, nargs=2, default=(20.0, 0.5), metavar=("MEDIAN", "SIGMA"))
+  parser.add_argument("--rf-completion", type=float, nargs=2, default=(180.0, 0.4), metavar=("MEDIAN", "SIGMA"))
+  parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier applied to every duration")
+  parser.add_argument("--seed", type=int)
+  return parser
+
+def state_options(args) -> dict:
+  return {
+    "latency": args.latency,
+    "rate_limit_ratio": args.rate_limit_ratio,
+    "error_ratio": args.error_ratio,
+    "completion": {"HybridAnalysis": tuple(args.ha_completion), "RecordedFuture": tuple(args.rf_completion)},
+    "time_scale": args.time_scale,
+    "seed": args.seed
+  }
+
+def main():
+  args = build_parser().parse_args()
+  server = create_server(args.host, args.port, **state_options(args))
+  print(f"Mock API listening on http://{args.host}:{server.server_port}", flush=True)
+
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,169 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+# Throughput benchmark for the -f pipeline against the local mock API.
+#
+#   $ python -m benchmarks.run_benchmark --sizes 1000 10000 --time-scale 0.01
+#
+# Each feed size runs in its own process (so peak RSS is per run) inside a temporary
+# directory. Poll delays, rate budgets and mock completion times are all multiplied by
+# --time-scale, and time-to-verdict is reported back in unscaled seconds.
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from benchmarks.mock_server import build_parser as mock_parser, create_server, state_options
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def percentile(values: list, ratio: float) -> float:
+  if not values:
+    return 0.0
+  ordered = sorted(values)
+  return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+def write_feed(path: Path, size: int) -> None:
+  with open(path, "w", encoding="utf-8") as file:
+    for index in range(size):
+      file.write(f"https://host{index % 997}.example.com/path/{index}?q={index}\n")
+
+def fetch_json(url: str, method: str = "GET") -> dict:
+  request = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+  with urllib.request.urlopen(request) as response:
+    return json.loads(response.read())
+
+def run_size(size: int, base_url: str, args) -> dict:
+  fetch_json(f"{base_url}/__reset", "POST")
+
+  with tempfile.TemporaryDirectory(prefix="aatt_bench_") as workdir:
+    feed = Path(workdir) / "feed.txt"
+    write_feed(feed, size)
+
+    command = [
+      sys.executable, "-m", "benchmarks.run_benchmark", "--worker",
+      "--feed", str(feed), "--base-url", base_url, "--time-scale", str(args.time_scale)
+    ]
+    if args.use_async:
+      command.append("--async")
+
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+      raise RuntimeError(f"Benchmark worker failed for {size} URLs:\n{completed.stderr}")
+
+    worker = json.loads(completed.stdout.strip().splitlines()[-1])
+
+  stats = fetch_json(f"{base_url}/__stats")
+  verdicts = stats["time_to_verdict"]
+
+  return {
+    "urls": size,
+    "elapsed_s": round(worker["elapsed"], 2),
+    "urls_per_s": round(size / worker["elapsed"], 1),
+    "api_calls_per_url": round(stats["total_calls"] / size, 2),
+    "p50_time_to_verdict_s": round(percentile(verdicts, 0.50), 1),
+    "p99_time_to_verdict_s": round(percentile(verdicts, 0.99), 1),
+    "peak_rss_mb": round(worker["peak_rss_kb"] / 1024, 1),
+    "calls": stats["calls"]
+  }
+
+def run_worker(args) -> None:
+  # Imported here so the parent process stays light and every run starts cold
+  import resource
+  from src.core.engines import registry
+  from src.core.logger import logger
+  from src.utils.async_url_file_processor import AsyncURLFileProcessor
+  from src.utils.url_file_processor import URLFileProcessor
+
+  logger.setLevel(logging.WARNING)
+  scale = args.time_scale
+  scanners = {}
+
+  # The mock serves each engine under its column prefix (/ha, /rf)
+  for engine in ("HybridAnalysis", "RecordedFuture"):
+    spec = registry.get(engine)
+    rate = spec.requests_per_second
+    scanners[engine] = spec.scanner_class()(
+      "benchmark",
+      f"{args.base_url}/{spec.column_prefix.rstrip('_')}",
+      rate / scale if rate else None,
+      spec.max_workers
+    )
+
+  base_class = AsyncURLFileProcessor if args.use_async else URLFileProcessor
+
+  class ScaledProcessor(base_class):
+    def _poll_delay(self, engine: str, attempt: int) -> float:
+      return super()._poll_delay(engine, attempt) * scale
+
+  started = time.perf_counter()
+  ScaledProcessor(scanners).process_file(args.feed)
+  elapsed = time.perf_counter() - started
+
+  peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if sys.platform == "darwin":
+    peak_rss //= 1024 # bytes on macOS, kilobytes on Linux
+
+  print(json.dumps({"elapsed": elapsed, "peak_rss_kb": peak_rss}))
+
+def print_report(results: list) -> None:
+  columns = ["urls", "elapsed_s", "urls_per_s", "api_calls_per_url",
+             "p50_time_to_verdict_s", "p99_time_to_verdict_s", "peak_rss_mb"]
+  widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+
+  print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+  for result in results:
+    print("  ".join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+
+def main():
+  parser = argparse.ArgumentParser(
+    description="Benchmark the -f pipeline against a local mock API",
+    parents=[mock_parser()],
+    conflict_handler="resolve"
+  )
+  parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+  parser.add_argument("--time-scale", type=float, default=0.01)
+  parser.add_argument("--port", type=int, default=0)
+  parser.add_argument("--async", dest="use_async", action="store_true", help="Benchmark the asyncio pipeline")
+  parser.add_argument("--output", type=str, help="Also write the results as JSON to this file")
+  parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+  parser.add_argument("--feed", type=str, help=argparse.SUPPRESS)
+  parser.add_argument("--base-url", type=str, help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.worker:
+    run_worker(args)
+    return
+
+  server = create_server(args.host, args.port, **state_options(args))
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  base_url = f"http://{args.host}:{server.server_port}"
+
+  try:
+    results = []
+    for size in args.sizes:
+      print(f"Running {size} URLs...", flush=True)
+      results.append(run_size(size, base_url, args))
+
+    print_report(results)
+
+    if args.output:
+      Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+  finally:
+    server.shutdown()
+    server.server_close()
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,59 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+# CLI startup time check for the calls other scripts make thousands of times.
+#
+#   $ python -m benchmarks.startup --runs 15
+#
+# Each command runs cold in a fresh interpreter inside a temporary directory. The -u
+# case uses an invalid URL so it stops right before the first network request.
+# Exits with status 1 when a median goes over its target.
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Median wall time in seconds, interpreter startup included
+TARGETS = {
+  "-l": (["-l"], 0.20),
+  "-u": (["-u", "not-a-url", "--engine", "HybridAnalysis"], 0.40)
+}
+
+def measure(command: list, runs: int, workdir: str) -> float:
+  timings = []
+  for _ in range(runs):
+    started = time.perf_counter()
+    subprocess.run(command, cwd=workdir, capture_output=True)
+    timings.append(time.perf_counter() - started)
+  return statistics.median(timings)
+
+def main():
+  parser = argparse.ArgumentParser(description="Measure CLI startup time against its targets")
+  parser.add_argument("--runs", type=int, default=15)
+  args = parser.parse_args()
+
+  failed = False
+  with tempfile.TemporaryDirectory(prefix="aatt_startup_") as workdir:
+    interpreter = measure([sys.executable, "-c", "pass"], args.runs, workdir)
+    print(f"{'python -c pass':<16}{interpreter * 1000:>8.0f} ms")
+
+    for name, (arguments, target) in TARGETS.items():
+      median = measure([sys.executable, str(ROOT / "main.py"), *arguments], args.runs, workdir)
+      status = "ok" if median <= target else "OVER TARGET"
+      failed = failed or median > target
+      print(f"{name:<16}{median * 1000:>8.0f} ms  (target {target * 1000:.0f} ms)  {status}")
+
+  sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+  main()
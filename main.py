@@ -8,42 +8,47 @@
 import argparse
 import sys
 from src.config.settings import settings
-from src.core.logger import logger
-from src.scanners.hybrid_analysis import HybridAnalysisScanner
-from src.scanners.recorded_future import RecordedFutureScanner
-from src.utils.file_handlers import ResultsFileHandler
-from src.utils.url_file_processor import URLFileProcessor
+from src.core.factories import LazyScanners
+from src.core.logger import configure_logging, get_logger, parse_levels
+from src.core.metrics import metrics, MetricsExporter
+
+# The cache, the batch processors and the profiler are imported where they are used so
+# -l, -u and -r calls only load what they need
+
+logger = get_logger("cli")
 
 class URLAnalyzer:
-  def __init__(self):
-    self.scanners = {}
-    self._initialize_scanners()
-    self.file_handler = ResultsFileHandler()
-
-  def _initialize_scanners(self):
-    for engine, config in settings.scanners_config.items():
-        if engine == 'HybridAnalysis':
-            self.scanners[engine] = HybridAnalysisScanner(
-                config['api_key_env'],
-                config['base_url']
-            )
-        elif engine == 'RecordedFuture':
-            self.scanners[engine] = RecordedFutureScanner(
-                config['api_key_env'],
-                config['base_url']
-            )
+  def __init__(self, rate_scale: float = 1.0):
+    # Scanners and their HTTP sessions are built on first use, one engine at a time
+    self.scanners = LazyScanners(rate_scale=rate_scale)
+    self.rate_scale = rate_scale
+    self._cache = None
+
+  @property
+  def cache(self):
+    if self._cache is None:
+      from src.core.cache import VerdictCache
+      self._cache = VerdictCache()
+    return self._cache
 
   def analyze_url(self, url: str, engine: str):
     try:
         if not engine or engine not in settings.AVAILABLE_ENGINES:
             raise ValueError("Engine not valid")
 
+        cached = self.cache.get(engine, url)
+        if cached and cached.submission:
+            logger.info("URL analysis served from cache: %s", url)
+            return cached.submission
+
         scanner = self.scanners[engine]
-        result = scanner.scan_url(url)
-        logger.info(f"URL analysis successfull: {url}")
+        with metrics.timer("submit", engine=engine):
+            result = scanner.scan_url(url)
+        self.cache.store_submission(engine, url, result)
+        logger.info("URL analysis successfull: %s", url)
         return result
     except Exception as e:
-        logger.error(f"Error analyzing URL {url}: {str(e)}")
+        logger.error("Error analyzing URL %s: %s", url, e)
         raise
 
   def retrieve_scan(self, scan_id: str, engine: str):
@@ -51,21 +56,39 @@ class URLAnalyzer:
       if not engine or engine not in settings.AVAILABLE_ENGINES:
         raise ValueError("Engine not valid")
 
+      cached = self.cache.get_result(engine, scan_id)
+      if cached is not None:
+        logger.info("URL scanning results served from cache: %s", scan_id)
+        return cached
+
       scanner = self.scanners[engine]
-      result = scanner.retrieve_scan_results(scan_id)
-      logger.info(f"URL scanning results:\n")
+      with metrics.timer("fetch", engine=engine):
+        result = scanner.retrieve_scan_results(scan_id)
+      if result.get('completed', result.get('finished', False)):
+        self.cache.store_result(engine, scan_id, result)
+      logger.info("URL scanning results:\n")
       return result
     except Exception as e:
-      logger.error(f"Error retrieving scan results {str(e)}")
+      logger.error("Error retrieving scan results %s", e)
       raise
 
-  def analyze_urls_from_file(self, file_path: str):
+  def analyze_urls_from_file(self, file_path: str, use_async: bool = False, grouper=None, output_format: str = None,
+                             resume: bool = False, url_filter=None):
+    from src.utils.url_file_processor import URLFileProcessor
+    from src.utils.async_url_file_processor import AsyncURLFileProcessor
+
     try:
-      processor = URLFileProcessor(self.scanners)
+      processor_class = AsyncURLFileProcessor if use_async else URLFileProcessor
+      processor = processor_class(
+        self.scanners, cache=self.cache, grouper=grouper, output_format=output_format, resume=resume, url_filter=url_filter
+      )
       processor.process_file(file_path)
-      logger.info(f"URLs file analysis completed: {file_path}")
+      logger.info("URLs file analysis completed: %s", file_path or processor.control_file)
+
+      for engine, scanner in self.scanners.items():
+        logger.info("%s connections: %s", engine, scanner.connection_stats())
     except Exception as e:
-      logger.error(f"Error while processing URLs file: {str(e)}")
+      logger.error("Error while processing URLs file: %s", e)
       raise
 
 def main():
@@ -77,6 +100,7 @@ def main():
   parser.add_argument('-u', '--url', type=str, help='Set a URL address to analyze')
   parser.add_argument('-r', '--retrieve-scan', type=str, help='Retrieve a previous URL scan')
   parser.add_argument('-l', '--list-engines', help='Prints a list with available analyzing engines', action='store_true')
+  parser.add_argument('--async', dest='use_async', help='Process the -f file with the asyncio backend (requires aiohttp)', action='store_true')
   parser.add_argument(
     "--engine",
     type=str,
@@ -84,22 +108,115 @@ def main():
     help='Available URLs analyzing engines'
   )
 
+  parser.add_argument('--resume', help='Finish an interrupted -f run from its control journal; with -f, URLs it never submitted are added', action='store_true')
+  parser.add_argument('--output-format', choices=('csv', 'jsonl', 'parquet'), help='Write -f results as CSV, JSON lines or date-partitioned Parquet (requires pyarrow)')
+  parser.add_argument('--group-policy', choices=('all', 'one', 'k'), help='Scan all URLs, one per group or --per-group K per group; the rest reuse their group\'s results')
+  parser.add_argument('--group-by', choices=('host', 'domain'), help='Group -f URLs by host or registrable domain')
+  parser.add_argument('--per-group', type=int, help='URLs scanned per group with --group-policy k')
+  parser.add_argument('--allow-list', type=str, help='File of hostname suffixes / CIDR blocks; only matching URLs are scanned')
+  parser.add_argument('--deny-list', type=str, help='File of hostname suffixes / CIDR blocks that are never scanned')
+  parser.add_argument('--benign-list', type=str, help='File of known-benign domains dropped before submission')
+  parser.add_argument('--compact-results', nargs='?', const='scan_results.csv', help='Merge the segments of a CSV results file into one file and exit (run it when no run is writing to it)')
+  parser.add_argument('--shards', type=int, help='Split the -f file by URL hash across this many worker processes')
+  parser.add_argument('--shard-index', type=int, nargs='+', help='With --shards, only run these shards (e.g. one per host on a shared filesystem)')
+
+  parser.add_argument('--lookup', type=str, help='Look up indexed results for a URL or a domain (with --engine to filter)')
+  parser.add_argument('--since', type=str, help='With --lookup, only results generated since this date (YYYY-MM-DD) or UNIX timestamp')
+  parser.add_argument('--limit', type=int, help='With --lookup, print at most this many results')
+  parser.add_argument('--export', type=str, help='With --lookup, write the matching results to this CSV file instead of printing them')
+  parser.add_argument('--index-csv', type=str, help='Add the rows of an existing scan_results.csv file to the results index')
+
+  parser.add_argument('--serve', help='Keep running and accept URLs over a local HTTP API', action='store_true')
+  parser.add_argument('--host', type=str, default=settings.SERVE_HOST, help='Address the --serve API listens on')
+  parser.add_argument('--port', type=int, default=settings.SERVE_PORT, help='Port the --serve API listens on')
+  parser.add_argument('--unix-socket', type=str, help='Serve the API on this Unix socket instead of TCP')
+
+  parser.add_argument('--log-format', choices=('text', 'json'), help='Log as text or as JSON lines')
+  parser.add_argument('--log-level', type=str, help='Log level, optionally per component (e.g. INFO or scanners=DEBUG,cache=WARNING)')
+
+  parser.add_argument('--metrics-file', type=str, help='Write scan metrics to this file (.prom for Prometheus text, JSON otherwise)')
+  parser.add_argument('--metrics-interval', type=float, default=settings.METRICS_INTERVAL, help='Seconds between metrics snapshots')
+  parser.add_argument('--profile', nargs='?', const=settings.PROFILE_REPORT, help='Profile the run with cProfile and tracemalloc and write a report')
+
   if len(sys.argv) == 1:
     parser.print_help()
     return
 
   args = parser.parse_args()
+  exporter = None
+
+  if args.log_format or args.log_level:
+    configure_logging(args.log_format, levels=parse_levels(args.log_level or ""))
+
+  if args.metrics_file:
+    exporter = MetricsExporter(metrics, args.metrics_file, args.metrics_interval)
+    exporter.start()
+
+  try:
+    if args.profile:
+      from src.core.profiling import profile_run
+      profile_run(lambda: run(args), args.profile)
+    else:
+      run(args)
+  finally:
+    if exporter:
+      exporter.stop()
+
+def run(args):
+  if args.compact_results:
+    import os
+    from src.utils.file_handlers import ResultsFileHandler
+    if not os.path.exists(args.compact_results):
+      print(f"Error: {args.compact_results} does not exist")
+      return
+    from src.utils.url_file_processor import URLFileProcessor
+    folded = ResultsFileHandler(args.compact_results, URLFileProcessor.column_order).compact()
+    print(f"{folded} segments compacted into {args.compact_results}" if folded else f"{args.compact_results} has a single segment")
+    return
+
+  if args.list_engines:
+    print("Available engines:")
+    for engine in settings.AVAILABLE_ENGINES:
+      print(f"  - {engine}")
+
+  if args.index_csv or args.lookup:
+    lookup(args)
+
+  grouper = None
+  if args.file and (args.group_policy or args.group_by or args.per_group):
+    from src.utils.url_grouper import URLGrouper
+    grouper = URLGrouper(args.group_policy or ("k" if args.per_group else "one"), args.per_group, args.group_by)
+
+  url_filter = None
+  if args.file or args.resume or args.serve:
+    from src.utils.url_filter import URLFilter
+    url_filter = URLFilter(args.allow_list, args.deny_list, args.benign_list)
+
+  if args.file and args.shards:
+    from src.utils.sharded_runner import ShardedBatchRunner
+    runner = ShardedBatchRunner(
+      URLAnalyzer, args.shards, use_async=args.use_async, grouper=grouper, output_format=args.output_format,
+      url_filter=url_filter, metrics_interval=args.metrics_interval if args.metrics_file else None
+    )
+    runner.run(args.file, args.shard_index)
+    # Every shard resumes from its own journal
+    args.file = args.resume = None
+
   analyzer = URLAnalyzer()
 
-  if args.file:
-    analyzer.analyze_urls_from_file(args.file)
+  if args.file or args.resume:
+    analyzer.analyze_urls_from_file(args.file, args.use_async, grouper, args.output_format, args.resume, url_filter)
+
+  if args.serve:
+    from src.utils.scan_api import serve
+    serve(analyzer.scanners, analyzer.cache, args.host, args.port, args.unix_socket, url_filter)
 
   if args.url:
     try:
       result = analyzer.analyze_url(args.url, args.engine)
       print(f"Analysis result:\n{result}")
     except Exception as e:
-      logger.error(f"Error en la ejecución: {str(e)}")
+      logger.error("Error en la ejecución: %s", e)
       print(f"Error: {str(e)}")
 
   if args.retrieve_scan:
@@ -107,8 +224,40 @@ def main():
       result = analyzer.retrieve_scan(args.retrieve_scan, args.engine)
       print(f"Analysis result:\n{result}")
     except Exception as e:
-      logger.error(f"Error en la ejecución: {str(e)}")
+      logger.error("Error en la ejecución: %s", e)
       print(f"Error: {str(e)}")
 
+def lookup(args):
+  import json
+  from datetime import datetime
+  from src.utils.result_index import ResultIndex
+
+  index = ResultIndex()
+
+  try:
+    if args.index_csv:
+      index.import_csv(args.index_csv)
+
+    if not args.lookup:
+      return
+
+    since = None
+    if args.since:
+      since = int(args.since) if args.since.isdigit() else int(settings.TIMEZONE.localize(datetime.fromisoformat(args.since)).timestamp())
+
+    # Anything with a scheme is a URL, everything else a domain (subdomains included)
+    target = "url" if "://" in args.lookup else "domain"
+    query = {target: args.lookup, "engine": args.engine, "since": since}
+
+    if args.export:
+      count = index.export_csv(args.export, **query)
+      print(f"{count} results exported to {args.export}")
+      return
+
+    for result in index.lookup(limit=args.limit, **query):
+      print(json.dumps(result))
+  finally:
+    index.close()
+
 if __name__ == "__main__":
   main()
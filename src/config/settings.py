@@ -6,7 +6,7 @@
 # =========================================
 
 import os
-from typing import Dict
+from typing import Tuple
 from dataclasses import dataclass
 from pytz import timezone
 from dotenv import load_dotenv
@@ -16,30 +16,54 @@ load_dotenv()
 @dataclass(frozen=True)
 class Settings:
   TIMEZONE: timezone = timezone("America/Mexico_City")
-  REQUEST_TIMEOUT: int = 30
+  REQUEST_TIMEOUT: int = 30 # read timeout
+  CONNECT_TIMEOUT: int = 5
+  KEEPALIVE_TIMEOUT: int = 30 # idle seconds before the async pool closes a connection
   MAX_RETRIES: int = 3
+  RETRY_BACKOFF_BASE: float = 1.0 #seconds
+  RETRY_BACKOFF_MAX: float = 60.0 #seconds
   CACHE_TTL: int = 3600 #seconds
-  AVAILABLE_ENGINES = ("RecordedFuture", "HybridAnalysis")
+  CACHE_FILE: str = ".aatt_cache.sqlite"
+  CACHE_MAX_ENTRIES: int = 100000
+  DEDUP_EXACT_LIMIT: int = 2000000 # unique URLs tracked exactly before switching to a Bloom filter
+  DEDUP_BLOOM_CAPACITY: int = 20000000
+  DEDUP_BLOOM_ERROR_RATE: float = 0.001
+  GROUPING_POLICY: str = "all" # all, one or k URLs scanned per group
+  GROUPING_PER_GROUP: int = 3 # URLs scanned per group with the "k" policy
+  GROUPING_KEY: str = "host" # host or domain (registrable domain)
+  URL_ALLOW_FILE: str = os.getenv("AATT_URL_ALLOW_FILE") # hostname suffixes / CIDR blocks, one per line; only these are scanned
+  URL_DENY_FILE: str = os.getenv("AATT_URL_DENY_FILE") # never scanned
+  URL_BENIGN_FILE: str = os.getenv("AATT_URL_BENIGN_FILE") # known-benign domains, dropped before submission
+  REJECTED_URLS_FILE: str = "rejected_urls.csv" # URLs dropped before submission and why
+  RESULT_INDEX_FILE: str = "scan_results.sqlite" # every result ever written, for --lookup
+  OUTPUT_FORMAT: str = os.getenv("AATT_OUTPUT_FORMAT", "csv") # csv, jsonl or parquet
+  PARQUET_FLUSH_ROWS: int = int(os.getenv("AATT_PARQUET_FLUSH_ROWS", "2000")) # rows buffered before Parquet part files are written
+  SUBMIT_WORKERS: int = 4 # default per engine when its EngineSpec sets no max_workers
+  MAX_OUTSTANDING_SCANS: int = 10000 # submitted scans per engine awaiting a verdict before more input is read
+  ASYNC_MAX_IN_FLIGHT: int = 5000 # (engine, URL) scans alive at once in the asyncio pipeline
+  ASYNC_CONNECTION_LIMIT: int = 200
+  ASYNC_CONNECTION_LIMIT_PER_HOST: int = 100
+  METRICS_INTERVAL: float = 15.0 #seconds
+  PROFILE_REPORT: str = "profile_report.txt"
+  SHARDS_DIR: str = ".aatt_shards" # per-shard journals and results for --shards runs
+  SERVE_HOST: str = "127.0.0.1"
+  SERVE_PORT: int = 8765
+  SERVE_BATCH_SIZE: int = 100 # URLs gathered before a --serve batch is submitted
+  SERVE_BATCH_INTERVAL: float = 1.0 # seconds a partial batch waits for more URLs
+  SERVE_MAX_REQUEST_URLS: int = 10000
+  SERVE_ERRORS_LIMIT: int = 10000 # recent submission errors kept for verdict lookups
+  LOG_FORMAT: str = os.getenv("AATT_LOG_FORMAT", "text") # text or json (one JSON object per line)
+  LOG_LEVEL: str = os.getenv("AATT_LOG_LEVEL", "INFO")
+  LOG_LEVELS: str = os.getenv("AATT_LOG_LEVELS", "") # per component, e.g. "scanners=DEBUG,cache=WARNING"
+  LOG_BATCH_SIZE: int = 256 # records written per handler call by the logging thread
+  STATUS_PAGE_SIZE: int = 200 # samples per page when an engine's list endpoint is used for batched status checks
+  STATUS_MAX_PAGES: int = 50 # pages listed per batch before the remaining scans are checked one by one
+  POLL_PROFILE = {"initial_delay": 60, "interval": 60, "backoff": 1.0, "max_interval": 60, "max_attempts": 100} # defaults for an engine's poll_profile; scans without a verdict after max_attempts status checks fail
 
   @property
-  def scanners_config(self) -> Dict[str, Dict]:
-    return {
-      "HybridAnalysis": {
-        "api_key_env": os.getenv("HYBRID_ANALYSIS_API_KEY"),
-        "base_url": "https://hybrid-analysis.com/api/v2"
-      },
-      "RecordedFuture": {
-        "api_key_env": os.getenv("RECORDED_FUTURE_BEARER_TOKEN"),
-        "base_url": "https://sandbox.recordedfuture.com/api/v0"
-      }
-    }
-
-  def get_scanner_config(self, scanner_name: str) -> dict:
-    config = self.scanners_config.get(scanner_name)
-
-    if not config:
-      raise ValueError(f"Config not found for {scanner_name}")
-
-    return config
+  def AVAILABLE_ENGINES(self) -> Tuple[str, ...]:
+    # Engines, their limits and polling profiles are declared in src/core/engines.py and by plugins
+    from src.core.engines import registry
+    return registry.names()
 
 settings = Settings()
@@ -0,0 +1,40 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+from src.config.settings import settings
+from src.core.exceptions import ConfigurationError
+
+try:
+  import aiohttp
+except ImportError:
+  aiohttp = None
+
+class AsyncHTTPClient:
+  """Connection-pooled aiohttp session shared by every scanner in an asyncio run"""
+
+  def __init__(self, limit: int = None, limit_per_host: int = None):
+    if aiohttp is None:
+      raise ConfigurationError("The async backend requires aiohttp (pip install aiohttp)")
+
+    self.limit = limit or settings.ASYNC_CONNECTION_LIMIT
+    self.limit_per_host = limit_per_host or settings.ASYNC_CONNECTION_LIMIT_PER_HOST
+    self.session = None
+
+  async def __aenter__(self):
+    self.session = aiohttp.ClientSession(
+      connector=aiohttp.TCPConnector(
+        limit=self.limit,
+        limit_per_host=self.limit_per_host,
+        keepalive_timeout=settings.KEEPALIVE_TIMEOUT
+      ),
+      timeout=aiohttp.ClientTimeout(connect=settings.CONNECT_TIMEOUT, sock_read=settings.REQUEST_TIMEOUT),
+      auto_decompress=True
+    )
+    return self
+
+  async def __aexit__(self, *exc):
+    await self.session.close()
@@ -0,0 +1,137 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from src.config.settings import settings
+from src.core.logger import get_logger
+from src.core.metrics import metrics
+from src.utils.url_normalizer import normalize_url
+
+logger = get_logger("cache")
+
+@dataclass
+class CacheEntry:
+  engine: str
+  url: str
+  scan_id: Optional[str]
+  submission: Optional[dict]
+  result: Optional[dict]
+  updated_at: float
+
+  @property
+  def completed(self) -> bool:
+    return self.result is not None
+
+class VerdictCache:
+  """On-disk cache of submissions and verdicts keyed by (engine, normalized URL)"""
+
+  def __init__(self, path: str = None, ttl: int = None, max_entries: int = None):
+    self.path = Path(path or settings.CACHE_FILE)
+    self.ttl = settings.CACHE_TTL if ttl is None else ttl
+    self.max_entries = settings.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    self._lock = threading.Lock()
+    self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+    self._connection.execute("PRAGMA journal_mode=WAL")
+    self._connection.executescript("""
+      CREATE TABLE IF NOT EXISTS verdicts (
+        engine TEXT NOT NULL,
+        url TEXT NOT NULL,
+        scan_id TEXT,
+        submission TEXT,
+        result TEXT,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (engine, url)
+      );
+      CREATE INDEX IF NOT EXISTS verdicts_scan_id ON verdicts (engine, scan_id);
+      CREATE INDEX IF NOT EXISTS verdicts_updated_at ON verdicts (updated_at);
+    """)
+    self.evict()
+
+  def get(self, engine: str, url: str) -> Optional[CacheEntry]:
+    with self._lock:
+      row = self._connection.execute(
+        "SELECT engine, url, scan_id, submission, result, updated_at FROM verdicts WHERE engine = ? AND url = ? AND updated_at >= ?",
+        (engine, normalize_url(url), self._oldest_valid())
+      ).fetchone()
+
+    metrics.inc("aatt_cache_requests_total", engine=engine, kind="submission", result="hit" if row else "miss")
+    return self._to_entry(row)
+
+  def get_result(self, engine: str, scan_id: str) -> Optional[dict]:
+    with self._lock:
+      row = self._connection.execute(
+        "SELECT result FROM verdicts WHERE engine = ? AND scan_id = ? AND result IS NOT NULL AND updated_at >= ?",
+        (engine, scan_id, self._oldest_valid())
+      ).fetchone()
+
+    metrics.inc("aatt_cache_requests_total", engine=engine, kind="result", result="hit" if row else "miss")
+    return json.loads(row[0]) if row else None
+
+  def store_submission(self, engine: str, url: str, submission: dict) -> None:
+    self._write(
+      """INSERT INTO verdicts (engine, url, scan_id, submission, result, updated_at) VALUES (?, ?, ?, ?, NULL, ?)
+         ON CONFLICT (engine, url) DO UPDATE SET
+           scan_id = excluded.scan_id, submission = excluded.submission, result = NULL, updated_at = excluded.updated_at""",
+      (engine, normalize_url(url), submission.get("id"), json.dumps(submission), time.time())
+    )
+
+  def store_result(self, engine: str, scan_id: str, result: dict) -> None:
+    # Results are attached to the submission that produced them; unknown scan ids are ignored
+    self._write(
+      "UPDATE verdicts SET result = ? WHERE engine = ? AND scan_id = ?",
+      (json.dumps(result), engine, scan_id)
+    )
+
+  def evict(self) -> None:
+    with self._lock, self._connection:
+      expired = self._connection.execute(
+        "DELETE FROM verdicts WHERE updated_at < ?", (self._oldest_valid(),)
+      ).rowcount
+      overflow = self._connection.execute(
+        """DELETE FROM verdicts WHERE rowid IN (
+             SELECT rowid FROM verdicts ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+           )""",
+        (self.max_entries,)
+      ).rowcount
+
+    if expired or overflow:
+      logger.info("Cache eviction removed %s expired and %s overflow entries", expired, overflow)
+
+  def close(self) -> None:
+    with self._lock:
+      self._connection.close()
+
+  def _write(self, statement: str, parameters: tuple) -> None:
+    # The cache only saves requests, so a write that fails must never fail the scan it describes
+    try:
+      with self._lock, self._connection:
+        self._connection.execute(statement, parameters)
+    except sqlite3.Error as e:
+      logger.warning("Could not update the verdict cache: %s", e)
+
+  def _oldest_valid(self) -> float:
+    return time.time() - self.ttl
+
+  def _to_entry(self, row) -> Optional[CacheEntry]:
+    if not row:
+      return None
+
+    engine, url, scan_id, submission, result, updated_at = row
+    return CacheEntry(
+      engine=engine,
+      url=url,
+      scan_id=scan_id,
+      submission=json.loads(submission) if submission else None,
+      result=json.loads(result) if result else None,
+      updated_at=updated_at
+    )
@@ -0,0 +1,145 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import os
+from dataclasses import dataclass, field
+from importlib import import_module
+from typing import Dict, List, Optional, Tuple
+from src.core.exceptions import ConfigurationError
+from src.core.logger import get_logger
+
+logger = get_logger("engines")
+
+# Installed packages add engines by exposing an EngineSpec under this entry point group, e.g.
+#   [project.entry-points."aatt.engines"]
+#   urlscan = "aatt_urlscan:ENGINE"
+ENTRY_POINT_GROUP = "aatt.engines"
+
+@dataclass(frozen=True)
+class EngineSpec:
+  """Everything the pipeline needs to run an engine: how to build it, its limits and how to read its results
+
+  scanner and extractor are import paths ("module:attribute") so an engine's module, and
+  requests with it, is only loaded once the engine is used. The extractor turns a finished
+  scan payload into result columns, all of them starting with column_prefix.
+  """
+  name: str
+  scanner: str
+  extractor: str
+  column_prefix: str
+  api_key_env: str = None
+  base_url: str = None
+  base_url_env: str = None
+  max_workers: int = None # settings.SUBMIT_WORKERS when not set
+  max_outstanding: int = None # settings.MAX_OUTSTANDING_SCANS when not set
+  requests_per_second: float = None
+  poll_profile: Dict = field(default_factory=dict)
+
+  @property
+  def api_key(self) -> Optional[str]:
+    return os.getenv(self.api_key_env) if self.api_key_env else None
+
+  @property
+  def resolved_base_url(self) -> Optional[str]:
+    return os.getenv(self.base_url_env, self.base_url) if self.base_url_env else self.base_url
+
+  def scanner_class(self) -> type:
+    return _load(self.scanner)
+
+  def extract(self, result: Dict, scan_id: str = None) -> Dict:
+    return _load(self.extractor)(result, scan_id)
+
+def _load(path: str):
+  module, _, name = path.partition(":")
+  return getattr(import_module(module), name)
+
+BUILTIN_ENGINES = (
+  EngineSpec(
+    name="HybridAnalysis",
+    scanner="src.scanners.hybrid_analysis:HybridAnalysisScanner",
+    extractor="src.scanners.hybrid_analysis:extract_columns",
+    column_prefix="ha_",
+    api_key_env="HYBRID_ANALYSIS_API_KEY",
+    base_url="https://hybrid-analysis.com/api/v2",
+    base_url_env="HYBRID_ANALYSIS_BASE_URL",
+    max_workers=8,
+    requests_per_second=5,
+    # Quick scans usually finish within seconds
+    poll_profile={"initial_delay": 15, "interval": 10, "backoff": 1.5, "max_interval": 120}
+  ),
+  EngineSpec(
+    name="RecordedFuture",
+    scanner="src.scanners.recorded_future:RecordedFutureScanner",
+    extractor="src.scanners.recorded_future:extract_columns",
+    column_prefix="rf_",
+    api_key_env="RECORDED_FUTURE_BEARER_TOKEN",
+    base_url="https://sandbox.recordedfuture.com/api/v0",
+    base_url_env="RECORDED_FUTURE_BASE_URL",
+    max_workers=8,
+    requests_per_second=5,
+    # Sandbox detonations take a few minutes
+    poll_profile={"initial_delay": 120, "interval": 30, "backoff": 1.5, "max_interval": 300}
+  )
+)
+
+class EngineRegistry:
+  """Built-in engines plus the ones installed packages register under ENTRY_POINT_GROUP"""
+
+  def __init__(self, builtins=BUILTIN_ENGINES, entry_point_group: str = ENTRY_POINT_GROUP):
+    self._builtins = builtins
+    self._group = entry_point_group
+    self._engines = None
+
+  @property
+  def engines(self) -> Dict[str, EngineSpec]:
+    # Entry points are only scanned the first time an engine is looked up
+    if self._engines is None:
+      engines = {spec.name: spec for spec in self._builtins}
+      for spec in self._plugins():
+        if spec.name in engines:
+          logger.warning("Engine plugin %s ignored, an engine with that name is already registered", spec.name)
+          continue
+        engines[spec.name] = spec
+      self._engines = engines
+    return self._engines
+
+  def get(self, name: str) -> EngineSpec:
+    spec = self.engines.get(name)
+    if spec is None:
+      raise ConfigurationError(f"Scanner {name} is not supported")
+    return spec
+
+  def names(self) -> Tuple[str, ...]:
+    return tuple(self.engines)
+
+  def column_prefixes(self) -> List[Tuple[str, str]]:
+    """(column prefix, engine) pairs in registration order"""
+    return [(spec.column_prefix, spec.name) for spec in self.engines.values()]
+
+  def _plugins(self) -> List[EngineSpec]:
+    from importlib.metadata import entry_points
+
+    found = entry_points()
+    # entry_points() returns a dict of groups before Python 3.10
+    group = found.select(group=self._group) if hasattr(found, "select") else found.get(self._group, ())
+    plugins = []
+
+    for entry_point in group:
+      try:
+        spec = entry_point.load()
+      except Exception as e:
+        logger.error("Engine plugin %s could not be loaded: %s", entry_point.name, e)
+        continue
+
+      if not isinstance(spec, EngineSpec):
+        logger.error("Engine plugin %s does not point to an EngineSpec", entry_point.name)
+        continue
+      plugins.append(spec)
+
+    return plugins
+
+registry = EngineRegistry()
@@ -5,24 +5,44 @@
 # GNU GPL3 License
 # =========================================
 
-from src.scanners.hybrid_analysis import HybridAnalysisScanner
-from src.scanners.recorded_future import RecordedFutureScanner
-from src.scanners.base_scanner import URLScanner
-from src.core.exceptions import ConfigurationError
+from collections.abc import Mapping
+from src.core.engines import registry
 
 class ScannerFactory:
-  _engines = {
-    "HybridAnalysis": HybridAnalysisScanner,
-    "RecordedFuture": RecordedFutureScanner
-  }
+  # Engines come from the registry, which references scanner classes by import path so
+  # requests and the engine modules are only loaded when an engine is actually built
 
   @classmethod
-  def create_scanner(cls, engine: str) -> URLScanner:
-    if engine not in cls._engines:
-      raise ConfigurationError(f"Scanner {engine} is not supported")
+  def create_scanner(cls, engine: str, rate_scale: float = 1.0):
+    spec = registry.get(engine)
+    # Sharded runs split each engine's request budget between the worker processes
+    rate = spec.requests_per_second * rate_scale if spec.requests_per_second else None
 
-    return cls._engines[engine]()
+    return spec.scanner_class()(spec.api_key, spec.resolved_base_url, rate, spec.max_workers)
 
   @classmethod
   def list_engines(cls):
-    return list(cls.__engines.keys())
+    return list(registry.names())
+
+class LazyScanners(Mapping):
+  """Engine name -> scanner mapping that builds each scanner on first access"""
+
+  def __init__(self, engines=None, rate_scale: float = 1.0):
+    self.engines = list(engines or ScannerFactory.list_engines())
+    self.rate_scale = rate_scale
+    self._scanners = {}
+
+  def __getitem__(self, engine: str):
+    if engine not in self.engines:
+      raise KeyError(engine)
+
+    scanner = self._scanners.get(engine)
+    if scanner is None:
+      scanner = self._scanners[engine] = ScannerFactory.create_scanner(engine, self.rate_scale)
+    return scanner
+
+  def __iter__(self):
+    return iter(self.engines)
+
+  def __len__(self) -> int:
+    return len(self.engines)
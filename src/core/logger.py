@@ -5,29 +5,157 @@
 # GNU GPL3 License
 # =========================================
 
+import atexit
+import json
 import logging
+import os
+import queue
+from datetime import datetime, timezone
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List
+from src.config.settings import settings
+
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)d] - %(message)s"
+
+class JsonLinesFormatter(logging.Formatter):
+  """One JSON object per record, for log shippers"""
+
+  def format(self, record: logging.LogRecord) -> str:
+    entry = {
+      "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+      "level": record.levelname,
+      "logger": record.name,
+      "line": record.lineno,
+      "thread": record.threadName,
+      "message": record.getMessage()
+    }
+    if record.exc_info:
+      entry["exception"] = self.formatException(record.exc_info)
+    return json.dumps(entry, ensure_ascii=False)
+
+class DeferredQueueHandler(QueueHandler):
+  # The queue never leaves the process, so records are enqueued as they are and
+  # message formatting happens on the listener thread instead of the caller's
+  def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+    return record
+
+class BatchingQueueListener(QueueListener):
+  """Drains up to batch_size queued records at a time and writes them with one call per handler"""
+
+  def __init__(self, log_queue, *handlers, batch_size: int = 256):
+    super().__init__(log_queue, *handlers, respect_handler_level=True)
+    self.batch_size = batch_size
+
+  def _monitor(self):
+    while True:
+      batch = [self.dequeue(True)]
+      while len(batch) < self.batch_size:
+        try:
+          batch.append(self.queue.get_nowait())
+        except queue.Empty:
+          break
+
+      stop = self._sentinel in batch
+      self.handle_batch([record for record in batch if record is not self._sentinel])
+      if stop:
+        break
+
+  def handle_batch(self, records: List[logging.LogRecord]) -> None:
+    if not records:
+      return
+
+    for handler in self.handlers:
+      accepted = [record for record in records if record.levelno >= handler.level and handler.filter(record)]
+      if not accepted:
+        continue
+
+      if not isinstance(handler, logging.StreamHandler):
+        for record in accepted:
+          handler.handle(record)
+        continue
+
+      with handler.lock:
+        try:
+          text = "".join(handler.format(record) + handler.terminator for record in accepted)
+          if handler.stream is None:
+            # File handlers are opened on the first write, so runs that log nothing leave no logs/ dir
+            Path(handler.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+            handler.stream = handler._open()
+          if isinstance(handler, RotatingFileHandler) and handler.shouldRollover(accepted[0]):
+            handler.doRollover()
+          handler.stream.write(text)
+          handler.flush()
+        except Exception:
+          handler.handleError(accepted[0])
+
+def get_logger(component: str = None) -> logging.Logger:
+  """Logger for a component (aatt.<component>), so its level can be set on its own"""
+  return logging.getLogger(f"aatt.{component}" if component else "aatt")
+
+def configure_logging(log_format: str = None, level: str = None, levels: dict = None) -> None:
+  """Switches between text and JSON-lines output and sets the global and per-component levels"""
+  if log_format:
+    formatter = JsonLinesFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    for handler in _listener.handlers:
+      handler.setFormatter(formatter)
+
+  if level:
+    logger.setLevel(level.upper())
+
+  for component, component_level in (levels or {}).items():
+    get_logger(component).setLevel(component_level.upper())
+
+def parse_levels(spec: str) -> dict:
+  # "INFO,scanners=DEBUG" -> {"": "INFO", "scanners": "DEBUG"}; "" is the whole tool
+  levels = {}
+  for item in filter(None, (part.strip() for part in spec.split(","))):
+    component, separator, level = item.partition("=")
+    if not separator:
+      component, level = "", component
+    levels[component.strip()] = level.strip()
+  return levels
+
+def shutdown_logging() -> None:
+  """Writes every queued record and stops the listener thread"""
+  if _listener._thread is not None:
+    _listener.stop()
 
 def setup_loggin():
+  global _queue, _listener
+
   logger = logging.getLogger("aatt")
   logger.setLevel(logging.INFO)
 
-  formatter = logging.Formatter("[%(asctime)s] %(levelname)s [%(name)s:%(lineno)d] - %(message)s")
-
   # Console handler
   console = logging.StreamHandler()
-  console.setFormatter(formatter)
-  logger.addHandler(console)
 
   # File handler
-  log_dir = Path("logs")
-  log_dir.mkdir(exist_ok=True)
+  file_handler = RotatingFileHandler(Path("logs")/"aatt.log", maxBytes=10*1024*1024, backupCount=3, delay=True)
+
+  # Callers only pay for a queue put; the listener thread formats and writes in batches
+  _queue = queue.SimpleQueue()
+  _listener = BatchingQueueListener(_queue, console, file_handler, batch_size=settings.LOG_BATCH_SIZE)
+  logger.addHandler(DeferredQueueHandler(_queue))
+  logger.propagate = False
 
-  file_handler = RotatingFileHandler(log_dir/"aatt.log", maxBytes=10*1024*1024, backupCount=3)
-  file_handler.setFormatter(formatter)
-  logger.addHandler(file_handler)
+  _listener.start()
+  atexit.register(shutdown_logging)
+  os.register_at_fork(after_in_child=_restart_in_child)
 
   return logger
 
+def _restart_in_child() -> None:
+  # Threads do not survive fork, so a forked worker needs its own queue and listener
+  global _queue, _listener
+
+  _queue = queue.SimpleQueue()
+  for handler in logger.handlers:
+    if isinstance(handler, DeferredQueueHandler):
+      handler.queue = _queue
+
+  _listener = BatchingQueueListener(_queue, *_listener.handlers, batch_size=_listener.batch_size)
+  _listener.start()
+
 logger = setup_loggin()
+configure_logging(settings.LOG_FORMAT, settings.LOG_LEVEL, parse_levels(settings.LOG_LEVELS))
@@ -0,0 +1,230 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+class Histogram:
+  def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, value: float) -> None:
+    self.counts[bisect.bisect_left(self.buckets, value)] += 1
+    self.sum += value
+    self.count += 1
+
+  def quantile(self, ratio: float) -> float:
+    # Upper bound of the bucket holding the quantile, good enough for dashboards
+    if not self.count:
+      return 0.0
+
+    target = ratio * self.count
+    seen = 0
+    for index, count in enumerate(self.counts):
+      seen += count
+      if seen >= target:
+        return self.buckets[index] if index < len(self.buckets) else float("inf")
+    return float("inf")
+
+class Metrics:
+  """Process-wide counters, gauges and latency histograms, exported as JSON or Prometheus text"""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._counters: Dict[Tuple, float] = {}
+    self._gauges: Dict[Tuple, float] = {}
+    self._histograms: Dict[Tuple, Histogram] = {}
+    # Metrics of other processes (e.g. shards) by source, added up with this process' own
+    self._sources: Dict[str, dict] = {}
+    self.started_at = time.time()
+
+  def inc(self, name: str, value: float = 1, **labels) -> None:
+    key = self._key(name, labels)
+    with self._lock:
+      self._counters[key] = self._counters.get(key, 0) + value
+
+  def set_gauge(self, name: str, value: float, **labels) -> None:
+    with self._lock:
+      self._gauges[self._key(name, labels)] = value
+
+  def add_gauge(self, name: str, value: float, **labels) -> None:
+    key = self._key(name, labels)
+    with self._lock:
+      self._gauges[key] = self._gauges.get(key, 0) + value
+
+  def observe(self, name: str, value: float, **labels) -> None:
+    key = self._key(name, labels)
+    with self._lock:
+      histogram = self._histograms.get(key)
+      if histogram is None:
+        histogram = self._histograms[key] = Histogram()
+      histogram.observe(value)
+
+  @contextmanager
+  def timer(self, name: str, **labels):
+    """Observes the block's duration and tracks it as in flight while it runs"""
+    self.add_gauge("aatt_in_flight", 1, operation=name, **labels)
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(f"aatt_{name}_seconds", time.perf_counter() - started, **labels)
+      self.add_gauge("aatt_in_flight", -1, operation=name, **labels)
+
+  def state(self) -> dict:
+    """Raw counters, gauges and histogram buckets, for another process to add up with set_source()"""
+    with self._lock:
+      return {
+        "counters": [[name, labels, value] for (name, labels), value in self._counters.items()],
+        "gauges": [[name, labels, value] for (name, labels), value in self._gauges.items()],
+        "histograms": [[name, labels, h.counts, h.sum] for (name, labels), h in self._histograms.items()]
+      }
+
+  def set_source(self, source: str, state: dict) -> None:
+    """Adds another process' state() to the exported metrics, replacing what the same source sent before"""
+    with self._lock:
+      self._sources[source] = state
+
+  def write_state(self, path: str) -> None:
+    _replace(Path(path), json.dumps(self.state()))
+
+  def snapshot(self) -> dict:
+    with self._lock:
+      counters, gauges, merged = self._merged()
+      histograms = {key: (h.count, h.sum, h.quantile(0.5), h.quantile(0.99)) for key, h in merged.items()}
+
+    hits = sum(value for (name, labels), value in counters.items() if name == "aatt_cache_requests_total" and ("result", "hit") in labels)
+    lookups = sum(value for (name, _), value in counters.items() if name == "aatt_cache_requests_total")
+
+    return {
+      "timestamp": time.time(),
+      "uptime_seconds": round(time.time() - self.started_at, 3),
+      "cache_hit_ratio": round(hits / lookups, 4) if lookups else None,
+      "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters.items()],
+      "gauges": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in gauges.items()],
+      "histograms": [
+        {"name": name, "labels": dict(labels), "count": count, "sum": round(total, 6), "p50": p50, "p99": p99}
+        for (name, labels), (count, total, p50, p99) in histograms.items()
+      ]
+    }
+
+  def to_prometheus(self) -> str:
+    lines = []
+    typed = set()
+
+    def declare(name: str, kind: str) -> None:
+      if name not in typed:
+        typed.add(name)
+        lines.append(f"# TYPE {name} {kind}")
+
+    with self._lock:
+      counters, gauges, histograms = self._merged()
+
+      for (name, labels), value in sorted(counters.items()):
+        declare(name, "counter")
+        lines.append(f"{name}{self._format_labels(labels)} {value}")
+      for (name, labels), value in sorted(gauges.items()):
+        declare(name, "gauge")
+        lines.append(f"{name}{self._format_labels(labels)} {value}")
+      for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+          cumulative += count
+          lines.append(f"{name}_bucket{self._format_labels(labels + (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{self._format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
+
+  def write(self, path: str) -> None:
+    """Writes Prometheus text for .prom files and a JSON snapshot otherwise, atomically"""
+    path = Path(path)
+    _replace(path, self.to_prometheus() if path.suffix == ".prom" else json.dumps(self.snapshot(), indent=2))
+
+  def _merged(self) -> Tuple[Dict, Dict, Dict]:
+    # Called with the lock held
+    if not self._sources:
+      return self._counters, self._gauges, self._histograms
+
+    counters, gauges = dict(self._counters), dict(self._gauges)
+    histograms = {key: _copy(histogram) for key, histogram in self._histograms.items()}
+
+    for state in self._sources.values():
+      for name, labels, value in state["counters"]:
+        key = name, tuple(map(tuple, labels))
+        counters[key] = counters.get(key, 0) + value
+      for name, labels, value in state["gauges"]:
+        key = name, tuple(map(tuple, labels))
+        gauges[key] = gauges.get(key, 0) + value
+      for name, labels, counts, total in state["histograms"]:
+        key = name, tuple(map(tuple, labels))
+        histogram = histograms.get(key)
+        if histogram is None:
+          histogram = histograms[key] = Histogram()
+        histogram.counts = [mine + theirs for mine, theirs in zip(histogram.counts, counts)]
+        histogram.sum += total
+        histogram.count += sum(counts)
+
+    return counters, gauges, histograms
+
+  def _key(self, name: str, labels: dict) -> Tuple:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+  def _format_labels(self, labels: Tuple) -> str:
+    if not labels:
+      return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+def _copy(histogram: Histogram) -> Histogram:
+  copy = Histogram(histogram.buckets)
+  copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+  return copy
+
+def _replace(path: Path, content: str) -> None:
+  temporary = path.with_name(f".{path.name}.tmp")
+  temporary.write_text(content, encoding="utf-8")
+  os.replace(temporary, path)
+
+class MetricsExporter:
+  """Background thread that writes a metrics snapshot every interval seconds and once on stop
+
+  write defaults to registry.write; shards pass registry.write_state so the parent can add them up.
+  """
+
+  def __init__(self, registry: Metrics, path: str, interval: float, write: Callable = None):
+    self.registry = registry
+    self.path = path
+    self.interval = interval
+    self.write = write or registry.write
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+  def start(self) -> None:
+    self._thread.start()
+
+  def stop(self) -> None:
+    self._stop.set()
+    self._thread.join()
+    self.write(self.path)
+
+  def _run(self) -> None:
+    while not self._stop.wait(self.interval):
+      self.write(self.path)
+
+metrics = Metrics()
@@ -0,0 +1,40 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import heapq
+import itertools
+import time
+from typing import Any, List, Tuple
+
+class PollScheduler:
+  """Priority queue of pending scans ordered by their next status check time"""
+
+  def __init__(self):
+    self._heap = []
+    self._sequence = itertools.count()
+
+  def __len__(self) -> int:
+    return len(self._heap)
+
+  def schedule(self, item: Any, delay: float, attempt: int = 0) -> None:
+    # The sequence number breaks ties so items themselves are never compared
+    heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), item, attempt))
+
+  def time_until_next(self) -> float:
+    if not self._heap:
+      return 0.0
+    return max(0.0, self._heap[0][0] - time.monotonic())
+
+  def pop_due(self) -> List[Tuple[Any, int]]:
+    now = time.monotonic()
+    due = []
+
+    while self._heap and self._heap[0][0] <= now:
+      _, _, item, attempt = heapq.heappop(self._heap)
+      due.append((item, attempt))
+
+    return due
@@ -0,0 +1,41 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+from src.core.logger import get_logger
+
+logger = get_logger("profiling")
+
+def profile_run(func: Callable, report_path: str, top: int = 40):
+  """Runs func under cProfile and tracemalloc and writes a plain text report"""
+  profiler = cProfile.Profile()
+  tracemalloc.start(25)
+
+  try:
+    return profiler.runcall(func)
+  finally:
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = io.StringIO()
+    report.write(f"Traced memory: current {current / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB\n\n")
+    report.write(f"Top {top} functions by cumulative time\n")
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+    report.write(f"Top {top} functions by own time\n")
+    pstats.Stats(profiler, stream=report).sort_stats("tottime").print_stats(top)
+    report.write(f"Top {top} allocation sites\n")
+    for stat in snapshot.statistics("lineno")[:top]:
+      report.write(f"{stat}\n")
+
+    Path(report_path).write_text(report.getvalue(), encoding="utf-8")
+    logger.info("Profile report written in %s", report_path)
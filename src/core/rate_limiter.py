@@ -0,0 +1,59 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import threading
+import time
+
+class TokenBucket:
+  """Thread-safe token bucket shared by every worker of a scanner"""
+
+  def __init__(self, rate: float, capacity: float = None):
+    self.rate = float(rate)
+    self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+    self._tokens = self.capacity
+    self._updated_at = time.monotonic()
+    self._blocked_until = 0.0
+    self._lock = threading.Lock()
+
+  def acquire(self) -> None:
+    while True:
+      wait = self._try_acquire()
+      if wait <= 0:
+        return
+      time.sleep(wait)
+
+  async def acquire_async(self) -> None:
+    import asyncio
+
+    while True:
+      wait = self._try_acquire()
+      if wait <= 0:
+        return
+      await asyncio.sleep(wait)
+
+  def _try_acquire(self) -> float:
+    # Takes a token if one is available, otherwise returns how long to wait for the next one
+    with self._lock:
+      now = time.monotonic()
+      self._refill(now)
+
+      if now >= self._blocked_until and self._tokens >= 1:
+        self._tokens -= 1
+        return 0.0
+
+      return max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+
+  def pause(self, seconds: float) -> None:
+    # Called when the API pushes back (429), so every worker waits, not only the one that got it
+    with self._lock:
+      self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+      self._tokens = 0
+
+  def _refill(self, now: float) -> None:
+    elapsed = now - self._updated_at
+    self._updated_at = now
+    self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
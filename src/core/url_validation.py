@@ -0,0 +1,31 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import re
+
+# Strict subset of what validators.url accepts: http(s)/ftp URLs with an ASCII hostname or IPv4
+# address, an optional port, path, key=value query and fragment
+_URL_PATTERN = re.compile(
+  r"(?:https?|ftp)://"
+  r"(?:[\w\-.~%!$&'()*+,;=]+(?::[\w\-.~%!$&'()*+,;=]*)?@)?"
+  r"(?:(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}"
+  r"|(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d))"
+  r"(?::(?:[1-9]\d{0,3}|[1-5]\d{4}|6[0-4]\d{3}|65[0-4]\d\d|655[0-2]\d|6553[0-5]))?"
+  r"(?:/[\w\-.~%!$&'()*+,;=:@/]*"
+  r"(?:\?(?:[!\"$%'-:<>-~]*=[!\"$%'-:<-~]*(?:[&;][!\"$%'-:<>-~]*=[!\"$%'-:<-~]*)*)?)?)?"
+  r"(?:#[\w?/:@\-.~%!$&'()*+,;=]*)?",
+  re.IGNORECASE | re.ASCII
+)
+
+def is_valid_url(url: str) -> bool:
+  """Same verdict as validators.url, but common URLs are settled by one compiled pattern"""
+  if _URL_PATTERN.fullmatch(url):
+    return True
+
+  # IPv6 and internationalized hosts, unusual queries and invalid URLs take the slow path
+  import validators
+  return bool(validators.url(url))
@@ -6,22 +6,256 @@
 # =========================================
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import time
+from typing import Dict, List
 import requests
-import validators
-from src.core.exceptions import InvalidURLError
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from src.config.settings import settings
+from src.core.exceptions import APIError, InvalidURLError
+from src.core.logger import get_logger
+from src.core.metrics import metrics
+from src.core.rate_limiter import TokenBucket
+from src.core.url_validation import is_valid_url
+
+logger = get_logger("scanners")
+
+def _not_sent(error: requests.exceptions.RequestException) -> bool:
+  # Connect timeouts and refused or unresolvable connections fail before any byte of the request is sent
+  if isinstance(error, requests.exceptions.ConnectTimeout):
+    return True
+  reason = getattr(error.args[0], "reason", error.args[0]) if error.args else None
+  return isinstance(reason, NewConnectionError)
 
 class BaseScanner(ABC):
-  def __init__(self, api_key: str, base_url: str):
+  name = "unknown"
+  RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+  # 500 and 504 may come after the scan was created, so submissions only retry answers that reject it
+  SUBMIT_RETRY_STATUS_CODES = frozenset({429, 502, 503})
+  IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+  def __init__(self, api_key: str, base_url: str, requests_per_second: float = None, pool_size: int = None):
     self.api_key = api_key
     self.base_url = base_url
-    self.session = requests.Session()
+    self.pool_size = pool_size or settings.SUBMIT_WORKERS
+    self.session = self._build_session()
+    self.timeout = (settings.CONNECT_TIMEOUT, settings.REQUEST_TIMEOUT)
+    self.max_retries = settings.MAX_RETRIES
+    self.rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+
+  def _build_session(self) -> requests.Session:
+    session = requests.Session()
+    # pool_block makes extra threads wait for a free keep-alive connection instead of
+    # opening (and TLS handshaking) throwaway ones; retries are handled by _request
+    adapter = HTTPAdapter(
+      pool_connections=1,
+      pool_maxsize=self.pool_size,
+      pool_block=True,
+      max_retries=0
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+  def connection_stats(self) -> dict:
+    """Requests sent and connections opened by this scanner's pools, to see how well keep-alive works"""
+    requests_sent = 0
+    connections = 0
+
+    for adapter in set(self.session.adapters.values()):
+      pools = adapter.poolmanager.pools
+      for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+          requests_sent += pool.num_requests
+          connections += pool.num_connections
+
+    return {
+      "requests": requests_sent,
+      "connections_opened": connections,
+      "reuse_ratio": round(1 - connections / requests_sent, 3) if requests_sent else 0.0
+    }
 
   def validate_url(self, url: str):
-    if not validators.url(url):
+    if not is_valid_url(url):
       raise InvalidURLError(f"Invalid URL: {url}")
 
+  def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+    """Sends a request through the rate limiter, retrying throttled, failed and 5xx responses
+
+    Non-idempotent requests (submissions) are only retried on 429, 502 and 503 and on connection
+    errors raised before the request went out, so a retry never creates a duplicate scan.
+    """
+    kwargs.setdefault("timeout", self.timeout)
+    idempotent = method.upper() in self.IDEMPOTENT_METHODS
+    retry_status_codes = self.RETRY_STATUS_CODES if idempotent else self.SUBMIT_RETRY_STATUS_CODES
+    attempt = 0
+
+    while True:
+      if self.rate_limiter:
+        self.rate_limiter.acquire()
+
+      try:
+        response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+      except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        metrics.inc("aatt_requests_total", engine=self.name, status="connection_error")
+        if attempt >= self.max_retries or not (idempotent or _not_sent(e)):
+          raise
+        delay = self._backoff_delay(attempt)
+        metrics.inc("aatt_retries_total", engine=self.name, reason="connection_error")
+        logger.warning("%s %s failed (%s), retrying in %.1fs", method, path, e, delay)
+      else:
+        metrics.inc("aatt_requests_total", engine=self.name, status=response.status_code)
+        if response.status_code not in retry_status_codes or attempt >= self.max_retries:
+          response.raise_for_status()
+          return response
+
+        delay = self._throttle_delay(response.status_code, response.headers, attempt)
+        metrics.inc("aatt_retries_total", engine=self.name, reason=response.status_code)
+        logger.warning("%s %s returned %s, retrying in %.1fs", method, path, response.status_code, delay)
+
+      time.sleep(delay)
+      attempt += 1
+
+  async def _async_request(self, client, method: str, path: str, **kwargs) -> dict:
+    """Async counterpart of _request on a shared AsyncHTTPClient, returns the decoded JSON body"""
+    # Imported here so sync runs and quick CLI calls never pay for loading asyncio and aiohttp
+    import asyncio
+    from src.core.async_http import aiohttp
+
+    kwargs.pop("timeout", None)
+    idempotent = method.upper() in self.IDEMPOTENT_METHODS
+    retry_status_codes = self.RETRY_STATUS_CODES if idempotent else self.SUBMIT_RETRY_STATUS_CODES
+    # Connection timeouts have their own class since aiohttp 3.10
+    not_sent = (aiohttp.ClientConnectorError, getattr(aiohttp, "ConnectionTimeoutError", aiohttp.ClientConnectorError))
+    attempt = 0
+
+    while True:
+      if self.rate_limiter:
+        await self.rate_limiter.acquire_async()
+
+      try:
+        async with client.session.request(
+          method, f"{self.base_url}{path}", headers=self.session.headers, **kwargs
+        ) as response:
+          metrics.inc("aatt_requests_total", engine=self.name, status=response.status)
+          if response.status not in retry_status_codes or attempt >= self.max_retries:
+            if response.status >= 400:
+              raise APIError(f"{response.status} {response.reason} for {method} {path}", response.status)
+            return await response.json(content_type=None)
+
+          delay = self._throttle_delay(response.status, response.headers, attempt)
+          metrics.inc("aatt_retries_total", engine=self.name, reason=response.status)
+          logger.warning("%s %s returned %s, retrying in %.1fs", method, path, response.status, delay)
+      except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+        metrics.inc("aatt_requests_total", engine=self.name, status="connection_error")
+        if attempt >= self.max_retries or not (idempotent or isinstance(e, not_sent)):
+          raise APIError(str(e))
+        delay = self._backoff_delay(attempt)
+        metrics.inc("aatt_retries_total", engine=self.name, reason="connection_error")
+        logger.warning("%s %s failed (%s), retrying in %.1fs", method, path, e, delay)
+
+      await asyncio.sleep(delay)
+      attempt += 1
+
+  def _throttle_delay(self, status_code: int, headers, attempt: int) -> float:
+    retry_after = self._retry_after(headers)
+    delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+
+    if status_code == 429 and self.rate_limiter:
+      self.rate_limiter.pause(delay)
+
+    return delay
+
+  def _backoff_delay(self, attempt: int) -> float:
+    # Full jitter keeps parallel workers from retrying in lockstep
+    ceiling = min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+  def _retry_after(self, headers):
+    value = headers.get("Retry-After")
+
+    if not value:
+      return None
+
+    try:
+      seconds = float(value)
+    except ValueError:
+      try:
+        seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+      except (TypeError, ValueError):
+        return None
+
+    return min(settings.RETRY_BACKOFF_MAX, max(0.0, seconds))
+
+  def retrieve_scan_statuses(self, scan_ids: List[str]) -> Dict[str, dict]:
+    """Current results of many scans, by scan id; scans whose check failed are left out
+
+    Engines without a bulk status endpoint send the single-scan requests concurrently,
+    pipelined over the session's keep-alive pool and the engine's rate limiter.
+    """
+    return self._retrieve_concurrently(scan_ids)
+
+  async def async_retrieve_scan_statuses(self, client, scan_ids: List[str]) -> Dict[str, dict]:
+    """Async counterpart of retrieve_scan_statuses"""
+    return await self._async_retrieve_concurrently(client, scan_ids)
+
+  def _retrieve_concurrently(self, scan_ids: List[str]) -> Dict[str, dict]:
+    results = {}
+    if not scan_ids:
+      return results
+
+    with ThreadPoolExecutor(max_workers=min(self.pool_size, len(scan_ids)), thread_name_prefix=f"status-{self.name}") as executor:
+      futures = {executor.submit(self.retrieve_scan_results, scan_id): scan_id for scan_id in scan_ids}
+      for future in as_completed(futures):
+        try:
+          results[futures[future]] = future.result()
+        except Exception as e:
+          logger.error("Error verifying state for %s scan %s: %s", self.name, futures[future], e)
+
+    return results
+
+  async def _async_retrieve_concurrently(self, client, scan_ids: List[str]) -> Dict[str, dict]:
+    import asyncio
+
+    results = {}
+    answers = await asyncio.gather(*(self.async_retrieve_scan_results(client, scan_id) for scan_id in scan_ids), return_exceptions=True)
+    for scan_id, answer in zip(scan_ids, answers):
+      if isinstance(answer, Exception):
+        logger.error("Error verifying state for %s scan %s: %s", self.name, scan_id, answer)
+      else:
+        results[scan_id] = answer
+
+    return results
+
+  async def async_scan_url(self, client, url: str, validate: bool = True) -> dict:
+    if validate:
+      self.validate_url(url)
+    method, path, kwargs = self._scan_request(url)
+    return await self._async_request(client, method, path, **kwargs)
+
+  async def async_retrieve_scan_results(self, client, scan_id: str) -> dict:
+    method, path, kwargs = self._retrieve_request(scan_id)
+    return await self._async_request(client, method, path, **kwargs)
+
+  @abstractmethod
+  def _scan_request(self, url: str) -> tuple:
+    """Returns the (method, path, request kwargs) used to submit a URL"""
+    pass
+
+  @abstractmethod
+  def _retrieve_request(self, scan_id: str) -> tuple:
+    """Returns the (method, path, request kwargs) used to fetch a scan"""
+    pass
+
   @abstractmethod
-  def scan_url(self, url: str) -> dict:
+  def scan_url(self, url: str, validate: bool = True) -> dict:
+    """Submits a URL; batch pipelines pass validate=False for URLs their filter already checked"""
     pass
 
   @abstractmethod
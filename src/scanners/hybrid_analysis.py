@@ -5,39 +5,64 @@
 # GNU GPL3 License
 # =========================================
 
+from functools import lru_cache
+import sys
+from typing import Dict
 from src.scanners.base_scanner import BaseScanner
 from src.core.exceptions import APIError
-from src.core.logger import logger
+from src.core.logger import get_logger
 import requests
 
+logger = get_logger("scanners")
+
+@lru_cache(maxsize=4096)
+def _column(scanner_name: str) -> str:
+  return sys.intern(f'ha_{scanner_name}')
+
+def extract_columns(result: Dict, scan_id: str = None) -> Dict:
+  """One ha_ column per HybridAnalysis scanner with its status"""
+  data = {}
+
+  scanners = result.get('scanners_v2', {})
+  for scanner_name, scanner_data in scanners.items():
+    if isinstance(scanner_data, dict):
+      data[_column(scanner_name)] = scanner_data.get('status', 'No results')
+    else:
+      data[_column(scanner_name)] = scanner_data
+
+  return data
+
 class HybridAnalysisScanner(BaseScanner):
-  def __init__(self, api_key: str, base_url: str):
-    super().__init__(api_key, base_url)
+  name = "HybridAnalysis"
+
+  def __init__(self, api_key: str, base_url: str, requests_per_second: float = None, pool_size: int = None):
+    super().__init__(api_key, base_url, requests_per_second, pool_size)
     self.session.headers.update({"api-key": self.api_key, "Content-Type": "application/x-www-form-urlencoded"})
 
-  def scan_url(self, url: str) -> dict:
-    self.validate_url(url)
-    logger.info(f"Scanning URL with HybridAnalysis engine: {url}")
+  def _scan_request(self, url: str) -> tuple:
+    return "POST", "/quick-scan/url", {"data": {"url": url, "scan_type": "all"}}
 
-    try:
-      response = self.session.post(
-        f"{self.base_url}/quick-scan/url",
-        data={"url": url, "scan_type": "all"}
-      )
+  def _retrieve_request(self, scan_id: str) -> tuple:
+    return "GET", f"/quick-scan/{scan_id}", {}
 
-      response.raise_for_status()
-      return response.json()
+  def scan_url(self, url: str, validate: bool = True) -> dict:
+    if validate:
+      self.validate_url(url)
+    logger.info("Scanning URL with HybridAnalysis engine: %s", url)
+
+    try:
+      method, path, kwargs = self._scan_request(url)
+      return self._request(method, path, **kwargs).json()
     except requests.exceptions.RequestException as e:
-      logger.error(f"Error in HybridAnalysis scanning {str(e)}")
+      logger.error("Error in HybridAnalysis scanning %s", e)
       raise APIError(str(e), getattr(e.response, "status_code", None))
 
   def retrieve_scan_results(self, scan_id: str) -> dict:
-    logger.info(f"Retrieving HybridAnalysis scanning results")
+    logger.info("Retrieving HybridAnalysis scanning results")
 
     try:
-      response = self.session.get(f"{self.base_url}/quick-scan/{scan_id}")
-      response.raise_for_status()
-      return response.json()
+      method, path, kwargs = self._retrieve_request(scan_id)
+      return self._request(method, path, **kwargs).json()
     except requests.exceptions.RequestException as e:
-      logger.error(f"Error retrieving HybridAnalysis scan {str(e)}")
+      logger.error("Error retrieving HybridAnalysis scan %s", e)
       raise APIError(str(e), getattr(e.response, "status_code", None))
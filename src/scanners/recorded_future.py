@@ -5,38 +5,193 @@
 # GNU GPL3 License
 # =========================================
 
+from datetime import datetime
+from functools import lru_cache
+import sys
 from src.scanners.base_scanner import BaseScanner
+from src.config.settings import settings
 from src.core.exceptions import APIError
-from src.core.logger import logger
+from src.core.logger import get_logger
+from typing import Dict, List, Optional, Set
 import json
 import requests
 
+logger = get_logger("scanners")
+
+EMPTY_COLUMNS = {
+  'rf_behavioral1': 'No results',
+  'rf_behavioral1_score': 'No results',
+  'rf_static1': 'No results',
+  'rf_static1_score': 'No results',
+  'rf_urlscan1': 'No results',
+  'rf_urlscan1_score': 'No results'
+}
+
+@lru_cache(maxsize=4096)
+def _columns(task_name: str) -> tuple:
+  return sys.intern(f'rf_{task_name}'), sys.intern(f'rf_{task_name}_score')
+
+def _timestamp(value) -> Optional[float]:
+  # The sandbox reports times as ISO 8601 strings, e.g. 2024-05-02T10:11:12Z
+  try:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+  except (AttributeError, TypeError, ValueError):
+    return None
+
+def extract_columns(result: Dict, scan_id: str = None) -> Dict:
+  """A status and a score column per sandbox task of the sample"""
+  data = {}
+
+  if isinstance(result, dict):
+    tasks = result.get('tasks', {})
+    for task_id, task_data in tasks.items():
+      # Task ids are prefixed by the sample id; tasks of other samples are skipped
+      if not isinstance(task_data, dict) or (scan_id and not task_id.startswith(scan_id)):
+        continue
+
+      # The engine name is the task_id suffix; its column names are built once per suffix
+      status_column, score_column = _columns(task_id[task_id.rfind('-') + 1:])
+      data[status_column] = task_data.get('status', 'No results')
+      data[score_column] = task_data.get('score', 'No results')
+    # If there are no tasks, add empty columns for RecordedFuture
+    if not tasks:
+      data.update(EMPTY_COLUMNS)
+
+  return data
+
 class RecordedFutureScanner(BaseScanner):
-  def __init__(self, api_key: str, base_url: str):
-    super().__init__(api_key, base_url)
+  name = "RecordedFuture"
+  # Sample statuses after which the summary holds the final results
+  FINISHED_STATUSES = frozenset({"reported", "failed"})
+
+  def __init__(self, api_key: str, base_url: str, requests_per_second: float = None, pool_size: int = None):
+    super().__init__(api_key, base_url, requests_per_second, pool_size)
     self.session.headers.update(
       {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
     )
+    # Turned off when the sandbox does not offer the sample list to this token
+    self.list_statuses = True
+    # Submission times of the samples still running, so the sample list is only read back as far as them
+    self._submitted_at = {}
+
+  def _scan_request(self, url: str) -> tuple:
+    return "POST", "/samples", {"data": json.dumps({"url": url})}
 
-  def scan_url(self, url: str) -> dict:
-    self.validate_url(url)
-    logger.info(f"Scanning URL with RecordedFuture engine: {url}")
+  def _retrieve_request(self, scan_id: str) -> tuple:
+    return "GET", f"/samples/{scan_id}/summary", {}
+
+  def scan_url(self, url: str, validate: bool = True) -> dict:
+    if validate:
+      self.validate_url(url)
+    logger.info("Scanning URL with RecordedFuture engine: %s", url)
 
     try:
-      response = self.session.post(f"{self.base_url}/samples", data=json.dumps({"url": url}))
-      response.raise_for_status()
-      return response.json()
+      method, path, kwargs = self._scan_request(url)
+      return self._remember(self._request(method, path, **kwargs).json())
     except requests.exceptions.RequestException as e:
-      logger.error(f"Error in RecordedFuture scanning {str(e)}")
+      logger.error("Error in RecordedFuture scanning %s", e)
       raise APIError(str(e), getattr(e.response, "status_code", None))
 
+  async def async_scan_url(self, client, url: str, validate: bool = True) -> dict:
+    return self._remember(await super().async_scan_url(client, url, validate))
+
   def retrieve_scan_results(self, scan_id: str) -> dict:
-    logger.info(f"Retrieving RecordedFuture scanning results")
+    logger.info("Retrieving RecordedFuture scanning results")
 
     try:
-      response = self.session.get(f"{self.base_url}/samples/{scan_id}/summary")
-      response.raise_for_status()
-      return response.json()
+      method, path, kwargs = self._retrieve_request(scan_id)
+      return self._request(method, path, **kwargs).json()
     except requests.exceptions.RequestException as e:
-      logger.error(f"Error retrieving RecordedFuture scan {str(e)}")
+      logger.error("Error retrieving RecordedFuture scan %s", e)
       raise APIError(str(e), getattr(e.response, "status_code", None))
+
+  def retrieve_scan_statuses(self, scan_ids: List[str]) -> Dict[str, dict]:
+    # One page of the sample list covers hundreds of scans; only finished samples need their summary
+    statuses = self._list_statuses(set(scan_ids)) if self.list_statuses else None
+    results = self._running(statuses or {})
+    results.update(self._retrieve_concurrently([scan_id for scan_id in scan_ids if scan_id not in results]))
+    return self._forget(results)
+
+  async def async_retrieve_scan_statuses(self, client, scan_ids: List[str]) -> Dict[str, dict]:
+    statuses = await self._async_list_statuses(client, set(scan_ids)) if self.list_statuses else None
+    results = self._running(statuses or {})
+    results.update(await self._async_retrieve_concurrently(client, [scan_id for scan_id in scan_ids if scan_id not in results]))
+    return self._forget(results)
+
+  def _list_statuses(self, scan_ids: Set[str]) -> Optional[Dict[str, str]]:
+    statuses = {}
+    oldest = self._oldest_submission(scan_ids)
+    params = {"subset": "owned", "limit": settings.STATUS_PAGE_SIZE}
+
+    try:
+      for _ in range(settings.STATUS_MAX_PAGES):
+        cursor = self._read_page(self._request("GET", "/samples", params=params).json(), scan_ids, statuses, oldest)
+        if cursor is None:
+          break
+        params["offset"] = cursor
+    except (requests.exceptions.RequestException, ValueError) as e:
+      return self._list_failed(e, getattr(getattr(e, "response", None), "status_code", None), statuses)
+
+    return statuses
+
+  async def _async_list_statuses(self, client, scan_ids: Set[str]) -> Optional[Dict[str, str]]:
+    statuses = {}
+    oldest = self._oldest_submission(scan_ids)
+    params = {"subset": "owned", "limit": settings.STATUS_PAGE_SIZE}
+
+    try:
+      for _ in range(settings.STATUS_MAX_PAGES):
+        cursor = self._read_page(await self._async_request(client, "GET", "/samples", params=params), scan_ids, statuses, oldest)
+        if cursor is None:
+          break
+        params["offset"] = cursor
+    except (APIError, ValueError) as e:
+      return self._list_failed(e, getattr(e, "status_code", None), statuses)
+
+    return statuses
+
+  def _read_page(self, page: dict, scan_ids: Set[str], statuses: Dict[str, str], oldest: Optional[float]) -> Optional[str]:
+    """Collects the statuses of the wanted samples on a page, returns the next page's cursor or None when done"""
+    samples = page.get("data") or []
+    for sample in samples:
+      if sample.get("id") in scan_ids:
+        statuses[sample["id"]] = sample.get("status")
+
+    if len(statuses) == len(scan_ids) or not page.get("next"):
+      return None
+
+    # The list is newest first, so once it is past the oldest wanted submission the rest cannot show up
+    last = _timestamp(samples[-1].get("submitted")) if samples else None
+    if oldest is not None and last is not None and last < oldest:
+      return None
+    return page["next"]
+
+  def _list_failed(self, error: Exception, status_code: Optional[int], statuses: Dict[str, str]) -> Optional[Dict[str, str]]:
+    # Statuses of the pages read before the failure are kept; only the other scans are checked one by one
+    logger.warning("RecordedFuture sample list unavailable (%s), checking the remaining scans one by one", error)
+    if status_code in (401, 403, 404, 405):
+      self.list_statuses = False
+    return statuses or None
+
+  def _oldest_submission(self, scan_ids: Set[str]) -> Optional[float]:
+    # Scans submitted by another process (e.g. before a resume) have no known time, the page limit applies then
+    times = [self._submitted_at.get(scan_id) for scan_id in scan_ids]
+    return None if not times or None in times else min(times)
+
+  def _running(self, statuses: Dict[str, str]) -> Dict[str, dict]:
+    return {
+      scan_id: {"sample": scan_id, "status": status, "completed": False}
+      for scan_id, status in statuses.items() if status not in self.FINISHED_STATUSES
+    }
+
+  def _remember(self, result: dict) -> dict:
+    submitted = _timestamp(result.get("submitted")) if isinstance(result, dict) else None
+    if submitted is not None and result.get("id"):
+      self._submitted_at[result["id"]] = submitted
+    return result
+
+  def _forget(self, results: Dict[str, dict]) -> Dict[str, dict]:
+    for scan_id, result in results.items():
+      if result.get("completed", result.get("finished", False)):
+        self._submitted_at.pop(scan_id, None)
+    return results
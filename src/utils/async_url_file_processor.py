@@ -0,0 +1,191 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import asyncio
+from ..config.settings import settings
+from ..core.async_http import AsyncHTTPClient
+from ..core.logger import get_logger
+from ..core.metrics import metrics
+from .control_journal import PendingScan, PENDING, COMPLETED
+from .url_file_processor import URLFileProcessor
+
+logger = get_logger("processor")
+
+class AsyncURLFileProcessor(URLFileProcessor):
+  """asyncio version of the -f pipeline: one coroutine per (engine, URL) scan on a shared connection pool
+
+  Journal, cache and results writer are shared with URLFileProcessor and are only
+  touched from the event loop thread, so no locking is needed. Waiting scans sit in the poll
+  scheduler and a single poller sends one batched status check per engine for the ones due.
+  """
+
+  def _process_urls(self) -> None:
+    logger.info("Starting URLs processment (async)...")
+    asyncio.run(self._run())
+    self.file_control_check = True
+
+  async def _run(self) -> None:
+    resuming = self._open_journal()
+    pending = self._read_control_file() if resuming else []
+
+    # Bounds the scans alive at once, overall and per engine, which also bounds how far ahead the input is read
+    in_flight = _Slots(asyncio.Semaphore(settings.ASYNC_MAX_IN_FLIGHT), {
+      engine: asyncio.Semaphore(self._engine_max_outstanding(engine)) for engine in self.scanners
+    })
+    tasks = set()
+
+    def spawn(coroutine) -> None:
+      task = asyncio.create_task(coroutine)
+      tasks.add(task)
+      task.add_done_callback(tasks.discard)
+
+    # Scan -> future resolved once its verdict is in, and a wake-up for the poller when scans are added
+    self._waiters = {}
+    self._wake = asyncio.Event()
+
+    async with AsyncHTTPClient() as client:
+      poller = asyncio.create_task(self._run_polls(client))
+
+      while pending:
+        engine, url, scan_id = pending.pop()
+        await in_flight.acquire(engine)
+        spawn(self._poll_pending(client, engine, url, scan_id, in_flight))
+
+      # When resuming, URLs of the input that already have journaled scans are not submitted again
+      for url in self.urls:
+        engines = self._unsubmitted_engines(url) if resuming else self.scanners
+        if not engines:
+          continue
+        self._outstanding[url] += len(engines)
+
+        for engine in engines:
+          await in_flight.acquire(engine)
+          spawn(self._submit_and_poll(client, engine, url, in_flight))
+
+      try:
+        while tasks:
+          await asyncio.gather(*tasks)
+      finally:
+        poller.cancel()
+
+  async def _submit_and_poll(self, client, engine: str, url: str, in_flight: "_Slots") -> None:
+    try:
+      cached = self.cache.get(engine, url) if self.cache else None
+
+      if cached and cached.scan_id:
+        scan_id, completed = cached.scan_id, cached.completed
+        payload = cached.result
+      else:
+        try:
+          with metrics.timer("submit", engine=engine):
+            result = await self.scanners[engine].async_scan_url(client, url, validate=False)
+        except Exception as e:
+          logger.error("Error while scanning %s with %s: %s", url, engine, e)
+          self._fail_scan(engine, url, None, str(e))
+          return
+
+        scan_id = result.get('id')
+        completed = result.get('completed', result.get('finished', False))
+        if self.cache and scan_id:
+          self.cache.store_submission(engine, url, result)
+          if completed:
+            self.cache.store_result(engine, scan_id, result)
+        # A submission that comes back finished already carries its verdict, so it is not fetched again
+        payload = result if completed else None
+
+      if not completed and not scan_id:
+        logger.error("%s returned no scan id for %s", engine, url)
+        self._fail_scan(engine, url, None, "The engine returned no scan id")
+        return
+
+      if completed and payload is not None:
+        if self._checkpoint_result(engine, url, scan_id, payload):
+          self._scan_finished(url, engine, scan_id)
+        return
+
+      self.journal.record(engine, url, scan_id, COMPLETED if completed else PENDING)
+      if completed:
+        self._scan_finished(url, engine, scan_id)
+      else:
+        await self._poll_until_done(client, engine, url, scan_id)
+    finally:
+      in_flight.release(engine)
+
+  async def _poll_pending(self, client, engine: str, url: str, scan_id: str, in_flight: "_Slots") -> None:
+    try:
+      await self._poll_until_done(client, engine, url, scan_id)
+    finally:
+      in_flight.release(engine)
+
+  async def _poll_until_done(self, client, engine: str, url: str, scan_id: str) -> None:
+    entry = PendingScan(engine, url, scan_id)
+    done = self._waiters[entry] = asyncio.get_running_loop().create_future()
+    self.scheduler.schedule(entry, self._poll_delay(engine, 0))
+    self._wake.set()
+    await done
+
+  async def _run_polls(self, client) -> None:
+    # Scans falling due while an engine's check runs join its next batch
+    polling = {}
+
+    while True:
+      self._wake.clear()
+      timeout = self.scheduler.time_until_next() if self.scheduler else None
+      try:
+        await asyncio.wait_for(self._wake.wait(), timeout)
+      except asyncio.TimeoutError:
+        pass
+
+      for entry, attempt in self.scheduler.pop_due():
+        self._due[entry.engine].append((entry, attempt))
+
+      for engine in [engine for engine in self._due if engine not in polling]:
+        task = polling[engine] = asyncio.create_task(self._poll_batch(client, engine, self._due.pop(engine)))
+        task.add_done_callback(lambda _, engine=engine: (polling.pop(engine, None), self._wake.set()))
+
+      metrics.set_gauge("aatt_queue_depth", len(self.scheduler), stage="poll")
+
+  async def _poll_batch(self, client, engine: str, entries: list) -> None:
+    # Statuses come from one batched check; full results are only fetched for the scans that finished
+    try:
+      with metrics.timer("poll", engine=engine):
+        results = await self.scanners[engine].async_retrieve_scan_statuses(client, [entry.scan_id for entry, _ in entries])
+    except Exception as e:
+      logger.error("Error verifying state for %s %s scans: %s", len(entries), engine, e)
+      results = {}
+
+    for entry, attempt in entries:
+      result = results.get(entry.scan_id)
+
+      if result and result.get('completed', result.get('finished', False)):
+        done = self._waiters.pop(entry)
+        try:
+          self._complete_scan(engine, entry.url, entry.scan_id, result)
+          done.set_result(None)
+        except Exception as e:
+          done.set_exception(e)
+      elif self._polls_exhausted(engine, attempt + 1):
+        self._expire_scan(engine, entry.url, entry.scan_id, attempt + 1)
+        self._waiters.pop(entry).set_result(None)
+      else:
+        self.scheduler.schedule(entry, self._poll_delay(engine, attempt + 1), attempt + 1)
+
+class _Slots:
+  """A slot in the overall in-flight limit plus one in the scan's engine limit"""
+
+  def __init__(self, overall: asyncio.Semaphore, engines: dict):
+    self.overall = overall
+    self.engines = engines
+
+  async def acquire(self, engine: str) -> None:
+    # The engine slot comes first so a saturated engine does not hold overall slots the others could use
+    await self.engines[engine].acquire()
+    await self.overall.acquire()
+
+  def release(self, engine: str) -> None:
+    self.overall.release()
+    self.engines[engine].release()
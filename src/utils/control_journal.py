@@ -0,0 +1,192 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import csv
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from src.core.logger import get_logger
+
+logger = get_logger("journal")
+
+PENDING = "pending"
+COMPLETED = "completed"
+FETCHED = "fetched"
+WRITTEN = "written"
+ERROR = "error"
+
+class PendingScan:
+  """A submitted scan waiting for its verdict
+
+  Slots and interned engine names keep the record small, since a large feed can have
+  hundreds of thousands of them waiting to be polled.
+  """
+  __slots__ = ("engine", "url", "scan_id")
+
+  def __init__(self, engine: str, url: str, scan_id: str):
+    self.engine = sys.intern(engine)
+    self.url = url
+    self.scan_id = scan_id
+
+  def __iter__(self):
+    return iter((self.engine, self.url, self.scan_id))
+
+class ControlJournal:
+  """Crash-safe record of every (engine, URL) scan and its state, indexed by state
+
+  A scan goes pending (submitted) -> completed (verdict ready) -> fetched (result columns
+  checkpointed in the journal) -> written (row flushed to the results file), or to error.
+  """
+
+  def __init__(self, path: Path):
+    self.path = Path(path)
+    self._connection = sqlite3.connect(self.path)
+    self._batching = False
+    self._connection.execute("PRAGMA journal_mode=WAL")
+    self._connection.execute("PRAGMA synchronous=NORMAL")
+    self._connection.executescript("""
+      CREATE TABLE IF NOT EXISTS scans (
+        engine TEXT NOT NULL,
+        url TEXT NOT NULL,
+        scan_id TEXT,
+        state TEXT NOT NULL,
+        detail TEXT,
+        data TEXT,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (engine, url)
+      );
+      CREATE INDEX IF NOT EXISTS scans_state ON scans (state);
+      CREATE INDEX IF NOT EXISTS scans_url ON scans (url);
+      CREATE TABLE IF NOT EXISTS followers (
+        url TEXT PRIMARY KEY,
+        representative TEXT NOT NULL,
+        written INTEGER NOT NULL DEFAULT 0
+      );
+      CREATE INDEX IF NOT EXISTS followers_written ON followers (written, representative);
+    """)
+
+    # Journals left by older versions have no checkpointed result columns
+    columns = {row[1] for row in self._connection.execute("PRAGMA table_info(scans)")}
+    if "data" not in columns:
+      self._connection.execute("ALTER TABLE scans ADD COLUMN data TEXT")
+
+  def has_entries(self) -> bool:
+    return self._connection.execute("SELECT 1 FROM scans LIMIT 1").fetchone() is not None
+
+  @contextmanager
+  def batch(self):
+    """Commits the scans recorded inside once, for results that arrive together"""
+    self._batching = True
+    try:
+      with self._connection:
+        yield
+    finally:
+      self._batching = False
+
+  def record(self, engine: str, url: str, scan_id: str, state: str, detail: str = None, data: Dict = None) -> None:
+    # Only the row whose state changed is written, the rest of the journal is untouched
+    self._connection.execute(
+      """INSERT INTO scans (engine, url, scan_id, state, detail, data, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)
+         ON CONFLICT (engine, url) DO UPDATE SET
+           scan_id = excluded.scan_id, state = excluded.state, detail = excluded.detail,
+           data = excluded.data, updated_at = excluded.updated_at""",
+      (engine, url, scan_id, state, detail, None if data is None else json.dumps(data), time.time())
+    )
+    if not self._batching:
+      self._connection.commit()
+
+  def engines(self, url: str) -> Set[str]:
+    """Engines that already have a journaled scan for a URL; failed submissions do not count, so they are retried"""
+    return {
+      engine for (engine,) in self._connection.execute("SELECT engine FROM scans WHERE url = ? AND state != ?", (url, ERROR))
+    }
+
+  def progress(self) -> Dict[str, int]:
+    return dict(self._connection.execute("SELECT state, COUNT(*) FROM scans GROUP BY state"))
+
+  def pending(self) -> List[PendingScan]:
+    return [
+      PendingScan(engine, url, scan_id)
+      for engine, url, scan_id in self._connection.execute(
+        "SELECT engine, url, scan_id FROM scans WHERE state = ?", (PENDING,)
+      )
+    ]
+
+  def completed_urls(self, limit: int = 500) -> List[str]:
+    """URLs with finished scans whose results are not written yet"""
+    return [
+      url for (url,) in self._connection.execute(
+        "SELECT DISTINCT url FROM scans WHERE state IN (?, ?) LIMIT ?", (COMPLETED, FETCHED, limit)
+      )
+    ]
+
+  def completed_scans(self, url: str) -> List[tuple]:
+    return self._connection.execute(
+      "SELECT engine, scan_id FROM scans WHERE url = ? AND state IN (?, ?)", (url, COMPLETED, FETCHED)
+    ).fetchall()
+
+  def fetched(self, engine: str, url: str) -> Optional[Dict]:
+    """Result columns checkpointed for a scan, None when they still have to be fetched"""
+    row = self._connection.execute(
+      "SELECT data FROM scans WHERE engine = ? AND url = ? AND state = ?", (engine, url, FETCHED)
+    ).fetchone()
+    return json.loads(row[0]) if row and row[0] else None
+
+  def mark_written(self, urls: List[str]) -> None:
+    """Marks the scans and follower rows of URLs flushed to the results file; their columns are dropped"""
+    now = time.time()
+    with self._connection:
+      self._connection.executemany(
+        "UPDATE scans SET state = ?, data = NULL, updated_at = ? WHERE url = ? AND state IN (?, ?)",
+        [(WRITTEN, now, url, COMPLETED, FETCHED) for url in urls]
+      )
+      self._connection.executemany("UPDATE followers SET written = 1 WHERE url = ?", [(url,) for url in urls])
+
+  def add_follower(self, url: str, representative: str) -> None:
+    """Records a URL that is not scanned and takes its representative's results instead"""
+    with self._connection:
+      self._connection.execute(
+        "INSERT OR IGNORE INTO followers (url, representative) VALUES (?, ?)", (url, representative)
+      )
+
+  def unwritten_followers(self, limit: int = 500) -> List[tuple]:
+    return self._connection.execute(
+      "SELECT url, representative FROM followers WHERE written = 0 ORDER BY representative LIMIT ?", (limit,)
+    ).fetchall()
+
+  def compact(self) -> None:
+    with self._connection:
+      self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    self._connection.execute("VACUUM")
+
+  def import_legacy(self, legacy_file: Path) -> None:
+    """Loads a control file written by previous versions (engine, url, scan_id, state rows)"""
+    with open(legacy_file, 'r', encoding='utf-8') as file:
+      for row in csv.reader(file):
+        if len(row) != 4:
+          continue
+
+        engine, url, scan_id, state = row
+        if scan_id == "error":
+          self.record(engine, url, None, ERROR, state)
+        else:
+          self.record(engine, url, scan_id, COMPLETED if state.lower() == 'true' else PENDING)
+
+    logger.info("Legacy control file %s imported", legacy_file)
+
+  def close(self) -> None:
+    self._connection.close()
+
+  def destroy(self) -> None:
+    self.close()
+
+    for suffix in ("", "-wal", "-shm"):
+      Path(f"{self.path}{suffix}").unlink(missing_ok=True)
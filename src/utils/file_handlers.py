@@ -5,29 +5,474 @@
 # GNU GPL3 License
 # =========================================
 
+from collections import defaultdict
+from datetime import datetime
 from pathlib import Path
 import csv
-from typing import List, Dict
-from src.core.logger import logger
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, List, Dict, Optional
+from src.config.settings import settings
+from src.core.exceptions import ConfigurationError
+from src.core.logger import get_logger
+from .result_schema import ResultSchema
+
+logger = get_logger("results")
+
+# Default results path per output format; Parquet results are a directory of date partitions
+RESULT_FILES = {"csv": "scan_results.csv", "jsonl": "scan_results.jsonl", "parquet": "scan_results"}
+OUTPUT_FORMATS = tuple(RESULT_FILES)
+
+def results_handler(output_format: str, filename: str = None, column_key: Optional[Callable] = None,
+                    on_flush: Optional[Callable] = None):
+  """Builds the results writer for an output format; all of them share write_row/flush/close
+
+  on_flush(rows) is called with the rows that just reached the file, so callers can checkpoint them.
+  """
+  handlers = {"csv": ResultsFileHandler, "jsonl": JsonLinesResultsHandler, "parquet": ParquetResultsHandler}
+
+  if output_format not in handlers:
+    raise ConfigurationError(f"Unknown output format {output_format}, expected one of {', '.join(OUTPUT_FORMATS)}")
+
+  return handlers[output_format](filename or RESULT_FILES[output_format], column_key, on_flush)
+
+def append_file(source: Path, target: Path, skip_lines: int = 0) -> None:
+  """Appends source to target and removes source, so a crash never appends it twice
+
+  The combined file is built next to the target and only then replaces it; running this again
+  after a crash finishes whichever step was left. skip_lines drops the source's first lines
+  (a header) when the target already has content.
+  """
+  source, target = Path(source), Path(target)
+  combined = target.with_name(f".{target.name}.append")
+
+  if not combined.exists():
+    if not source.exists():
+      return
+
+    temporary = combined.with_name(f"{combined.name}.tmp")
+    existing = target.exists() and target.stat().st_size > 0
+    with open(temporary, "wb") as output:
+      if existing:
+        with open(target, "rb") as file:
+          shutil.copyfileobj(file, output)
+      with open(source, "rb") as file:
+        for _ in range(skip_lines if existing else 0):
+          file.readline()
+        shutil.copyfileobj(file, output)
+      output.flush()
+      os.fsync(output.fileno())
+    os.replace(temporary, combined)
+
+  source.unlink(missing_ok=True)
+  os.replace(combined, target)
 
 class ResultsFileHandler:
-  def __init__(self, filename: str = "scan_results.csv"):
+  """Append-only CSV writer that rolls to a new segment when new columns appear
+
+  Segments are scan_results.csv, scan_results.1.csv, scan_results.2.csv... and rows already
+  written are never rewritten. A schema sidecar (scan_results.schema.json) lists every segment
+  with its header and the union of all columns, so readers can line the segments up;
+  compact() folds them into one file and is only run on request, offline.
+  """
+
+  def __init__(self, filename: str = "scan_results.csv", column_key: Optional[Callable] = None,
+               on_flush: Optional[Callable] = None):
     self.filename = Path(filename)
+    self.schema_file = self.filename.with_name(f"{self.filename.stem}.schema.json")
+    self.column_key = column_key
+    self.on_flush = on_flush
     self._ensure_file_exists()
+    self._recover_compaction()
+    self.segment, self.headers = self._latest_segment()
+    self._columns = set(self.headers)
+    self._segment_headers = [self._read_header(path) for path in self.segments()]
+    self._file = None
+    self._writer = None
+    self._write_schema()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
 
   def _ensure_file_exists(self):
     self.filename.touch(exist_ok=True)
 
+  def segment_path(self, index: int) -> Path:
+    if index == 0:
+      return self.filename
+    return self.filename.with_name(f"{self.filename.stem}.{index}{self.filename.suffix}")
+
+  def segments(self) -> List[Path]:
+    return [self.segment_path(index) for index in range(self.segment + 1)]
+
+  def write_row(self, row: Dict) -> None:
+    missing = [column for column in row if column not in self._columns]
+
+    if missing or self._writer is None:
+      self._open(self.headers + missing)
+
+    self._writer.writerow([row.get(header, 'No results') for header in self.headers])
+    self._file.flush()
+    if self.on_flush:
+      self.on_flush([row])
+
+  def flush(self) -> None:
+    # Rows are flushed as they are written
+    pass
+
   def write_results(self, data: List[Dict], headers: List[str]):
     try:
-      with open(self.filename, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
+      missing = [header for header in headers if header not in self._columns]
+      if missing:
+        self._open(self.headers + missing)
 
-        if self.filename.stat().st_size == 0:
-          writer.writeheader()
-        writer.writerows(data)
+      for row in data:
+        self.write_row(row)
 
-      logger.info(f"Results written in file {self.filename}")
+      logger.info("Results written in file %s", self.segment_path(self.segment))
     except Exception as e:
-      logger.error(f"Error writing results: {str(e)}")
+      logger.error("Error writing results: %s", e)
       raise
+
+  def columns(self) -> List[str]:
+    """Union of the columns of every segment"""
+    columns = list(dict.fromkeys(column for headers in self._segment_headers for column in headers))
+    return sorted(columns, key=self.column_key) if self.column_key else columns
+
+  def compact(self) -> int:
+    """Rewrites all segments into a single file with the union header, returning how many were folded
+
+    Meant to be run offline (--compact-results), never while a run is writing. The segments to
+    remove are recorded in the sidecar before the merged file replaces the first one, so a crash
+    at any point leaves either the old segments or the merged file, never both.
+    """
+    self.close()
+    if self.segment == 0:
+      return 0
+
+    headers = self.columns()
+    temporary = self._compaction_file()
+    with open(temporary, "w", newline="", encoding="utf-8") as output:
+      writer = csv.writer(output)
+      writer.writerow(headers)
+
+      for path in self.segments():
+        with open(path, "r", newline="", encoding="utf-8") as file:
+          reader = csv.reader(file)
+          positions = {header: index for index, header in enumerate(next(reader, []))}
+          columns = [positions.get(header) for header in headers]
+          for values in reader:
+            writer.writerow([values[index] if index is not None and index < len(values) else 'No results' for index in columns])
+      output.flush()
+      os.fsync(output.fileno())
+
+    folded = self.segment + 1
+    compacting = self.segments()[1:]
+    self._write_schema(compacting=[path.name for path in compacting])
+    os.replace(temporary, self.filename)
+    for path in compacting:
+      path.unlink()
+
+    logger.info("%s result segments compacted into %s", folded, self.filename)
+    self.segment, self.headers, self._columns = 0, headers, set(headers)
+    self._segment_headers = [headers]
+    self._write_schema()
+    return folded
+
+  def adopt(self, staged: Path) -> None:
+    """Moves the segments of another results file (e.g. a staged merge) in as new segments
+
+    Each segment is moved with one rename, so an interrupted call moves the rest when run again.
+    """
+    self.close()
+    staged = Path(staged)
+    schema_file = staged.with_name(f"{staged.stem}.schema.json")
+    if not schema_file.exists():
+      return
+
+    with open(schema_file, "r", encoding="utf-8") as file:
+      staged_segments = json.load(file)["segments"]
+
+    for segment in staged_segments:
+      path = staged.with_name(segment["file"])
+      if not path.exists():
+        continue
+      if path.stat().st_size == 0:
+        path.unlink()
+        continue
+
+      # An empty first segment (a new results file) is replaced rather than followed
+      if self.segment_path(self.segment).stat().st_size > 0:
+        self.segment += 1
+      os.replace(path, self.segment_path(self.segment))
+      self.headers = segment["columns"]
+      self._columns = set(self.headers)
+      self._segment_headers[self.segment:] = [list(self.headers)]
+      self._write_schema()
+
+  def _compaction_file(self) -> Path:
+    return self.filename.with_name(f".{self.filename.name}.compact")
+
+  def _recover_compaction(self) -> None:
+    """Finishes or rolls back a compaction that was interrupted"""
+    if not self.schema_file.exists():
+      return
+
+    with open(self.schema_file, "r", encoding="utf-8") as file:
+      compacting = json.load(file).get("compacting")
+    if compacting is None:
+      return
+
+    temporary = self._compaction_file()
+    if temporary.exists():
+      # The merged file never replaced the first segment, the old segments are intact
+      temporary.unlink()
+    else:
+      for name in compacting:
+        self.filename.with_name(name).unlink(missing_ok=True)
+      logger.info("Interrupted compaction of %s completed", self.filename)
+
+  def _write_schema(self, **extra) -> None:
+    schema = {
+      "columns": self.columns(),
+      "segments": [{"file": path.name, "columns": headers} for path, headers in zip(self.segments(), self._segment_headers)],
+      **extra
+    }
+    temporary = self.schema_file.with_name(f".{self.schema_file.name}.tmp")
+    with open(temporary, "w", encoding="utf-8") as file:
+      json.dump(schema, file, indent=2)
+    os.replace(temporary, self.schema_file)
+
+  def close(self) -> None:
+    if self._file:
+      self._file.close()
+    self._file = None
+    self._writer = None
+
+  def _open(self, headers: List[str]) -> None:
+    self.close()
+
+    if set(headers) != self._columns:
+      # Header changed: start a new segment unless the current one is still empty
+      if self.headers:
+        self.segment += 1
+        logger.info("Results columns changed, rolling to %s", self.segment_path(self.segment))
+      self.headers = sorted(headers, key=self.column_key) if self.column_key else list(headers)
+      self._columns = set(self.headers)
+
+    path = self.segment_path(self.segment)
+    self._file = open(path, "a", newline="", encoding="utf-8")
+    self._writer = csv.writer(self._file)
+
+    if path.stat().st_size == 0:
+      self._writer.writerow(self.headers)
+      self._file.flush()
+      # Only a new segment header changes the sidecar, so it is rewritten once per segment
+      self._segment_headers[self.segment:] = [list(self.headers)]
+      self._write_schema()
+
+  def _latest_segment(self):
+    index = 0
+    while self.segment_path(index + 1).exists():
+      index += 1
+
+    return index, self._read_header(self.segment_path(index))
+
+  @staticmethod
+  def _read_header(path: Path) -> List[str]:
+    with open(path, "r", newline="", encoding="utf-8") as f:
+      return next(csv.reader(f), [])
+
+class JsonLinesResultsHandler:
+  """Append-only JSON-lines writer: one object per URL, values keep their types and columns can vary per row"""
+
+  def __init__(self, filename: str = "scan_results.jsonl", column_key: Optional[Callable] = None,
+               on_flush: Optional[Callable] = None):
+    self.filename = Path(filename)
+    self.column_key = column_key
+    self.on_flush = on_flush
+    self._file = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def write_row(self, row: Dict) -> None:
+    if self._file is None:
+      self._file = open(self.filename, "a", encoding="utf-8")
+
+    if self.column_key:
+      row = {column: row[column] for column in sorted(row, key=self.column_key)}
+    self._file.write(json.dumps(row) + "\n")
+    self._file.flush()
+    if self.on_flush:
+      self.on_flush([row])
+
+  def flush(self) -> None:
+    pass
+
+  def adopt(self, staged: Path) -> None:
+    """Appends another JSON-lines file (e.g. a staged merge) and removes it, safely against crashes"""
+    self.close()
+    append_file(staged, self.filename)
+
+  def close(self) -> None:
+    if self._file:
+      self._file.close()
+    self._file = None
+
+class ParquetResultsHandler:
+  """Parquet writer partitioned by date (directory/date=YYYY-MM-DD/part-*.parquet), needs pyarrow
+
+  Rows are buffered and written as one part file per date once PARQUET_FLUSH_ROWS rows are
+  waiting and on flush(). Score columns are integers and generated_at a timestamp; other columns
+  are strings. Every part carries every column known so far, missing values are nulls, and the
+  dataset schema is kept in _common_metadata and in columns.parquet, an empty file that sorts
+  before the partitions so pq.read_table(directory) picks up columns added by later parts.
+  """
+
+  SCHEMA_FILE = "columns.parquet"
+
+  def __init__(self, filename: str = "scan_results", column_key: Optional[Callable] = None,
+               on_flush: Optional[Callable] = None):
+    try:
+      import pyarrow
+      import pyarrow.parquet
+    except ImportError:
+      raise ConfigurationError("The parquet output format requires pyarrow (pip install pyarrow)")
+
+    self._pa = pyarrow
+    self._pq = pyarrow.parquet
+    self.directory = Path(filename)
+    self.column_key = column_key
+    self.on_flush = on_flush
+    self.flush_rows = settings.PARQUET_FLUSH_ROWS
+    # Part names are unique per writer so several runs and shards can add to the same dataset
+    self._prefix = f"part-{int(time.time())}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    self._parts = 0
+    self._buffers = defaultdict(list)
+    self._buffered = 0
+    self.schema = ResultSchema()
+    for column in self._dataset_columns():
+      self.schema.slot(column)
+    self._published = len(self.schema)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def write_row(self, row: Dict) -> None:
+    generated_at = datetime.fromtimestamp(int(row.get('generated_at') or 0), settings.TIMEZONE)
+    self._buffers[generated_at.strftime("%Y-%m-%d")].append(row)
+    self._buffered += 1
+    for column in row:
+      self.schema.slot(column)
+
+    if self._buffered >= self.flush_rows:
+      self.flush()
+
+  def flush(self) -> None:
+    for date in list(self._buffers):
+      self._flush(date)
+    self._buffered = 0
+
+  def close(self) -> None:
+    self.flush()
+
+  def adopt(self, staged: Path) -> None:
+    """Moves the part files of another dataset (e.g. a staged merge) into this one
+
+    The schema is widened first, then every part is moved with one rename, so an interrupted
+    call moves the rest when run again.
+    """
+    self.flush()
+    staged = Path(staged)
+    metadata = staged / "_common_metadata"
+    if metadata.exists():
+      for column in self._pq.read_schema(metadata).names:
+        self.schema.slot(column)
+    if len(self.schema) > self._published:
+      self._publish_schema()
+
+    for path in sorted(staged.glob("date=*/*.parquet")):
+      partition = self.directory / path.parent.name
+      partition.mkdir(parents=True, exist_ok=True)
+      os.replace(path, partition / path.name)
+
+  def _flush(self, date: str) -> None:
+    rows = self._buffers.pop(date, None)
+    if not rows:
+      return
+
+    if len(self.schema) > self._published:
+      # The schema goes first so a part is never read back with fewer columns than it holds
+      self._publish_schema()
+
+    columns = self.schema.ordered(self.column_key)
+    table = self._pa.table({column: self._column(column, [row.get(column) for row in rows]) for column in columns})
+    partition = self.directory / f"date={date}"
+    partition.mkdir(parents=True, exist_ok=True)
+    path = partition / f"{self._prefix}-{self._parts:05d}.parquet"
+    self._parts += 1
+
+    self._pq.write_table(table, path, compression="zstd")
+    logger.info("%s results written in %s", len(rows), path)
+    if self.on_flush:
+      self.on_flush(rows)
+
+  def _dataset_columns(self) -> List[str]:
+    metadata = self.directory / "_common_metadata"
+    return self._pq.read_schema(metadata).names if metadata.exists() else []
+
+  def _publish_schema(self) -> None:
+    pa = self._pa
+    schema = pa.schema([(column, self._type(column)) for column in self.schema.ordered(self.column_key)])
+    self.directory.mkdir(parents=True, exist_ok=True)
+
+    # Dot-prefixed temporary files are skipped by dataset discovery
+    temporary = self.directory / f".{self.SCHEMA_FILE}.tmp"
+    self._pq.write_table(schema.empty_table(), temporary)
+    os.replace(temporary, self.directory / self.SCHEMA_FILE)
+    temporary = self.directory / "._common_metadata.tmp"
+    self._pq.write_metadata(schema, temporary)
+    os.replace(temporary, self.directory / "_common_metadata")
+    self._published = len(schema)
+
+  def _type(self, column: str):
+    pa = self._pa
+
+    if column == 'generated_at':
+      return pa.timestamp("s", tz=settings.TIMEZONE.zone)
+    if column.endswith('_score'):
+      return pa.int64()
+    return pa.string()
+
+  def _column(self, column: str, values: List):
+    pa = self._pa
+
+    if column == 'generated_at':
+      return pa.array([int(value) if value not in (None, "") else None for value in values], pa.int64()) \
+        .cast(self._type(column))
+    if column.endswith('_score'):
+      return pa.array([_score(value) for value in values], pa.int64())
+    return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+def _score(value) -> Optional[int]:
+  # Engines report scores as numbers, "No results" (or anything else) becomes a null
+  if isinstance(value, bool):
+    return None
+  if isinstance(value, (int, float)):
+    return int(value)
+  if isinstance(value, str) and value.isdigit():
+    return int(value)
+  return None
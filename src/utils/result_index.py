@@ -0,0 +1,147 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import csv
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List
+from src.config.settings import settings
+from src.core.engines import registry
+from src.core.logger import get_logger
+from src.utils.url_normalizer import normalize_url, registrable_domain, url_host
+
+logger = get_logger("index")
+
+class ResultIndex:
+  """Every (engine, URL) result ever written, indexed by URL, registrable domain, engine and time"""
+
+  def __init__(self, path: str = None):
+    self.path = Path(path or settings.RESULT_INDEX_FILE)
+    # Shard processes write to the same index, so writers wait for each other's locks
+    self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+    self._connection.execute("PRAGMA journal_mode=WAL")
+    self._connection.execute("PRAGMA synchronous=NORMAL")
+    self._connection.executescript("""
+      CREATE TABLE IF NOT EXISTS results (
+        url TEXT NOT NULL,
+        host TEXT NOT NULL,
+        domain TEXT NOT NULL,
+        engine TEXT NOT NULL,
+        scan_id TEXT,
+        generated_at INTEGER NOT NULL,
+        data TEXT NOT NULL
+      );
+      CREATE UNIQUE INDEX IF NOT EXISTS results_url ON results (url, engine, generated_at);
+      CREATE INDEX IF NOT EXISTS results_domain ON results (domain, engine, generated_at);
+      CREATE INDEX IF NOT EXISTS results_engine ON results (engine, generated_at);
+      CREATE INDEX IF NOT EXISTS results_generated_at ON results (generated_at);
+    """)
+
+  def add(self, url: str, generated_at: int, scans: List[tuple], replace: bool = True) -> None:
+    """Stores the (engine, scan_id, data) results of one URL in a single transaction"""
+    # Indexed by the normalized form, the one lookups use, whatever spelling the row carries
+    url = normalize_url(url)
+    host = url_host(url)
+    domain = registrable_domain(host)
+    conflict = "DO UPDATE SET scan_id = COALESCE(excluded.scan_id, results.scan_id), data = excluded.data" if replace else "DO NOTHING"
+
+    with self._connection:
+      self._connection.executemany(
+        f"""INSERT INTO results (url, host, domain, engine, scan_id, generated_at, data) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url, engine, generated_at) {conflict}""",
+        [(url, host, domain, engine, scan_id, generated_at, json.dumps(data)) for engine, scan_id, data in scans]
+      )
+
+  def lookup(self, url: str = None, domain: str = None, engine: str = None,
+             since: int = None, limit: int = None) -> Iterator[Dict]:
+    """Yields matching results, newest first. A domain query also matches its subdomains"""
+    clauses, params = [], []
+
+    if url:
+      clauses.append("url = ?")
+      params.append(normalize_url(url))
+    if domain:
+      domain = domain.lower().rstrip(".")
+      clauses.append("domain = ?")
+      params.append(registrable_domain(domain))
+      # A subdomain query narrows the registrable domain match to that host and below
+      if registrable_domain(domain) != domain:
+        clauses.append("(host = ? OR host LIKE ?)")
+        params.extend((domain, f"%.{domain}"))
+    if engine:
+      clauses.append("engine = ?")
+      params.append(engine)
+    if since:
+      clauses.append("generated_at >= ?")
+      params.append(since)
+
+    query = "SELECT url, domain, engine, scan_id, generated_at, data FROM results"
+    if clauses:
+      query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY generated_at DESC"
+    if limit:
+      query += f" LIMIT {int(limit)}"
+
+    for url, domain, engine, scan_id, generated_at, data in self._connection.execute(query, params):
+      yield {
+        "url": url,
+        "domain": domain,
+        "engine": engine,
+        "scan_id": scan_id,
+        "generated_at": generated_at,
+        "data": json.loads(data)
+      }
+
+  def export_csv(self, path: str, **query) -> int:
+    """Writes the results matching a lookup query to a CSV file and returns the row count"""
+    # First pass finds every result column so the header is known before writing
+    columns = set()
+    for result in self.lookup(**query):
+      columns.update(result["data"])
+
+    fields = ["url", "domain", "engine", "scan_id", "generated_at", *sorted(columns)]
+    count = 0
+
+    with open(path, "w", newline="", encoding="utf-8") as file:
+      writer = csv.DictWriter(file, fieldnames=fields, restval="No results")
+      writer.writeheader()
+      for result in self.lookup(**query):
+        data = result.pop("data")
+        writer.writerow({**result, **data})
+        count += 1
+
+    logger.info("%s results exported to %s", count, path)
+    return count
+
+  def import_csv(self, path: str) -> int:
+    """Indexes the rows of an existing scan_results.csv file, returning how many URLs were added"""
+    count = 0
+    prefixes = registry.column_prefixes()
+
+    with open(path, "r", newline="", encoding="utf-8") as file:
+      for row in csv.DictReader(file):
+        url = row.pop("url", "")
+        generated_at = row.pop("generated_at", None)
+        if not url or not generated_at:
+          continue
+
+        scans = {}
+        for column, value in row.items():
+          engine = next((name for prefix, name in prefixes if column.startswith(prefix)), None)
+          if engine and value not in (None, "", "No results"):
+            scans.setdefault(engine, {})[column] = value
+
+        # Rows already indexed by the pipeline keep their scan ids and typed values
+        self.add(url, int(float(generated_at)), [(engine, None, data) for engine, data in scans.items()], replace=False)
+        count += 1
+
+    logger.info("%s URLs from %s indexed", count, path)
+    return count
+
+  def close(self) -> None:
+    self._connection.close()
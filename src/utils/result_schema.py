@@ -0,0 +1,36 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+class ResultSchema:
+  """Union of every result column seen so far; each name is interned once and gets a slot number"""
+
+  def __init__(self):
+    self._slots: Dict[str, int] = {}
+    self._columns: List[str] = []
+    self._lock = threading.Lock()
+
+  def __len__(self) -> int:
+    return len(self._columns)
+
+  def slot(self, column: str) -> int:
+    slot = self._slots.get(column)
+    if slot is None:
+      with self._lock:
+        slot = self._slots.get(column)
+        if slot is None:
+          column = sys.intern(column)
+          slot = self._slots[column] = len(self._columns)
+          self._columns.append(column)
+    return slot
+
+  def ordered(self, column_key: Optional[Callable] = None) -> List[str]:
+    """Every column discovered so far, in a stable order"""
+    return sorted(self._columns, key=column_key) if column_key else list(self._columns)
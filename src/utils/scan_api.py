@@ -0,0 +1,141 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+# Local HTTP API of --serve, over TCP or a Unix socket.
+#
+#   POST /scans      {"urls": [...], "engines": [...]}  queue URLs (engines are optional)
+#   GET  /verdicts?url=URL                              verdict for one URL
+#   POST /verdicts   {"urls": [...]}                    verdicts for several URLs
+#   GET  /health                                        queue and polling stats
+#   GET  /metrics                                       Prometheus text metrics
+
+import json
+import os
+import signal
+import socket
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from ..config.settings import settings
+from ..core.logger import get_logger
+from ..core.metrics import metrics
+from .scan_service import ScanService
+
+logger = get_logger("service")
+
+class ScanAPIHandler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+  service: ScanService = None
+
+  def setup(self):
+    super().setup()
+    if self.connection.family != socket.AF_UNIX:
+      self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+  def address_string(self):
+    return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+  def log_message(self, format, *args):
+    logger.debug("%s - " + format, self.address_string(), *args)
+
+  def do_GET(self):
+    parts = urlsplit(self.path)
+
+    if parts.path == "/health":
+      return self._send(200, self.service.stats())
+    if parts.path == "/metrics":
+      return self._send_text(200, metrics.to_prometheus())
+    if parts.path == "/verdicts":
+      url = parse_qs(parts.query).get("url", [None])[0]
+      if not url:
+        return self._send(400, {"error": "The url query parameter is required"})
+      return self._send(200, self.service.verdict(url))
+
+    self._send(404, {"error": "Not found"})
+
+  def do_POST(self):
+    try:
+      body = self._read_json()
+    except ValueError as e:
+      return self._send(400, {"error": str(e)})
+
+    urls = body.get("urls")
+    if not isinstance(urls, list) or not urls:
+      return self._send(400, {"error": "urls must be a non-empty list"})
+    if len(urls) > settings.SERVE_MAX_REQUEST_URLS:
+      return self._send(413, {"error": f"At most {settings.SERVE_MAX_REQUEST_URLS} URLs per request"})
+
+    if self.path == "/scans":
+      try:
+        return self._send(202, self.service.submit(urls, body.get("engines")))
+      except ValueError as e:
+        return self._send(400, {"error": str(e)})
+    if self.path == "/verdicts":
+      return self._send(200, {"verdicts": [self.service.verdict(str(url)) for url in urls]})
+
+    self._send(404, {"error": "Not found"})
+
+  def _read_json(self) -> dict:
+    length = int(self.headers.get("Content-Length", 0))
+    try:
+      body = json.loads(self.rfile.read(length) or b"{}")
+    except json.JSONDecodeError as e:
+      raise ValueError(f"Invalid JSON body: {e}")
+    if not isinstance(body, dict):
+      raise ValueError("The JSON body must be an object")
+    return body
+
+  def _send(self, status: int, body: dict) -> None:
+    self._write(status, json.dumps(body).encode("utf-8"), "application/json")
+
+  def _send_text(self, status: int, text: str) -> None:
+    self._write(status, text.encode("utf-8"), "text/plain; version=0.0.4")
+
+  def _write(self, status: int, payload: bytes, content_type: str) -> None:
+    self.send_response(status)
+    self.send_header("Content-Type", content_type)
+    self.send_header("Content-Length", str(len(payload)))
+    self.end_headers()
+    self.wfile.write(payload)
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+
+def create_server(service: ScanService, host: str = None, port: int = None, unix_socket: str = None):
+  handler = type("BoundScanAPIHandler", (ScanAPIHandler,), {"service": service})
+
+  if unix_socket:
+    Path(unix_socket).unlink(missing_ok=True)
+    server = ThreadingUnixHTTPServer(unix_socket, handler)
+    # Local tooling only: the socket is not readable by other users
+    os.chmod(unix_socket, 0o600)
+    return server
+
+  server = ThreadingHTTPServer((host or settings.SERVE_HOST, settings.SERVE_PORT if port is None else port), handler)
+  server.daemon_threads = True
+  return server
+
+def serve(scanners, cache, host: str = None, port: int = None, unix_socket: str = None, url_filter=None) -> None:
+  """Runs the scan service and its API until interrupted (Ctrl+C or SIGTERM)"""
+  service = ScanService(scanners, cache, url_filter=url_filter)
+  server = create_server(service, host, port, unix_socket)
+  signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+  service.start()
+  address = unix_socket or f"http://{server.server_address[0]}:{server.server_address[1]}"
+  logger.info("Scan service listening on %s", address)
+
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    logger.info("Scan service stopping")
+  finally:
+    server.server_close()
+    service.stop()
+    if unix_socket:
+      Path(unix_socket).unlink(missing_ok=True)
@@ -0,0 +1,282 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List
+from ..config.settings import settings
+from ..core.logger import get_logger
+from ..core.metrics import metrics
+from .control_journal import PendingScan, PENDING, COMPLETED, ERROR
+from .url_file_processor import URLFileProcessor
+from .url_filter import REASONS
+from .url_normalizer import normalize_url
+
+logger = get_logger("service")
+
+QUEUED = "queued"
+UNKNOWN = "unknown"
+
+class ScanService(URLFileProcessor):
+  """Resident submission/polling engine fed continuously by the --serve API instead of a URLs file
+
+  Submitted URLs are gathered into batches, sent through per-engine pools and polled on the
+  engines' poll profiles. Verdicts live in the verdict cache, so they can be looked up by URL
+  for as long as the cache keeps them.
+  """
+
+  def __init__(self, scanners: Dict, cache, batch_size: int = None, batch_interval: float = None, url_filter=None):
+    super().__init__(scanners, cache=cache, url_filter=url_filter)
+    self.batch_size = batch_size or settings.SERVE_BATCH_SIZE
+    self.batch_interval = settings.SERVE_BATCH_INTERVAL if batch_interval is None else batch_interval
+    self.started_at = time.time()
+    self._incoming = queue.Queue()
+    self._lock = threading.Condition()
+    # (engine, url) -> scan id (None while queued), and the last errors seen
+    self._tracked = {}
+    self._errors = OrderedDict()
+    self._stop = threading.Event()
+    self._executors = {
+      engine: ThreadPoolExecutor(max_workers=self._engine_workers(engine), thread_name_prefix=f"serve-{engine}")
+      for engine in self.scanners
+    }
+    self._threads = [
+      threading.Thread(target=self._run_batches, name="serve-batches", daemon=True),
+      threading.Thread(target=self._run_polls, name="serve-polls", daemon=True)
+    ]
+
+  def start(self) -> None:
+    for thread in self._threads:
+      thread.start()
+
+  def stop(self) -> None:
+    self._stop.set()
+    with self._lock:
+      self._lock.notify_all()
+    for thread in self._threads:
+      thread.join()
+    for executor in self._executors.values():
+      executor.shutdown(wait=True, cancel_futures=True)
+
+  def submit(self, urls: List[str], engines: List[str] = None) -> dict:
+    """Queues URLs for scanning and returns which were accepted and which were rejected
+
+    Raises ValueError when engines is not a list or names an engine the service does not run.
+    """
+    if engines is None:
+      engines = list(self.scanners)
+    elif not isinstance(engines, list) or not engines:
+      raise ValueError("engines must be a non-empty list")
+
+    unknown = [str(engine) for engine in engines if engine not in self.scanners]
+    if unknown:
+      raise ValueError(f"Unknown engines: {', '.join(unknown)}; expected any of {', '.join(self.scanners)}")
+
+    engines = list(dict.fromkeys(engines))
+    accepted, rejected = {}, []
+
+    for url in urls:
+      # The URL is scanned as given; its normalized form is only the key scans are tracked and cached by
+      url = str(url).strip()
+      key = normalize_url(url)
+      reason = self.url_filter.check(url)
+      if reason:
+        metrics.inc("aatt_rejected_urls_total", reason=reason)
+        rejected.append({"url": url, "reason": reason, "error": REASONS[reason]})
+        continue
+
+      with self._lock:
+        new_engines = [engine for engine in engines if (engine, key) not in self._tracked]
+        for engine in new_engines:
+          self._tracked[engine, key] = None
+          self._errors.pop((engine, key), None)
+
+      if new_engines:
+        self._incoming.put((url, key, new_engines))
+      # URLs that only differ before normalization are reported once
+      accepted.setdefault(key, url)
+
+    metrics.set_gauge("aatt_queue_depth", self._incoming.qsize(), stage="submit")
+    return {"accepted": list(accepted.values()), "rejected": rejected}
+
+  def verdict(self, url: str) -> dict:
+    key = normalize_url(url)
+    engines = {}
+
+    for engine in self.scanners:
+      with self._lock:
+        tracked = (engine, key) in self._tracked
+        scan_id = self._tracked.get((engine, key))
+        error = self._errors.get((engine, key))
+
+      if tracked:
+        engines[engine] = {"state": PENDING if scan_id else QUEUED, "scan_id": scan_id}
+      elif error:
+        engines[engine] = {"state": ERROR, "detail": error}
+      else:
+        engines[engine] = self._cached_verdict(engine, key)
+
+    states = {verdict["state"] for verdict in engines.values()}
+    if states == {COMPLETED}:
+      status = COMPLETED
+    elif states & {QUEUED, PENDING}:
+      status = PENDING
+    elif states == {UNKNOWN}:
+      status = UNKNOWN
+    else:
+      status = ERROR if ERROR in states else UNKNOWN
+
+    return {"url": url, "status": status, "engines": engines}
+
+  def stats(self) -> dict:
+    with self._lock:
+      tracked = len(self._tracked)
+      polling = len(self.scheduler)
+
+    return {
+      "status": "ok",
+      "uptime_seconds": round(time.time() - self.started_at, 3),
+      "queued": self._incoming.qsize(),
+      "in_progress": tracked,
+      "polling": polling,
+      "engines": list(self.scanners)
+    }
+
+  def _cached_verdict(self, engine: str, url: str) -> dict:
+    entry = self.cache.get(engine, url)
+    if entry is None or not entry.scan_id:
+      return {"state": UNKNOWN}
+
+    if entry.completed:
+      return {
+        "state": COMPLETED,
+        "scan_id": entry.scan_id,
+        "results": self._scan_data(engine, entry.result, entry.scan_id)
+      }
+
+    # Submitted by an earlier run (or before a restart) and never finished: pick the polling up again
+    self._track(engine, url, entry.scan_id)
+    return {"state": PENDING, "scan_id": entry.scan_id}
+
+  def _run_batches(self) -> None:
+    while not self._stop.is_set():
+      try:
+        batch = [self._incoming.get(timeout=0.5)]
+      except queue.Empty:
+        continue
+
+      deadline = time.monotonic() + self.batch_interval
+      while len(batch) < self.batch_size:
+        try:
+          batch.append(self._incoming.get(timeout=max(0.0, deadline - time.monotonic())))
+        except queue.Empty:
+          break
+
+      metrics.set_gauge("aatt_queue_depth", self._incoming.qsize(), stage="submit")
+      self._submit_batch(batch)
+
+  def _submit_batch(self, batch: List[tuple]) -> None:
+    for url, key, engines in batch:
+      for engine in engines:
+        cached = self.cache.get(engine, key)
+
+        # Cached scans skip the submission entirely, finished ones skip polling too
+        if cached and cached.scan_id:
+          if cached.completed:
+            self._untrack(engine, key)
+          else:
+            self._track(engine, key, cached.scan_id)
+          continue
+
+        future = self._executors[engine].submit(self._submit, engine, self.scanners[engine], url)
+        future.add_done_callback(partial(self._submitted, engine, key))
+
+  def _submitted(self, engine: str, url: str, future) -> None:
+    try:
+      result = future.result()
+      scan_id = result.get('id')
+      self.cache.store_submission(engine, url, result)
+    except Exception as e:
+      logger.error("Error while scanning %s with %s: %s", url, engine, e)
+      self._fail(engine, url, str(e))
+      return
+
+    if result.get('completed', result.get('finished', False)):
+      self.cache.store_result(engine, scan_id, result)
+      metrics.inc("aatt_scans_total", engine=engine, state=COMPLETED)
+      self._untrack(engine, url)
+    elif not scan_id:
+      logger.error("%s returned no scan id for %s", engine, url)
+      self._fail(engine, url, "The engine returned no scan id")
+    else:
+      self._track(engine, url, scan_id)
+
+  def _run_polls(self) -> None:
+    while not self._stop.is_set():
+      with self._lock:
+        self._lock.wait(self.scheduler.time_until_next() if self.scheduler else None)
+        due = self.scheduler.pop_due()
+        metrics.set_gauge("aatt_queue_depth", len(self.scheduler), stage="poll")
+
+      batches = defaultdict(list)
+      for (engine, url, scan_id), attempt in due:
+        batches[engine].append((url, scan_id, attempt))
+
+      for engine, entries in batches.items():
+        if not self._stop.is_set():
+          self._executors[engine].submit(self._poll, engine, entries)
+
+  def _poll(self, engine: str, entries: List[tuple]) -> None:
+    # One batched status call for every due scan of the engine
+    try:
+      with metrics.timer("poll", engine=engine):
+        results = self.scanners[engine].retrieve_scan_statuses([scan_id for _, scan_id, _ in entries])
+    except Exception as e:
+      logger.error("Error verifying state for %s %s scans: %s", len(entries), engine, e)
+      results = {}
+
+    for url, scan_id, attempt in entries:
+      result = results.get(scan_id)
+
+      if result and result.get('completed', result.get('finished', False)):
+        self.cache.store_result(engine, scan_id, result)
+        metrics.inc("aatt_scans_total", engine=engine, state=COMPLETED)
+        self._untrack(engine, url)
+      elif self._polls_exhausted(engine, attempt + 1):
+        logger.error("%s scan %s of %s has no verdict after %s status checks", engine, scan_id, url, attempt + 1)
+        self._fail(engine, url, f"No verdict after {attempt + 1} status checks")
+      else:
+        self._schedule(engine, url, scan_id, attempt + 1)
+
+  def _track(self, engine: str, url: str, scan_id: str) -> None:
+    with self._lock:
+      if self._tracked.get((engine, url)) == scan_id:
+        return
+      self._tracked[engine, url] = scan_id
+    self._schedule(engine, url, scan_id, 0)
+
+  def _schedule(self, engine: str, url: str, scan_id: str, attempt: int) -> None:
+    with self._lock:
+      self.scheduler.schedule(PendingScan(engine, url, scan_id), self._poll_delay(engine, attempt), attempt)
+      self._lock.notify()
+
+  def _untrack(self, engine: str, url: str) -> None:
+    with self._lock:
+      self._tracked.pop((engine, url), None)
+
+  def _fail(self, engine: str, url: str, detail: str) -> None:
+    metrics.inc("aatt_scans_total", engine=engine, state=ERROR)
+    with self._lock:
+      self._tracked.pop((engine, url), None)
+      self._errors[engine, url] = detail
+      # Only the most recent errors are kept; older ones fall back to "unknown"
+      while len(self._errors) > settings.SERVE_ERRORS_LIMIT:
+        self._errors.popitem(last=False)
@@ -0,0 +1,255 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+from pathlib import Path
+from typing import Callable, List
+from ..config.settings import settings
+from ..core.exceptions import ConfigurationError
+from ..core.logger import get_logger, shutdown_logging
+from ..core.metrics import metrics, MetricsExporter
+from .file_handlers import RESULT_FILES, append_file, results_handler
+from .url_file_processor import URLFileProcessor
+from .url_filter import URLFilter
+from .url_grouper import URLGrouper
+
+logger = get_logger("shards")
+
+class ShardedBatchRunner:
+  """Runs the -f pipeline in N processes, each owning one hash partition of the input
+
+  Every shard keeps its own control journal and results under work_dir/shard-I-of-N,
+  so a killed run resumes per shard. Each process gets 1/N of every engine's request
+  budget. Shards write JSON lines so scores keep their types; once all of them finish, their
+  results are merged into results_file in the requested output format, by one process only.
+  With metrics_interval set, every shard exports its metrics and they are added to this process'.
+  """
+
+  def __init__(self, analyzer_factory: Callable, shards: int, results_file: str = None,
+               use_async: bool = False, work_dir: str = None, grouper: URLGrouper = None,
+               output_format: str = None, url_filter: URLFilter = None, metrics_interval: float = None):
+    if shards < 1:
+      raise ConfigurationError("The number of shards must be at least 1")
+
+    self.analyzer_factory = analyzer_factory
+    self.shards = shards
+    self.output_format = output_format or settings.OUTPUT_FORMAT
+    self.results_file = Path(results_file or RESULT_FILES.get(self.output_format, RESULT_FILES["csv"]))
+    self.use_async = use_async
+    self.grouper = grouper
+    self.url_filter = url_filter
+    self.work_dir = Path(work_dir or settings.SHARDS_DIR)
+    self.metrics_interval = metrics_interval
+
+  def shard_dir(self, index: int) -> Path:
+    return self.work_dir / f"shard-{index}-of-{self.shards}"
+
+  def run(self, file_path: str, shard_indexes: List[int] = None) -> None:
+    """Processes the given shards (all of them by default) and merges when every shard is done"""
+    if file_path == "-":
+      raise ConfigurationError("Sharded runs need a file path, stdin cannot be read by several processes")
+
+    indexes = range(self.shards) if shard_indexes is None else shard_indexes
+    processes = []
+
+    for index in indexes:
+      if self._is_done(index):
+        logger.info("Shard %s/%s already completed, skipping it", index + 1, self.shards)
+        continue
+
+      process = multiprocessing.Process(
+        target=run_shard,
+        args=(self.analyzer_factory, file_path, index, self.shards, str(self.shard_dir(index)), self.use_async, self.grouper,
+              self.url_filter, self.metrics_interval),
+        name=f"aatt-shard-{index}"
+      )
+      process.start()
+      processes.append(process)
+
+    failed = []
+    for process in processes:
+      while process.is_alive():
+        process.join(self.metrics_interval)
+        self._collect_metrics()
+      if process.exitcode != 0:
+        failed.append(process.name)
+    self._collect_metrics()
+
+    if failed:
+      raise RuntimeError(f"Shards failed: {', '.join(failed)}; rerun the same command to resume them")
+
+    if all(self._is_done(index) for index in range(self.shards)):
+      self.merge()
+    else:
+      logger.info("Not every shard has finished yet, results will be merged by the last one to complete")
+
+  def merge(self) -> None:
+    # Hosts sharing the work directory may finish their last shards together; only the lock holder merges
+    lock = self.work_dir / "merge.lock"
+    if not self._lock(lock):
+      return
+
+    merged = False
+    try:
+      if all(self._is_done(index) for index in range(self.shards)):
+        self._merge_results()
+        merged = True
+    finally:
+      # A failed merge leaves the shards in place, so the next run can merge them again
+      if not merged:
+        lock.unlink(missing_ok=True)
+    if not merged:
+      return
+
+    shutil.rmtree(self.work_dir, ignore_errors=True)
+    logger.info("%s shards merged into %s", self.shards, self.results_file)
+
+  def _lock(self, lock: Path) -> bool:
+    """Takes the merge lock, replacing one left by a merge process of this host that no longer runs"""
+    for _ in range(2):
+      try:
+        descriptor = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+      except FileNotFoundError:
+        logger.info("Shards were already merged by another process")
+        return False
+      except FileExistsError:
+        if not self._stale(lock):
+          logger.info("Shards are being merged by another process (%s)", lock)
+          return False
+        logger.warning("Removing the merge lock of a process that is no longer running (%s)", lock)
+        lock.unlink(missing_ok=True)
+        continue
+
+      with os.fdopen(descriptor, "w") as file:
+        file.write(f"{socket.gethostname()} {os.getpid()}\n")
+      return True
+
+    return False
+
+  def _stale(self, lock: Path) -> bool:
+    try:
+      host, pid = lock.read_text(encoding="utf-8").split()
+      pid = int(pid)
+    except (OSError, ValueError):
+      # Still being written, or unreadable; treated as held
+      return False
+
+    if host != socket.gethostname():
+      logger.info("The merge lock is held by process %s on %s; remove %s if that process is gone", pid, host, lock)
+      return False
+
+    try:
+      os.kill(pid, 0)
+    except ProcessLookupError:
+      return True
+    except PermissionError:
+      pass
+    return False
+
+  def _merge_results(self) -> None:
+    # Shards are merged into a staging copy that is only moved into place once complete, so an
+    # interrupted merge never leaves part of them in the results; a retry finishes the moves left
+    staging = self.work_dir / "merged"
+    staged = staging / self.results_file.name
+    staged_rejected = staging / "rejected_urls.csv"
+
+    if not (staging / "ready").exists():
+      shutil.rmtree(staging, ignore_errors=True)
+      staging.mkdir(parents=True)
+      self._stage_results(staged)
+      self._stage_rejected(staged_rejected)
+      (staging / "ready").touch()
+
+    with results_handler(self.output_format, self.results_file, URLFileProcessor.column_order) as writer:
+      writer.adopt(staged)
+    append_file(staged_rejected, settings.REJECTED_URLS_FILE, skip_lines=1)
+
+  def _stage_results(self, staged: Path) -> None:
+    # Streams every shard's result segments into one file; nothing is loaded in memory at once
+    with results_handler(self.output_format, staged, URLFileProcessor.column_order) as writer:
+      for index in range(self.shards):
+        for path in sorted(self.shard_dir(index).glob("scan_results*.jsonl")):
+          with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+              writer.write_row(json.loads(line))
+        # Shard directories left by older versions hold CSV segments
+        for path in sorted(self.shard_dir(index).glob("scan_results*.csv")):
+          with open(path, "r", newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+              writer.write_row(row)
+
+  def _stage_rejected(self, staged: Path) -> None:
+    reports = [path for path in (self.shard_dir(index) / "rejected_urls.csv" for index in range(self.shards)) if path.exists()]
+    if not reports:
+      return
+
+    with open(staged, "w", newline="", encoding="utf-8") as output:
+      writer = csv.writer(output)
+      writer.writerow(["url", "reason"])
+      for path in reports:
+        with open(path, "r", newline="", encoding="utf-8") as file:
+          reader = csv.reader(file)
+          next(reader, None)
+          writer.writerows(reader)
+
+  def _collect_metrics(self) -> None:
+    if not self.metrics_interval:
+      return
+
+    for index in range(self.shards):
+      try:
+        metrics.set_source(f"shard-{index}", json.loads((self.shard_dir(index) / "metrics.json").read_text(encoding="utf-8")))
+      except (OSError, ValueError):
+        # Not written yet
+        continue
+
+  def _is_done(self, index: int) -> bool:
+    return (self.shard_dir(index) / "done").exists()
+
+def run_shard(analyzer_factory: Callable, file_path: str, index: int, shards: int, shard_dir: str,
+              use_async: bool, grouper: URLGrouper = None, url_filter: URLFilter = None,
+              metrics_interval: float = None) -> None:
+  # Runs in the child process
+  from .async_url_file_processor import AsyncURLFileProcessor
+
+  shard_dir = Path(shard_dir)
+  shard_dir.mkdir(parents=True, exist_ok=True)
+
+  analyzer = analyzer_factory(rate_scale=1 / shards)
+  processor_class = AsyncURLFileProcessor if use_async else URLFileProcessor
+  processor = processor_class(
+    analyzer.scanners,
+    results_file=shard_dir / "scan_results.jsonl",
+    output_format="jsonl",
+    cache=analyzer.cache,
+    control_file=shard_dir / "urls_control.db",
+    shard=(index, shards),
+    grouper=grouper,
+    url_filter=url_filter,
+    rejected_file=shard_dir / "rejected_urls.csv"
+  )
+
+  exporter = None
+  if metrics_interval:
+    exporter = MetricsExporter(metrics, shard_dir / "metrics.json", metrics_interval, metrics.write_state)
+    exporter.start()
+
+  try:
+    logger.info("Shard %s/%s started", index + 1, shards)
+    processor.process_file(file_path)
+    (shard_dir / "done").touch()
+    logger.info("Shard %s/%s completed", index + 1, shards)
+  finally:
+    if exporter:
+      exporter.stop()
+    # Worker processes end with os._exit, which skips the atexit flush of the log queue
+    shutdown_logging()
@@ -5,26 +5,66 @@
 # GNU GPL3 License
 # =========================================
 
-import csv
+from collections import Counter, defaultdict
 from pathlib import Path
 from typing import List, Dict, Set
-import schedule
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import time
 from datetime import datetime
 import pytz
-from ..core.logger import logger
+from ..config.settings import settings
+from ..core.engines import registry
+from ..core.logger import get_logger
+from ..core.metrics import metrics
+from ..core.poll_scheduler import PollScheduler
+from .control_journal import ControlJournal, PendingScan, PENDING, COMPLETED, FETCHED, ERROR
+from .file_handlers import RESULT_FILES, results_handler
+from .result_index import ResultIndex
+from .url_filter import URLFilter
+from .url_grouper import URLGrouper
+from .url_reader import URLReader
 from ..core.exceptions import ScannerError
 
+logger = get_logger("processor")
+
 class URLFileProcessor:
-  def __init__(self, scanners: Dict, results_file: str = "scan_results.csv"):
+  def __init__(self, scanners: Dict, results_file: str = None, cache=None,
+               control_file: str = "urls_control.db", shard: tuple = None, grouper: URLGrouper = None,
+               output_format: str = None, resume: bool = False, url_filter: URLFilter = None,
+               rejected_file: str = None):
     self.scanners = scanners
-    self.results_file = Path(results_file)
-    self.control_file = Path("urls_control.txt")
+    self.cache = cache
+    self.output_format = output_format or settings.OUTPUT_FORMAT
+    self.results_file = Path(results_file or RESULT_FILES.get(self.output_format, RESULT_FILES["csv"]))
+    self.control_file = Path(control_file)
+    # (index, count) when this processor only handles one hash partition of the input
+    self.shard = shard
+    self.grouper = grouper or URLGrouper()
+    # Validation and allow/deny/benign lists run once per URL, before any engine sees it
+    self.url_filter = url_filter or URLFilter()
+    self.rejected_file = Path(rejected_file or settings.REJECTED_URLS_FILE)
+    # Explicit --resume: the control journal must exist and the input file is optional
+    self.resume = resume
+    self.legacy_control_file = Path("urls_control.txt")
+    self.journal = None
     self.urls = []
-    self.control_urls = []
     self.file_control_check = False
-
-  def process_file(self, file_path: str) -> None:
+    self.results_writer = None
+    self.result_index = None
+    # Scans waiting for a verdict, by next status check; they are the only pending state kept in memory
+    self.scheduler = PollScheduler()
+    # Batched status checks running on the poll pool, handled on the main thread once they return,
+    # and due scans of engines whose previous check has not returned yet
+    self._poll_executor = None
+    self._polls = {}
+    self._due = defaultdict(list)
+    # Submissions in flight plus scans being polled, per engine, to bound how far ahead the input is read
+    self._engine_load = Counter()
+    # Engines still running per URL, and the finished scans waiting for the rest
+    self._outstanding = defaultdict(int)
+    self._finished_scans = defaultdict(list)
+
+  def process_file(self, file_path: str = None) -> None:
     try:
       self._read_urls(file_path)
       self._process_urls()
@@ -32,209 +72,455 @@ class URLFileProcessor:
       self._destroy_file_control()
       logger.info("URLs processment completed successfully")
     except Exception as e:
-      logger.error(f"Error processing file: {str(e)}")
+      logger.error("Error processing file: %s", e)
       raise
+    finally:
+      if self.results_writer:
+        self.results_writer.close()
+      if self.result_index:
+        self.result_index.close()
 
   def _read_urls(self, file_path: str) -> None:
-    try:
-      with open(file_path, 'r', encoding='utf-8') as file:
-        self.urls = [url.strip() for url in file.readlines() if url.strip()]
-      logger.info(f"{len(self.urls)} URLs read from file")
-    except Exception as e:
-      logger.error(f"Error reading URLs file: {str(e)}")
-      raise
+    # URLs are read lazily by the submission stage, "-" reads from stdin
+    if file_path is None and self.resume:
+      # Only the journaled work is left to do
+      self.urls = []
+      return
+
+    if file_path != "-" and not Path(file_path).is_file():
+      logger.error("Error reading URLs file: %s not found", file_path)
+      raise FileNotFoundError(file_path)
+
+    if not self.grouper.enabled:
+      self.urls = self.url_filter.accepted(URLReader(file_path, self.shard), self.rejected_file)
+      return
+
+    # Whole groups go to the same shard so each group is only scanned once
+    reader = self.url_filter.accepted(URLReader(file_path, self.shard, self.grouper.key), self.rejected_file)
+    self.urls = self.grouper.scanned(reader, lambda url, leader: self.journal.add_follower(url, leader))
 
   def _process_urls(self) -> None:
     logger.info("Starting URLs processment...")
-    self._initialize_control_file()
-    schedule.every(1).minutes.do(self._check_scan_status)
+    # One status check per engine can run at once, so every registered engine adds requests but no wall-clock time
+    self._poll_executor = ThreadPoolExecutor(max_workers=len(self.scanners), thread_name_prefix="poll")
+
+    try:
+      # Scans are polled while the input is still being submitted; this drains what is left
+      self._initialize_control_file()
 
-    while not self.file_control_check:
-      schedule.run_pending()
-      time.sleep(1)
+      while self.scheduler or self._polls:
+        self._wait_for_progress({})
+    finally:
+      self._poll_executor.shutdown(wait=True, cancel_futures=True)
+
+    metrics.set_gauge("aatt_queue_depth", 0, stage="poll")
+
+    self.file_control_check = True
 
   def _initialize_control_file(self) -> None:
-    if not self.control_file.exists() or self.control_file.stat().st_size == 0:
-      self._create_new_control_file()
-    else:
-      self._read_control_file()
+    resuming = self._open_journal()
+    if resuming:
+      for entry in self._read_control_file():
+        self._schedule_poll(entry)
 
-  def _create_new_control_file(self) -> None:
-    with open(self.control_file, 'w', encoding='utf-8') as file:
-      writer = csv.writer(file)
+    # When resuming, URLs of the input that already have journaled scans are not submitted again
+    self._create_new_control_file(resuming)
 
-      for url in self.urls:
-        for engine_name, scanner in self.scanners.items():
-          try:
-            result = scanner.scan_url(url)
-            scan_id = result.get('id')
-            completed = result.get('completed', result.get('finished', False))
-            writer.writerow([engine_name, url, scan_id, completed])
-            self.control_urls.append([engine_name, url, scan_id, completed])
-          except Exception as e:
-            logger.error(f"Error while scanning {url} with {engine_name}: {str(e)}")
-            writer.writerow([engine_name, url, "error", str(e)])
-
-  def _read_control_file(self) -> None:
-    self.control_urls = []
-
-    with open(self.control_file, 'r', encoding='utf-8') as file:
-      reader = csv.reader(file)
-
-      for row in reader:
-        if len(row) == 4:
-          engine, url, scan_id, state = row
-          state = state.lower() == 'true'
-          self.control_urls.append([engine, url, scan_id, state])
-
-  def _check_scan_status(self) -> None:
-    updated_control_urls = []
-    all_completed = True
-
-    with open(self.control_file, 'w', encoding='utf-8') as file:
-      writer = csv.writer(file)
-
-      for entry in self.control_urls:
-        engine, url, scan_id, state = entry
-
-        if not state and scan_id != "error":
-          try:
-            result = self.scanners[engine].retrieve_scan_results(scan_id)
-            state = result.get('completed', result.get('finished', False))
-          except Exception as e:
-            logger.error(f"Error verifying state for {url}: {str(e)}")
-            state = False
-
-        writer.writerow([engine, url, scan_id, state])
-        updated_control_urls.append([engine, url, scan_id, state])
-        all_completed = all_completed and state
-
-    self.control_urls = updated_control_urls
-
-    if all_completed:
-      self.file_control_check = True
-      return schedule.CancelJob
-
-  def _extract_scan_data(self, engine: str, result: Dict, scan_id: str = None) -> Dict:
-    """Extracts and formats scan results from different engines into a standardized format"""
-    data = {}
-
-    if engine == 'RecordedFuture':
-      if isinstance(result, dict):
-        tasks = result.get('tasks', {})
-        for task_id, task_data in tasks.items():
-          if isinstance(task_data, dict):
-            # Verify that the task_id starts with the provided scan_id
-            if scan_id and not task_id.startswith(scan_id):
-              continue
-
-            status = task_data.get('status', 'No results')
-            score = task_data.get('score', 'No results')
-            # Extract the engine name from the task_id
-            engine_name = task_id.split('-')[-1]
-            data[f'rf_{engine_name}'] = status
-            data[f'rf_{engine_name}_score'] = score
-        # If there are no tasks, add empty columns for RecordedFuture
-        if not tasks:
-          data['rf_behavioral1'] = 'No results'
-          data['rf_behavioral1_score'] = 'No results'
-          data['rf_static1'] = 'No results'
-          data['rf_static1_score'] = 'No results'
-          data['rf_urlscan1'] = 'No results'
-          data['rf_urlscan1_score'] = 'No results'
-    else:  # HybridAnalysis
-      scanners = result.get('scanners_v2', {})
-      for scanner_name, scanner_data in scanners.items():
-        if isinstance(scanner_data, dict):
-          data[f'ha_{scanner_name}'] = scanner_data.get('status', 'No results')
-        else:
-          data[f'ha_{scanner_name}'] = scanner_data
+  def _open_journal(self) -> bool:
+    """Opens the control journal, returning True when there is a previous run to resume"""
+    if self.resume and not self.control_file.exists() and not self.legacy_control_file.exists():
+      raise FileNotFoundError(f"There is no interrupted run to resume in {self.control_file}")
 
-    return data
+    self.journal = ControlJournal(self.control_file)
 
-  def _generate_results(self) -> None:
-    # Dictionary to store results grouped by URL
-    url_results = {}
+    if self.legacy_control_file.exists():
+      self.journal.import_legacy(self.legacy_control_file)
+      self.legacy_control_file.unlink()
 
-    # Process RecordedFutureResults
-    for entry in self.control_urls:
-      engine, url, scan_id, state = entry
-      if engine == 'RecordedFuture' and state and scan_id != "error":
-        try:
-          result = self.scanners[engine].retrieve_scan_results(scan_id)
-          scan_data = self._extract_scan_data(engine, result, scan_id)
-          if url not in url_results:
-            url_results[url] = {
-              'url': url,
-              'generated_at': int(datetime.now(pytz.timezone("America/Mexico_City")).timestamp())
-            }
-          url_results[url].update(scan_data)
-        except Exception as e:
-          logger.error(f"Error processing RecordedFuture results for {url}: {str(e)}")
+    return self.journal.has_entries()
+
+  def _create_new_control_file(self, resuming: bool = False) -> None:
+    # One pool per engine so each engine gets its own concurrency limit
+    executors = {
+      engine_name: ThreadPoolExecutor(
+        max_workers=self._engine_workers(engine_name),
+        thread_name_prefix=f"submit-{engine_name}"
+      )
+      for engine_name in self.scanners
+    }
+
+    try:
+      futures = {}
+      # Bounded window so the input is consumed only as fast as the pools can submit it
+      window = 2 * sum(self._engine_workers(engine_name) for engine_name in self.scanners)
+
+      for url in self.urls:
+        engines = self._unsubmitted_engines(url) if resuming else self.scanners
+        if not engines:
+          continue
+        self._outstanding[url] += len(engines)
+
+        for engine_name in engines:
+          # Backpressure: the input is only read further once the engine has room for another scan
+          self._wait_for_capacity(engine_name, futures)
+          scanner = self.scanners[engine_name]
+          cached = self.cache.get(engine_name, url) if self.cache else None
+
+          # Cached scans skip the submission entirely, finished ones skip polling too
+          if cached and cached.scan_id:
+            self._record_submission(engine_name, url, cached.scan_id, cached.completed, cached.result)
+            continue
+
+          future = executors[engine_name].submit(self._submit, engine_name, scanner, url)
+          futures[future] = (engine_name, url)
+          self._engine_load[engine_name] += 1
+
+        metrics.set_gauge("aatt_queue_depth", len(futures), stage="submit")
+        if len(futures) >= window:
+          done, _ = wait(futures, return_when=FIRST_COMPLETED)
+          self._collect_submissions(done, futures)
+        self._poll_due()
+
+      if futures:
+        done, _ = wait(futures)
+        self._collect_submissions(done, futures)
+      metrics.set_gauge("aatt_queue_depth", 0, stage="submit")
+    finally:
+      for executor in executors.values():
+        executor.shutdown(wait=True, cancel_futures=True)
+
+  def _wait_for_capacity(self, engine: str, futures: Dict) -> None:
+    limit = self._engine_max_outstanding(engine)
+
+    while self._engine_load[engine] >= limit:
+      # Submissions finishing move scans to polling (or fail them), only verdicts free a slot
+      self._wait_for_progress(futures)
+
+  def _wait_for_progress(self, futures: Dict) -> None:
+    """Blocks until a submission or a status check returns or the next scan is due, and handles it"""
+    timeout = self.scheduler.time_until_next() if self.scheduler else None
+    running = [*futures, *self._polls]
+
+    if running:
+      done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+      self._collect_submissions({future for future in done if future in futures}, futures)
+    elif timeout:
+      time.sleep(timeout)
+    self._poll_due()
+
+  def _submit(self, engine: str, scanner, url: str) -> Dict:
+    with metrics.timer("submit", engine=engine):
+      return scanner.scan_url(url, validate=False)
+
+  def _collect_submissions(self, done: Set, futures: Dict) -> None:
+    # Results are journaled as they arrive, so a crash keeps every scan id received so far
+    with self.journal.batch():
+      for future in done:
+        engine_name, url = futures.pop(future)
+        self._engine_load[engine_name] -= 1
 
-    # Process HybridAnalysis results
-    for entry in self.control_urls:
-      engine, url, scan_id, state = entry
-      if engine == 'HybridAnalysis' and state and scan_id != "error":
         try:
-          result = self.scanners[engine].retrieve_scan_results(scan_id)
-          scan_data = self._extract_scan_data(engine, result)
-
-          if url not in url_results:
-            url_results[url] = {
-              'url': url,
-              'generated_at': int(datetime.now(pytz.timezone("America/Mexico_City")).timestamp())
-            }
-          url_results[url].update(scan_data)
+          result = future.result()
         except Exception as e:
-          logger.error(f"Error processing HybridAnalysis results for {url}: {str(e)}")
+          logger.error("Error while scanning %s with %s: %s", url, engine_name, e)
+          self._fail_scan(engine_name, url, None, str(e))
+          continue
+
+        scan_id = result.get('id')
+        completed = result.get('completed', result.get('finished', False))
+        if self.cache and scan_id:
+          self.cache.store_submission(engine_name, url, result)
+          if completed:
+            self.cache.store_result(engine_name, scan_id, result)
+        # A submission that comes back finished already carries its verdict, so it is not fetched again
+        self._record_submission(engine_name, url, scan_id, completed, result if completed else None)
+
+  def _unsubmitted_engines(self, url: str) -> List[str]:
+    journaled = self.journal.engines(url)
+    engines = [engine for engine in self.scanners if engine not in journaled]
+
+    # A URL cut off halfway through its submissions keeps the scans that did finish in its row
+    if engines and journaled and url not in self._outstanding:
+      self._finished_scans[url].extend(self.journal.completed_scans(url))
+    return engines
+
+  def _record_submission(self, engine: str, url: str, scan_id: str, completed: bool, result: Dict = None) -> None:
+    if not completed and not scan_id:
+      # There is nothing to poll, so the scan fails like one whose submission was refused
+      logger.error("%s returned no scan id for %s", engine, url)
+      self._fail_scan(engine, url, None, "The engine returned no scan id")
+      return
+
+    if completed and result is not None:
+      if self._checkpoint_result(engine, url, scan_id, result):
+        self._scan_finished(url, engine, scan_id)
+      return
+
+    self.journal.record(engine, url, scan_id, COMPLETED if completed else PENDING)
+    if completed:
+      self._scan_finished(url, engine, scan_id)
+    else:
+      self._schedule_poll(PendingScan(engine, url, scan_id))
+
+  def _schedule_poll(self, entry: PendingScan) -> None:
+    self.scheduler.schedule(entry, self._poll_delay(entry.engine, 0))
+    self._engine_load[entry.engine] += 1
+
+  def _fail_scan(self, engine: str, url: str, scan_id: str, detail: str) -> None:
+    # Failed scans are journaled so a later run submits them again
+    self.journal.record(engine, url, scan_id, ERROR, detail)
+    metrics.inc("aatt_scans_total", engine=engine, state=ERROR)
+    self._scan_finished(url)
+
+  def _scan_finished(self, url: str, engine: str = None, scan_id: str = None) -> None:
+    # Failed scans only count down; the row is written once every engine is done with the URL
+    if scan_id:
+      self._finished_scans[url].append((engine, scan_id))
+
+    self._outstanding[url] -= 1
+    if self._outstanding[url] <= 0:
+      del self._outstanding[url]
+      self._write_url_results(url, self._finished_scans.pop(url, []))
+
+  def _engine_workers(self, engine: str) -> int:
+    return max(1, int(registry.get(engine).max_workers or settings.SUBMIT_WORKERS))
+
+  def _engine_max_outstanding(self, engine: str) -> int:
+    return max(1, int(registry.get(engine).max_outstanding or settings.MAX_OUTSTANDING_SCANS))
+
+  def _read_control_file(self) -> List[PendingScan]:
+    # Resuming: reclaim space from the previous run and reload only unfinished scans
+    self.journal.compact()
+    progress = self.journal.progress()
+    pending = self.journal.pending()
+
+    for entry in pending:
+      self._outstanding[entry.url] += 1
+
+    # Scans finished before the restart are merged with the ones still running for the same URL
+    for url in self._outstanding:
+      self._finished_scans[url].extend(self.journal.completed_scans(url))
+
+    logger.info("Resuming with %s pending scans (%s)", len(pending),
+                ", ".join(f"{count} {state}" for state, count in sorted(progress.items())))
+    return pending
+
+  def _poll_due(self) -> None:
+    # Status checks run on the poll pool, so submission keeps reading the input while engines answer
+    self._collect_polls([future for future in self._polls if future.done()])
+
+    for entry, attempt in self.scheduler.pop_due():
+      self._due[entry.engine].append((entry, attempt))
+
+    # One batched status call per engine instead of a request per pending scan; scans falling due
+    # while an engine's check runs join its next batch
+    polling = {engine for engine, _ in self._polls.values()}
+    for engine in [engine for engine in self._due if engine not in polling]:
+      entries = self._due.pop(engine)
+      self._polls[self._poll_executor.submit(self._retrieve_statuses, engine, entries)] = (engine, entries)
+
+    metrics.set_gauge("aatt_queue_depth", len(self.scheduler), stage="poll")
+
+  def _collect_polls(self, done: List) -> None:
+    for future in done:
+      engine, entries = self._polls.pop(future)
+      results = future.result()
+
+      with self.journal.batch():
+        for entry, attempt in entries:
+          _, url, scan_id = entry
+          result = results.get(scan_id)
+
+          if result and result.get('completed', result.get('finished', False)):
+            # The verdict is journaled (and written once the URL's other engines finish) and the entry dropped
+            self._engine_load[engine] -= 1
+            self._complete_scan(engine, url, scan_id, result)
+          elif self._polls_exhausted(engine, attempt + 1):
+            self._engine_load[engine] -= 1
+            self._expire_scan(engine, url, scan_id, attempt + 1)
+          else:
+            self.scheduler.schedule(entry, self._poll_delay(engine, attempt + 1), attempt + 1)
+
+  def _retrieve_statuses(self, engine: str, entries: List[tuple]) -> Dict[str, Dict]:
+    try:
+      with metrics.timer("poll", engine=engine):
+        return self.scanners[engine].retrieve_scan_statuses([entry.scan_id for entry, _ in entries])
+    except Exception as e:
+      logger.error("Error verifying state for %s %s scans: %s", len(entries), engine, e)
+      return {}
+
+  def _complete_scan(self, engine: str, url: str, scan_id: str, result: Dict) -> None:
+    if not self._checkpoint_result(engine, url, scan_id, result):
+      return
+    metrics.inc("aatt_scans_total", engine=engine, state=COMPLETED)
+    if self.cache:
+      self.cache.store_result(engine, scan_id, result)
+    self._scan_finished(url, engine, scan_id)
+
+  def _expire_scan(self, engine: str, url: str, scan_id: str, attempts: int) -> None:
+    logger.error("%s scan %s of %s has no verdict after %s status checks", engine, scan_id, url, attempts)
+    self._fail_scan(engine, url, scan_id, f"No verdict after {attempts} status checks")
 
-    # Convert dictionary to list for writing
-    results_data = list(url_results.values())
+  def _poll_delay(self, engine: str, attempt: int) -> float:
+    # First check after the engine's typical completion time, then back off geometrically
+    profile = self._poll_profile(engine)
 
-    # Define the order of columns
-    base_headers = ['url', 'generated_at']
-    ha_headers = sorted([h for h in url_results[next(iter(url_results))].keys() if h.startswith('ha_')])
-    rf_headers = sorted([h for h in url_results[next(iter(url_results))].keys() if h.startswith('rf_')])
+    if attempt == 0:
+      return profile['initial_delay']
 
-    # Combine headers in desired order
-    headers = base_headers + ha_headers + rf_headers
+    return min(profile['max_interval'], profile['interval'] * profile['backoff'] ** (attempt - 1))
 
-    self._write_results(results_data, headers)
+  def _polls_exhausted(self, engine: str, attempts: int) -> bool:
+    # A scan the engine never finishes (or forgot) must not be polled forever
+    return attempts >= self._poll_profile(engine)['max_attempts']
 
-  def _write_results(self, results: List[Dict], headers: List[str]) -> None:
+  def _poll_profile(self, engine: str) -> Dict:
+    return {**settings.POLL_PROFILE, **registry.get(engine).poll_profile}
+
+  def _generate_results(self) -> None:
+    # Rows are streamed as URLs finish; this only picks up URLs left complete but unwritten by a previous run
+    while True:
+      # Buffered rows are only marked written once they reach the file
+      if self.results_writer:
+        self.results_writer.flush()
+
+      urls = self.journal.completed_urls()
+      if not urls:
+        break
+
+      for url in urls:
+        self._write_url_results(url, self.journal.completed_scans(url))
+
+    self._write_follower_results()
+    logger.info("Results written in %s", self.results_file)
+
+  def _write_follower_results(self) -> None:
+    # Grouped URLs that were not scanned get their representative's latest results
+    skipped = 0
+
+    while True:
+      followers = self.journal.unwritten_followers()
+      if not followers:
+        break
+
+      self._open_results()
+      representatives = {}
+      missing = []
+
+      for url, leader in followers:
+        if leader not in representatives:
+          latest = {}
+          for result in self.result_index.lookup(url=leader):
+            latest.setdefault(result['engine'], result)
+          representatives[leader] = list(latest.values())
+
+        results = representatives[leader]
+        if not results:
+          missing.append(url)
+          continue
+
+        row = {'url': url, 'generated_at': int(datetime.now(pytz.timezone("America/Mexico_City")).timestamp())}
+        for result in results:
+          row.update(result['data'])
+        self.results_writer.write_row(row)
+        self.result_index.add(url, row['generated_at'], [(r['engine'], r['scan_id'], r['data']) for r in results])
+
+      self.results_writer.flush()
+      self.journal.mark_written(missing)
+      skipped += len(missing)
+
+    if skipped:
+      logger.warning("%s grouped URLs have no results because their representative failed", skipped)
+
+  def _open_results(self) -> None:
+    if self.results_writer is None:
+      self.results_writer = results_handler(self.output_format, self.results_file, self.column_order, self._rows_flushed)
+      self.result_index = ResultIndex()
+
+  def _write_url_results(self, url: str, scans: List[tuple]) -> None:
+    row = {
+      'url': url,
+      'generated_at': int(datetime.now(pytz.timezone("America/Mexico_City")).timestamp())
+    }
+
+    indexed = []
+
+    for engine, scan_id in scans:
+      try:
+        data = self._scan_columns(engine, url, scan_id)
+        row.update(data)
+        indexed.append((engine, scan_id, data))
+      except Exception as e:
+        logger.error("Error processing %s results for %s: %s", engine, url, e)
+
+    if len(row) > 2:
+      self._open_results()
+      self.results_writer.write_row(row)
+      self.result_index.add(url, row['generated_at'], indexed)
+    else:
+      self.journal.mark_written([url])
+
+  def _rows_flushed(self, rows: List[Dict]) -> None:
+    self.journal.mark_written([row['url'] for row in rows])
+
+  @staticmethod
+  def column_order(header: str) -> tuple:
+    # url and generated_at first, then each engine's columns alphabetically, engines in registry order
+    if header in ('url', 'generated_at'):
+      return (0, ('url', 'generated_at').index(header), '')
+    prefixes = registry.column_prefixes()
+    for position, (prefix, _) in enumerate(prefixes, 1):
+      if header.startswith(prefix):
+        return (position, 0, header)
+    return (len(prefixes) + 1, 0, header)
+
+  def _scan_columns(self, engine: str, url: str, scan_id: str) -> Dict:
+    # The journal is the only store of finished verdicts: rows are built from the columns checkpointed
+    # there, this run's and those of a run before a restart alike
+    checkpointed = self.journal.fetched(engine, url)
+    if checkpointed is not None:
+      return checkpointed
+
+    data = self._scan_data(engine, self._fetch_scan_results(engine, scan_id), scan_id)
+    self.journal.record(engine, url, scan_id, FETCHED, data=data)
+    return data
+
+  def _scan_data(self, engine: str, result: Dict, scan_id: str) -> Dict:
+    # Each engine declares the extractor that turns its payloads into result columns
+    return registry.get(engine).extract(result, scan_id)
+
+  def _checkpoint_result(self, engine: str, url: str, scan_id: str, result: Dict) -> bool:
+    """Journals the columns of a finished scan, or fails the scan when its payload cannot be read"""
+    # The extracted columns are journaled with the state change until the URL's other engines finish,
+    # so a restart never fetches them again; the raw payload is not kept
     try:
-      # Read the file if it exists
-      existing_data = []
-      if self.results_file.exists() and self.results_file.stat().st_size > 0:
-        with open(self.results_file, 'r', newline='', encoding='utf-8') as file:
-          reader = csv.DictReader(file)
-          existing_data = list(reader)
-
-      # Combine existing data with new results
-      all_results = existing_data + results
-
-      # Write all results
-      with open(self.results_file, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=headers)
-        writer.writeheader()
-
-        for row in all_results:
-          row_data = {header: row.get(header, 'No results') for header in headers}
-          writer.writerow(row_data)
-
-      logger.info(f"Results written in {self.results_file}")
+      data = self._scan_data(engine, result, scan_id)
     except Exception as e:
-      logger.error(f"Error writing results: {str(e)}")
-      raise
+      logger.error("Error processing %s results for %s: %s", engine, url, e)
+      self._fail_scan(engine, url, scan_id, f"Unreadable results: {e}")
+      return False
+
+    self.journal.record(engine, url, scan_id, FETCHED, data=data)
+    return True
+
+  def _fetch_scan_results(self, engine: str, scan_id: str) -> Dict:
+    cached = self.cache.get_result(engine, scan_id) if self.cache else None
+    if cached is not None:
+      return cached
+
+    with metrics.timer("fetch", engine=engine):
+      result = self.scanners[engine].retrieve_scan_results(scan_id)
+    if self.cache:
+      self.cache.store_result(engine, scan_id, result)
+    return result
 
   def _destroy_file_control(self) -> None:
     try:
       if self.control_file.exists():
-        self.control_file.unlink()
-        logger.info(f"Control file deleted successfully")
+        self.journal.destroy()
+        logger.info("Control file deleted successfully")
       else:
-        logger.warning(f"File control not found or doesn't exist.")
+        logger.warning("File control not found or doesn't exist.")
     except Exception as e:
-      logger.error(f"An error ocurred while eliminating control file: {str(e)}")
-      raise
\ No newline at end of file
+      logger.error("An error ocurred while eliminating control file: %s", e)
+      raise
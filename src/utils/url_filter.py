@@ -0,0 +1,181 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import csv
+import ipaddress
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from src.config.settings import settings
+from src.core.logger import get_logger
+from src.core.metrics import metrics
+from src.core.url_validation import is_valid_url
+from src.utils.url_normalizer import url_host
+
+logger = get_logger("filter")
+
+INVALID = "invalid"
+NOT_ALLOWED = "not_allowed"
+DENIED = "denied"
+BENIGN = "benign"
+
+REASONS = {
+  INVALID: "Invalid URL",
+  NOT_ALLOWED: "Host is not in the allow list",
+  DENIED: "Host is in the deny list",
+  BENIGN: "Known benign domain"
+}
+
+class SuffixTrie:
+  """Hostname suffixes stored label by label from the TLD down; a lookup is one walk over the host's labels"""
+
+  _END = ""
+
+  def __init__(self):
+    self._root = {}
+    self._size = 0
+
+  def __len__(self) -> int:
+    return self._size
+
+  def add(self, suffix: str) -> None:
+    node = self._root
+    for label in reversed(suffix.lower().strip(".").split(".")):
+      node = node.setdefault(label, {})
+
+    if self._END not in node:
+      node[self._END] = True
+      self._size += 1
+
+  def match(self, host: str) -> bool:
+    """True when the host is one of the suffixes or a subdomain of one"""
+    node = self._root
+    for label in reversed(host.split(".")):
+      node = node.get(label)
+      if node is None:
+        return False
+      if self._END in node:
+        return True
+    return False
+
+class CIDRSet:
+  """IP networks grouped by version and prefix length; a lookup is one set probe per group"""
+
+  def __init__(self):
+    self._networks = {}
+
+  def __len__(self) -> int:
+    return sum(len(networks) for networks in self._networks.values())
+
+  def add(self, cidr: str) -> None:
+    network = ipaddress.ip_network(cidr, strict=False)
+    key = (network.version, network.prefixlen)
+    self._networks.setdefault(key, set()).add(int(network.network_address) >> (network.max_prefixlen - network.prefixlen))
+
+  def match(self, address) -> bool:
+    value = int(address)
+    return any(
+      value >> (address.max_prefixlen - prefixlen) in networks
+      for (version, prefixlen), networks in self._networks.items()
+      if version == address.version
+    )
+
+class HostList:
+  """Hostname suffixes and CIDR blocks read from a file, one per line; # starts a comment"""
+
+  def __init__(self, path: str = None):
+    self.path = path
+    self.suffixes = SuffixTrie()
+    self.networks = CIDRSet()
+
+    if path:
+      self.load(path)
+
+  def __len__(self) -> int:
+    return len(self.suffixes) + len(self.networks)
+
+  def add(self, entry: str) -> None:
+    try:
+      self.networks.add(entry)
+    except ValueError:
+      self.suffixes.add(entry)
+
+  def load(self, path: str) -> None:
+    with open(path, "r", encoding="utf-8") as file:
+      for line in file:
+        entry = line.split("#", 1)[0].strip()
+        if entry:
+          self.add(entry)
+
+    logger.info("%s entries loaded from %s", len(self), path)
+
+  def match(self, host: str, address=None) -> bool:
+    if address is not None:
+      return self.networks.match(address)
+    return self.suffixes.match(host)
+
+class URLFilter:
+  """Pre-submission stage: validates every URL once and applies the allow, deny and benign lists
+
+  Rejected URLs never reach the engines; they are counted by reason and listed with it in a
+  CSV report so they can be reviewed separately.
+  """
+
+  def __init__(self, allow_file: str = None, deny_file: str = None, benign_file: str = None):
+    self.allow = HostList(allow_file or settings.URL_ALLOW_FILE)
+    self.deny = HostList(deny_file or settings.URL_DENY_FILE)
+    self.benign = HostList(benign_file or settings.URL_BENIGN_FILE)
+
+  def check(self, url: str) -> Optional[str]:
+    """Returns why a URL is rejected, or None when it should be scanned"""
+    if not is_valid_url(url):
+      return INVALID
+
+    if not (self.allow or self.deny or self.benign):
+      return None
+
+    host = url_host(url).lower()
+    try:
+      address = ipaddress.ip_address(host)
+    except ValueError:
+      address = None
+
+    if self.allow and not self.allow.match(host, address):
+      return NOT_ALLOWED
+    if self.deny.match(host, address):
+      return DENIED
+    if self.benign.match(host, address):
+      return BENIGN
+    return None
+
+  def accepted(self, urls: Iterable[str], report_file: str = None) -> Iterator[str]:
+    """Yields the URLs that pass, appending the rejected ones to report_file"""
+    report_file = Path(report_file or settings.REJECTED_URLS_FILE)
+    report = None
+    rejected = 0
+
+    try:
+      for url in urls:
+        reason = self.check(url)
+        if reason is None:
+          yield url
+          continue
+
+        if report is None:
+          new_file = not report_file.exists() or report_file.stat().st_size == 0
+          report = open(report_file, "a", newline="", encoding="utf-8")
+          writer = csv.writer(report)
+          if new_file:
+            writer.writerow(["url", "reason"])
+
+        writer.writerow([url, reason])
+        metrics.inc("aatt_rejected_urls_total", reason=reason)
+        rejected += 1
+    finally:
+      if report:
+        report.close()
+      if rejected:
+        logger.info("%s URLs rejected before submission, listed in %s", rejected, report_file)
@@ -0,0 +1,73 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+from typing import Callable, Iterable, Iterator
+from src.config.settings import settings
+from src.core.exceptions import ConfigurationError
+from src.core.metrics import metrics
+from src.utils.url_normalizer import registrable_domain, url_host
+
+POLICIES = ("all", "one", "k")
+KEYS = ("host", "domain")
+
+class URLGrouper:
+  """Groups input URLs by host or registrable domain and picks which of them are scanned
+
+  "all" scans every URL, "one" only the first URL seen per group and "k" the first
+  per_group URLs. The rest become followers of the group's first representative and
+  get its results in the output instead of being scanned.
+  """
+
+  def __init__(self, policy: str = None, per_group: int = None, key: str = None):
+    self.policy = policy or settings.GROUPING_POLICY
+    self.per_group = 1 if self.policy == "one" else (per_group or settings.GROUPING_PER_GROUP)
+    self.key_name = key or settings.GROUPING_KEY
+
+    if self.policy not in POLICIES:
+      raise ConfigurationError(f"Unknown grouping policy {self.policy}, expected one of {', '.join(POLICIES)}")
+    if self.key_name not in KEYS:
+      raise ConfigurationError(f"Unknown grouping key {self.key_name}, expected one of {', '.join(KEYS)}")
+
+    # group key -> (first representative, representatives so far); one entry per group, not per URL
+    self._groups = {}
+
+  @property
+  def enabled(self) -> bool:
+    return self.policy != "all"
+
+  def key(self, url: str) -> str:
+    host = url_host(url) or url
+    return registrable_domain(host) if self.key_name == "domain" else host
+
+  def representative(self, url: str):
+    """Returns the URL whose results this one should reuse, or None if it has to be scanned"""
+    if not self.enabled:
+      return None
+
+    key = self.key(url)
+    group = self._groups.get(key)
+
+    if group is None:
+      self._groups[key] = (url, 1)
+      return None
+
+    leader, scanned = group
+    if scanned < self.per_group:
+      self._groups[key] = (leader, scanned + 1)
+      return None
+
+    return leader
+
+  def scanned(self, urls: Iterable[str], on_follower: Callable[[str, str], None]) -> Iterator[str]:
+    """Yields the URLs to scan, handing every skipped one to on_follower(url, representative)"""
+    for url in urls:
+      leader = self.representative(url)
+      if leader is None:
+        yield url
+      else:
+        metrics.inc("aatt_grouped_urls_total", key=self.key_name)
+        on_follower(url, leader)
@@ -0,0 +1,61 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Second-level labels that act as public suffixes under a country code (example.com.mx, example.co.uk).
+# Not the full Public Suffix List, but it covers the registries we see in feeds
+COUNTRY_SECOND_LEVELS = frozenset({"ac", "co", "com", "edu", "gob", "gov", "govt", "net", "nic", "nom", "or", "org", "ne", "go", "mil", "ltd", "plc", "sch"})
+
+def normalize_url(url: str) -> str:
+  """Returns a canonical form of the URL so trivially different spellings share a key"""
+  url = url.strip()
+
+  try:
+    parts = urlsplit(url)
+    port = parts.port
+  except ValueError:
+    return url
+
+  scheme = parts.scheme.lower()
+  host = (parts.hostname or "").rstrip(".")
+
+  if not scheme or not host:
+    return url
+
+  netloc = host if ":" not in host else f"[{host}]"
+  if port and port != DEFAULT_PORTS.get(scheme):
+    netloc = f"{netloc}:{port}"
+  if parts.username:
+    userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+    netloc = f"{userinfo}@{netloc}"
+
+  path = parts.path.rstrip("/")
+
+  # The fragment never reaches the server, so it is dropped
+  return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+def url_host(url: str) -> str:
+  try:
+    return (urlsplit(url).hostname or "").rstrip(".")
+  except ValueError:
+    return ""
+
+def registrable_domain(host: str) -> str:
+  """Returns the domain a host was registered under: www.mail.example.co.uk -> example.co.uk"""
+  host = host.lower().rstrip(".")
+  labels = host.split(".")
+
+  # IP addresses and single labels have no registrable domain of their own
+  if len(labels) < 3 or host.replace(".", "").isdigit() or ":" in host:
+    return host
+
+  if len(labels[-1]) == 2 and labels[-2] in COUNTRY_SECOND_LEVELS:
+    return ".".join(labels[-3:])
+  return ".".join(labels[-2:])
@@ -0,0 +1,124 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import gzip
+import hashlib
+import math
+import sys
+from contextlib import contextmanager
+from typing import Callable, Iterator, Tuple
+from src.config.settings import settings
+from src.core.logger import get_logger
+from src.utils.url_normalizer import normalize_url
+
+logger = get_logger("reader")
+
+class BloomFilter:
+  """Fixed-size probabilistic set used once a feed is too large for exact dedup"""
+
+  def __init__(self, capacity: int, error_rate: float):
+    self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+    self.hashes = max(1, round(self.size / capacity * math.log(2)))
+    self._bits = bytearray((self.size + 7) // 8)
+
+  def add(self, digest: int) -> bool:
+    """Adds a 64-bit digest, returning False if it was (probably) already present"""
+    # Double hashing: both halves of the digest generate every probe position
+    low, high = digest & 0xFFFFFFFF, digest >> 32
+    new = False
+
+    for i in range(self.hashes):
+      position = (low + i * high) % self.size
+      byte, bit = divmod(position, 8)
+      if not self._bits[byte] & (1 << bit):
+        self._bits[byte] |= 1 << bit
+        new = True
+
+    return new
+
+class URLDeduplicator:
+  """Exact set of 64-bit URL digests that degrades to a Bloom filter past a size limit"""
+
+  def __init__(self, exact_limit: int = None):
+    self.exact_limit = settings.DEDUP_EXACT_LIMIT if exact_limit is None else exact_limit
+    self._digests = set()
+    self._bloom = None
+
+  def add(self, url: str) -> bool:
+    digest = int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+    if self._bloom is not None:
+      return self._bloom.add(digest)
+
+    if digest in self._digests:
+      return False
+
+    self._digests.add(digest)
+    if len(self._digests) > self.exact_limit:
+      self._switch_to_bloom()
+    return True
+
+  def _switch_to_bloom(self) -> None:
+    logger.info("More than %s unique URLs, switching deduplication to a Bloom filter", self.exact_limit)
+    self._bloom = BloomFilter(settings.DEDUP_BLOOM_CAPACITY, settings.DEDUP_BLOOM_ERROR_RATE)
+
+    for digest in self._digests:
+      self._bloom.add(digest)
+    self._digests = set()
+
+def shard_of(url: str, shards: int) -> int:
+  # Stable across processes and hosts, unlike hash()
+  return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big") % shards
+
+class URLReader:
+  """Lazily yields deduplicated URLs from a file, a .gz file or stdin ("-")
+
+  URLs are yielded as written in the input. Their normalized form is only used to drop
+  duplicates and to pick the shard, so spellings of the same URL count once and share a shard.
+  With shard=(index, count) only the URLs hashing to that partition are yielded. shard_key
+  maps a URL to what is hashed, so related URLs (e.g. a whole host) can share a shard.
+  """
+
+  def __init__(self, source: str, shard: Tuple[int, int] = None, shard_key: Callable[[str], str] = None):
+    self.source = source
+    self.shard = shard
+    self.shard_key = shard_key
+    self.read = 0
+    self.duplicates = 0
+    self._seen = URLDeduplicator()
+
+  def __iter__(self) -> Iterator[str]:
+    with self._open() as file:
+      for line in file:
+        url = line.strip()
+        if not url:
+          continue
+
+        key = normalize_url(url)
+        if self.shard and shard_of(self.shard_key(key) if self.shard_key else key, self.shard[1]) != self.shard[0]:
+          continue
+
+        self.read += 1
+
+        if not self._seen.add(key):
+          self.duplicates += 1
+          continue
+
+        yield url
+
+    logger.info("%s URLs read from %s, %s duplicates skipped", self.read, self.source, self.duplicates)
+
+  @contextmanager
+  def _open(self):
+    if self.source == "-":
+      yield sys.stdin
+    elif str(self.source).endswith(".gz"):
+      with gzip.open(self.source, 'rt', encoding='utf-8') as file:
+        yield file
+    else:
+      with open(self.source, 'r', encoding='utf-8') as file:
+        yield file
@@ -0,0 +1,63 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import csv
+import sys
+import threading
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.mock_server import build_parser, create_server, state_options
+from src.scanners.hybrid_analysis import HybridAnalysisScanner
+from src.scanners.recorded_future import RecordedFutureScanner
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+  # Journals, results, indexes and reports go to the working directory
+  monkeypatch.chdir(tmp_path)
+  return tmp_path
+
+@pytest.fixture
+def mock_api():
+  """Mock of both engines (benchmarks/mock_server.py) where scans finish within milliseconds"""
+  server = create_server(**state_options(build_parser().parse_args(["--latency", "0", "--time-scale", "0.0001", "--seed", "1"])))
+  thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+  thread.start()
+
+  yield f"http://127.0.0.1:{server.server_address[1]}", server.RequestHandlerClass.state
+
+  server.shutdown()
+  server.server_close()
+
+@pytest.fixture
+def scanners(mock_api):
+  base_url, _ = mock_api
+  return {
+    "HybridAnalysis": HybridAnalysisScanner("key", f"{base_url}/ha"),
+    "RecordedFuture": RecordedFutureScanner("key", f"{base_url}/rf")
+  }
+
+@pytest.fixture
+def fast_polls(monkeypatch):
+  """Every scan is checked again 10 ms after the previous check, whatever the engine's profile"""
+  from src.utils.url_file_processor import URLFileProcessor
+  monkeypatch.setattr(URLFileProcessor, "_poll_delay", lambda self, engine, attempt: 0.01)
+
+@pytest.fixture
+def read_results(workdir):
+  """Reads the CSV results of a run, every segment, as {url: row}"""
+  def read(path="scan_results.csv"):
+    from src.utils.file_handlers import ResultsFileHandler
+    results = {}
+    # Rows with new columns go to later segments
+    for segment in ResultsFileHandler(path).segments():
+      with open(segment, newline="", encoding="utf-8") as file:
+        results.update((row["url"], row) for row in csv.DictReader(file))
+    return results
+  return read
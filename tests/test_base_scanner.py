@@ -0,0 +1,61 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import pytest
+import requests
+from src.core.exceptions import APIError
+from src.scanners.hybrid_analysis import HybridAnalysisScanner
+
+def respond(scanner, monkeypatch, *status_codes):
+  """Makes the scanner's session answer with these status codes in turn, returning the requests sent"""
+  sent = []
+  answers = iter(status_codes)
+
+  def request(method, url, **kwargs):
+    sent.append(method)
+    response = requests.Response()
+    response.status_code = next(answers)
+    response.headers["Retry-After"] = "0"
+    response._content = b'{"id": "1"}'
+    return response
+
+  monkeypatch.setattr(scanner.session, "request", request)
+  return sent
+
+@pytest.fixture
+def scanner():
+  return HybridAnalysisScanner("key", "http://127.0.0.1:9")
+
+@pytest.mark.parametrize("status_code", [429, 502, 503])
+def test_submissions_are_retried_when_the_scan_was_not_accepted(scanner, monkeypatch, status_code):
+  sent = respond(scanner, monkeypatch, status_code, status_code, 200)
+
+  assert scanner.scan_url("https://example.com") == {"id": "1"}
+  assert sent == ["POST"] * 3
+
+@pytest.mark.parametrize("status_code", [500, 504])
+def test_submissions_are_not_retried_when_the_scan_may_exist(scanner, monkeypatch, status_code):
+  sent = respond(scanner, monkeypatch, status_code, 200)
+
+  with pytest.raises(APIError):
+    scanner.scan_url("https://example.com")
+  assert sent == ["POST"]
+
+@pytest.mark.parametrize("status_code", [500, 502, 503, 504])
+def test_status_checks_are_retried_on_any_5xx(scanner, monkeypatch, status_code):
+  sent = respond(scanner, monkeypatch, status_code, 200)
+
+  assert scanner.retrieve_scan_results("1") == {"id": "1"}
+  assert sent == ["GET", "GET"]
+
+def test_retries_stop_at_max_retries(scanner, monkeypatch):
+  scanner.max_retries = 2
+  sent = respond(scanner, monkeypatch, 503, 503, 503, 200)
+
+  with pytest.raises(APIError):
+    scanner.scan_url("https://example.com")
+  assert len(sent) == 3
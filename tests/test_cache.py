@@ -0,0 +1,80 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import sqlite3
+import time
+import pytest
+from src.core.cache import VerdictCache
+from src.utils.url_file_processor import URLFileProcessor
+
+@pytest.fixture
+def cache(workdir):
+  cache = VerdictCache(workdir / "cache.sqlite", ttl=3600, max_entries=100)
+  yield cache
+  cache.close()
+
+def test_submissions_and_results_are_keyed_by_engine_and_normalized_url(cache):
+  cache.store_submission("HybridAnalysis", "https://Example.com/", {"id": "1", "finished": False})
+
+  entry = cache.get("HybridAnalysis", "https://example.com")
+  assert entry.scan_id == "1" and not entry.completed
+  assert cache.get("RecordedFuture", "https://example.com") is None
+
+  cache.store_result("HybridAnalysis", "1", {"finished": True})
+  assert cache.get("HybridAnalysis", "https://example.com").result == {"finished": True}
+  assert cache.get_result("HybridAnalysis", "1") == {"finished": True}
+
+def test_a_new_submission_drops_the_previous_result(cache):
+  cache.store_submission("HybridAnalysis", "https://a.com", {"id": "1"})
+  cache.store_result("HybridAnalysis", "1", {"finished": True})
+  cache.store_submission("HybridAnalysis", "https://a.com", {"id": "2"})
+
+  entry = cache.get("HybridAnalysis", "https://a.com")
+  assert entry.scan_id == "2" and entry.result is None
+  assert cache.get_result("HybridAnalysis", "1") is None
+
+def test_entries_older_than_the_ttl_are_misses_and_evicted(workdir):
+  cache = VerdictCache(workdir / "cache.sqlite", ttl=0.05, max_entries=100)
+  cache.store_submission("HybridAnalysis", "https://a.com", {"id": "1"})
+  time.sleep(0.1)
+
+  assert cache.get("HybridAnalysis", "https://a.com") is None
+  cache.evict()
+  assert cache._connection.execute("SELECT COUNT(*) FROM verdicts").fetchone() == (0,)
+  cache.close()
+
+def test_eviction_keeps_the_newest_max_entries(workdir):
+  cache = VerdictCache(workdir / "cache.sqlite", ttl=3600, max_entries=2)
+  for index in range(3):
+    cache.store_submission("HybridAnalysis", f"https://{index}.com", {"id": str(index)})
+    time.sleep(0.01)
+  cache.evict()
+
+  assert cache.get("HybridAnalysis", "https://0.com") is None
+  assert cache.get("HybridAnalysis", "https://2.com").scan_id == "2"
+  cache.close()
+
+def test_failed_writes_are_logged_not_raised(cache, monkeypatch):
+  # A cache write must never decide the state of the scan it describes
+  connection = sqlite3.connect(":memory:")
+  connection.close()
+  monkeypatch.setattr(cache, "_connection", connection)
+
+  cache.store_submission("HybridAnalysis", "https://a.com", {"id": "1"})
+  cache.store_result("HybridAnalysis", "1", {"finished": True})
+
+def test_cached_verdicts_skip_submission_and_fetch(scanners, mock_api, cache, fast_polls, read_results):
+  _, state = mock_api
+  (cache.path.parent / "urls.txt").write_text("https://a.com\nhttps://b.com\n", encoding="utf-8")
+
+  URLFileProcessor(scanners, cache=cache).process_file("urls.txt")
+  first = state.stats()["calls"]
+  URLFileProcessor(scanners, cache=cache, results_file="again.csv").process_file("urls.txt")
+
+  assert state.stats()["calls"] == first
+  assert read_results("again.csv").keys() == read_results().keys() == {"https://a.com", "https://b.com"}
+  assert read_results("again.csv")["https://a.com"]["ha_bfore_ai"] == read_results()["https://a.com"]["ha_bfore_ai"]
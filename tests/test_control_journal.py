@@ -0,0 +1,117 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import pytest
+from src.utils.async_url_file_processor import AsyncURLFileProcessor
+from src.utils.control_journal import ControlJournal, PENDING, COMPLETED, FETCHED, ERROR
+from src.utils.url_file_processor import URLFileProcessor
+
+def test_journal_survives_a_restart(tmp_path):
+  journal = ControlJournal(tmp_path / "urls_control.db")
+  journal.record("HybridAnalysis", "https://a.com", "1", PENDING)
+  journal.record("RecordedFuture", "https://a.com", "2", FETCHED, data={"rf_static1": "reported"})
+  journal.record("HybridAnalysis", "https://b.com", None, ERROR, "timeout")
+  journal.close()
+
+  journal = ControlJournal(tmp_path / "urls_control.db")
+  assert [tuple(entry) for entry in journal.pending()] == [("HybridAnalysis", "https://a.com", "1")]
+  assert journal.fetched("RecordedFuture", "https://a.com") == {"rf_static1": "reported"}
+  assert journal.progress() == {PENDING: 1, FETCHED: 1, ERROR: 1}
+  journal.close()
+
+def test_written_urls_leave_the_completed_set(tmp_path):
+  journal = ControlJournal(tmp_path / "urls_control.db")
+  journal.record("HybridAnalysis", "https://a.com", "1", COMPLETED)
+  journal.record("RecordedFuture", "https://a.com", "2", FETCHED, data={"rf_static1": "reported"})
+
+  assert journal.completed_urls() == ["https://a.com"]
+  assert sorted(journal.completed_scans("https://a.com")) == [("HybridAnalysis", "1"), ("RecordedFuture", "2")]
+
+  journal.mark_written(["https://a.com"])
+  assert journal.completed_urls() == []
+  # Written columns are dropped from the journal
+  assert journal.fetched("RecordedFuture", "https://a.com") is None
+  journal.close()
+
+def test_recording_a_scan_again_only_changes_its_state(tmp_path):
+  journal = ControlJournal(tmp_path / "urls_control.db")
+  journal.record("HybridAnalysis", "https://a.com", "1", PENDING)
+  journal.record("HybridAnalysis", "https://a.com", "1", COMPLETED)
+
+  assert journal.progress() == {COMPLETED: 1}
+  assert journal.pending() == []
+  journal.close()
+
+def test_a_batch_is_committed_once_it_ends(tmp_path):
+  journal = ControlJournal(tmp_path / "urls_control.db")
+
+  with journal.batch():
+    journal.record("HybridAnalysis", "https://a.com", "1", PENDING)
+    journal.record("RecordedFuture", "https://a.com", "2", PENDING)
+    # Another connection, like a restarted run, does not see the batch yet
+    assert not ControlJournal(tmp_path / "urls_control.db").has_entries()
+
+  assert ControlJournal(tmp_path / "urls_control.db").progress() == {PENDING: 2}
+  journal.close()
+
+def test_failed_submissions_are_not_counted_as_submitted(tmp_path):
+  journal = ControlJournal(tmp_path / "urls_control.db")
+  journal.record("HybridAnalysis", "https://a.com", None, ERROR, "503")
+  journal.record("RecordedFuture", "https://a.com", "2", PENDING)
+
+  assert journal.engines("https://a.com") == {"RecordedFuture"}
+  journal.close()
+
+@pytest.mark.parametrize("processor_class", [URLFileProcessor, AsyncURLFileProcessor])
+def test_resume_finishes_journaled_scans_without_resubmitting(scanners, mock_api, workdir, fast_polls, read_results, processor_class):
+  if processor_class is AsyncURLFileProcessor:
+    pytest.importorskip("aiohttp")
+  _, state = mock_api
+
+  # An interrupted run: a.com was submitted to both engines, b.com's RecordedFuture columns were fetched
+  journal = ControlJournal(workdir / "urls_control.db")
+  for engine, scanner in scanners.items():
+    journal.record(engine, "https://a.com", scanner.scan_url("https://a.com")["id"], PENDING)
+  journal.record("HybridAnalysis", "https://b.com", scanners["HybridAnalysis"].scan_url("https://b.com")["id"], PENDING)
+  journal.record("RecordedFuture", "https://b.com", "gone", FETCHED, data={"rf_static1": "reported", "rf_static1_score": 2})
+  journal.close()
+  submitted = state.stats()["calls"]
+
+  processor_class(scanners, resume=True).process_file(None)
+
+  results = read_results()
+  assert sorted(results) == ["https://a.com", "https://b.com"]
+  assert results["https://a.com"]["rf_static1"] == "reported"
+  assert results["https://b.com"]["rf_static1_score"] == "2"
+  assert "ha_bfore_ai" in results["https://b.com"]
+  calls = state.stats()["calls"]
+  assert calls["ha_submit"] == submitted["ha_submit"] and calls["rf_submit"] == submitted["rf_submit"]
+  # Finished runs remove their journal
+  assert not (workdir / "urls_control.db").exists()
+
+def test_resume_with_the_input_resubmits_failed_and_missing_scans(scanners, mock_api, workdir, fast_polls, read_results):
+  _, state = mock_api
+  (workdir / "urls.txt").write_text("https://a.com\nhttps://b.com\n", encoding="utf-8")
+
+  journal = ControlJournal(workdir / "urls_control.db")
+  journal.record("HybridAnalysis", "https://a.com", None, ERROR, "503 Service Unavailable")
+  journal.record("RecordedFuture", "https://a.com", "1", FETCHED, data={"rf_static1": "reported"})
+  journal.close()
+
+  URLFileProcessor(scanners, resume=True).process_file("urls.txt")
+
+  results = read_results()
+  assert results["https://a.com"]["rf_static1"] == "reported"
+  assert results["https://a.com"]["ha_bfore_ai"] != "No results"
+  assert "rf_urlscan1" in results["https://b.com"]
+  calls = state.stats()["calls"]
+  # a.com goes to HybridAnalysis again, b.com to both engines
+  assert calls["ha_submit"] == 2 and calls["rf_submit"] == 1
+
+def test_resume_without_a_journal_fails(scanners):
+  with pytest.raises(FileNotFoundError):
+    URLFileProcessor(scanners, resume=True).process_file(None)
@@ -0,0 +1,91 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import importlib.metadata
+from dataclasses import replace
+import pytest
+from src.core.engines import BUILTIN_ENGINES, EngineRegistry, EngineSpec, registry
+from src.core.exceptions import ConfigurationError
+from src.core.factories import LazyScanners
+from src.scanners.hybrid_analysis import HybridAnalysisScanner, extract_columns
+from src.utils.url_file_processor import URLFileProcessor
+
+class MirrorScanner(HybridAnalysisScanner):
+  """A plugin engine that happens to speak the Hybrid Analysis API"""
+  name = "Mirror"
+
+def extract_mirror_columns(result, scan_id=None):
+  return {f"mirror_{column[3:]}": value for column, value in extract_columns(result, scan_id).items()}
+
+MIRROR = EngineSpec(
+  name="Mirror",
+  scanner=f"{__name__}:MirrorScanner",
+  extractor=f"{__name__}:extract_mirror_columns",
+  column_prefix="mirror_",
+  api_key_env="MIRROR_API_KEY",
+  base_url_env="MIRROR_BASE_URL",
+  poll_profile={"initial_delay": 0, "interval": 0.01}
+)
+
+class FakeEntryPoint:
+  def __init__(self, name, target):
+    self.name = name
+    self.target = target
+
+  def load(self):
+    if isinstance(self.target, Exception):
+      raise self.target
+    return self.target
+
+class FakeEntryPoints(list):
+  def select(self, group):
+    return [entry_point for entry_point in self if group == "aatt.engines"]
+
+@pytest.fixture
+def plugins(monkeypatch):
+  def install(*entry_points):
+    monkeypatch.setattr(importlib.metadata, "entry_points", lambda: FakeEntryPoints(entry_points))
+    return EngineRegistry()
+  return install
+
+def test_builtin_engines():
+  assert registry.names()[:2] == ("HybridAnalysis", "RecordedFuture")
+  assert registry.get("RecordedFuture").scanner_class().__name__ == "RecordedFutureScanner"
+  assert registry.column_prefixes()[:2] == [("ha_", "HybridAnalysis"), ("rf_", "RecordedFuture")]
+
+def test_unknown_engines_are_a_configuration_error():
+  with pytest.raises(ConfigurationError):
+    registry.get("VirusTotal")
+
+def test_plugins_are_registered_after_the_builtins(plugins):
+  engines = plugins(FakeEntryPoint("mirror", MIRROR))
+
+  assert engines.names() == ("HybridAnalysis", "RecordedFuture", "Mirror")
+  assert engines.get("Mirror") is MIRROR
+
+def test_broken_and_duplicate_plugins_are_skipped(plugins):
+  engines = plugins(
+    FakeEntryPoint("broken", ImportError("No module named aatt_broken")),
+    FakeEntryPoint("not_a_spec", object()),
+    FakeEntryPoint("impostor", replace(BUILTIN_ENGINES[0], column_prefix="x_"))
+  )
+
+  assert engines.names() == ("HybridAnalysis", "RecordedFuture")
+  assert engines.get("HybridAnalysis").column_prefix == "ha_"
+
+def test_a_plugin_engine_runs_in_the_pipeline(mock_api, fast_polls, read_results, workdir, monkeypatch):
+  base_url, _ = mock_api
+  monkeypatch.setenv("HYBRID_ANALYSIS_BASE_URL", f"{base_url}/ha")
+  monkeypatch.setenv("MIRROR_BASE_URL", f"{base_url}/ha")
+  monkeypatch.setattr(registry, "_engines", {**registry.engines, "Mirror": MIRROR})
+  (workdir / "urls.txt").write_text("https://a.com\n", encoding="utf-8")
+
+  URLFileProcessor(LazyScanners(["HybridAnalysis", "Mirror"])).process_file("urls.txt")
+
+  row = read_results()["https://a.com"]
+  assert row["mirror_bfore_ai"] not in (None, "", "No results")
+  assert "ha_bfore_ai" in row and not any(column.startswith("rf_") for column in row)
@@ -0,0 +1,165 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import csv
+import json
+import os
+import pytest
+from src.core.exceptions import ConfigurationError
+from src.utils.file_handlers import ResultsFileHandler, results_handler
+from src.utils.url_file_processor import URLFileProcessor
+
+ROWS = [
+  {"url": "https://a.com/", "generated_at": 1700000000, "ha_bfore_ai": "malicious"},
+  {"url": "https://b.com/", "generated_at": 1700000000, "ha_bfore_ai": "clean", "rf_static1_score": 3},
+  {"url": "https://c.com/", "generated_at": 1800000000, "rf_static1_score": "No results", "rf_urlscan1": "reported"}
+]
+
+def read_csv(path):
+  with open(path, newline="", encoding="utf-8") as file:
+    return list(csv.reader(file))
+
+def write_rows(path, rows):
+  with ResultsFileHandler(path, URLFileProcessor.column_order) as writer:
+    for row in rows:
+      writer.write_row(row)
+
+def test_csv_rows_reach_the_file_as_they_are_written(tmp_path):
+  path = tmp_path / "scan_results.csv"
+  flushed = []
+  writer = ResultsFileHandler(path, URLFileProcessor.column_order, flushed.extend)
+  writer.write_row(ROWS[0])
+
+  # Readable, and reported to the caller, before the writer is closed
+  assert read_csv(path) == [["url", "generated_at", "ha_bfore_ai"], ["https://a.com/", "1700000000", "malicious"]]
+  assert flushed == [ROWS[0]]
+  writer.close()
+
+def test_csv_rolls_a_segment_when_columns_change(tmp_path):
+  path = tmp_path / "scan_results.csv"
+  write_rows(path, ROWS)
+
+  assert read_csv(path) == [["url", "generated_at", "ha_bfore_ai"], ["https://a.com/", "1700000000", "malicious"]]
+  assert read_csv(tmp_path / "scan_results.1.csv")[0] == ["url", "generated_at", "ha_bfore_ai", "rf_static1_score"]
+  assert read_csv(tmp_path / "scan_results.2.csv")[1] == ["https://c.com/", "1800000000", "No results", "No results", "reported"]
+
+  schema = json.loads((tmp_path / "scan_results.schema.json").read_text())
+  assert schema["columns"] == ["url", "generated_at", "ha_bfore_ai", "rf_static1_score", "rf_urlscan1"]
+  assert [segment["file"] for segment in schema["segments"]] == ["scan_results.csv", "scan_results.1.csv", "scan_results.2.csv"]
+  assert "compacting" not in schema
+
+def test_csv_appends_to_the_last_segment_on_reopen(tmp_path):
+  path = tmp_path / "scan_results.csv"
+  write_rows(path, ROWS)
+  write_rows(path, [{**ROWS[2], "url": "https://d.com/"}])
+
+  assert not (tmp_path / "scan_results.3.csv").exists()
+  assert [row[0] for row in read_csv(tmp_path / "scan_results.2.csv")[1:]] == ["https://c.com/", "https://d.com/"]
+
+def test_compact_merges_segments_with_the_union_header(tmp_path):
+  path = tmp_path / "scan_results.csv"
+  write_rows(path, ROWS)
+
+  assert ResultsFileHandler(path, URLFileProcessor.column_order).compact() == 3
+  assert sorted(os.listdir(tmp_path)) == ["scan_results.csv", "scan_results.schema.json"]
+  assert read_csv(path) == [
+    ["url", "generated_at", "ha_bfore_ai", "rf_static1_score", "rf_urlscan1"],
+    ["https://a.com/", "1700000000", "malicious", "No results", "No results"],
+    ["https://b.com/", "1700000000", "clean", "3", "No results"],
+    ["https://c.com/", "1800000000", "No results", "No results", "reported"]
+  ]
+  assert [segment["file"] for segment in json.loads((tmp_path / "scan_results.schema.json").read_text())["segments"]] == ["scan_results.csv"]
+  assert ResultsFileHandler(path).compact() == 0
+
+def test_compaction_interrupted_before_the_replace_is_rolled_back(tmp_path):
+  path = tmp_path / "scan_results.csv"
+  write_rows(path, ROWS)
+  handler = ResultsFileHandler(path)
+  # Merged file written and intent recorded, then killed before the merged file replaced the first segment
+  (tmp_path / ".scan_results.csv.compact").write_text("partial")
+  handler._write_schema(compacting=["scan_results.1.csv", "scan_results.2.csv"])
+
+  reopened = ResultsFileHandler(path)
+
+  assert not (tmp_path / ".scan_results.csv.compact").exists()
+  assert len(reopened.segments()) == 3
+  assert read_csv(path)[0] == ["url", "generated_at", "ha_bfore_ai"]
+  assert "compacting" not in json.loads((tmp_path / "scan_results.schema.json").read_text())
+
+def test_compaction_interrupted_after_the_replace_is_completed(tmp_path):
+  path = tmp_path / "scan_results.csv"
+  write_rows(path, ROWS)
+  handler = ResultsFileHandler(path, URLFileProcessor.column_order)
+  merged = tmp_path / "merged.csv"
+  # Killed after the merged file replaced the first segment, before the others were deleted
+  with open(merged, "w", newline="", encoding="utf-8") as file:
+    csv.writer(file).writerows([handler.columns(), ["https://a.com/", "1700000000", "malicious", "No results", "No results"]])
+  handler._write_schema(compacting=["scan_results.1.csv", "scan_results.2.csv"])
+  os.replace(merged, path)
+
+  reopened = ResultsFileHandler(path, URLFileProcessor.column_order)
+
+  assert reopened.segments() == [path]
+  assert reopened.columns() == handler.columns()
+  assert not (tmp_path / "scan_results.1.csv").exists()
+
+def test_unknown_output_format():
+  with pytest.raises(ConfigurationError):
+    results_handler("xml")
+
+def test_jsonl_keeps_types_and_orders_columns(tmp_path):
+  path = tmp_path / "scan_results.jsonl"
+  with results_handler("jsonl", path, URLFileProcessor.column_order) as writer:
+    for row in reversed(ROWS):
+      writer.write_row(dict(reversed(list(row.items()))))
+
+  lines = [json.loads(line) for line in path.read_text().splitlines()]
+  assert [list(line) for line in lines][0] == ["url", "generated_at", "rf_static1_score", "rf_urlscan1"]
+  assert lines[1]["rf_static1_score"] == 3
+
+def test_jsonl_reports_flushed_rows(tmp_path):
+  flushed = []
+  with results_handler("jsonl", tmp_path / "scan_results.jsonl", on_flush=flushed.extend) as writer:
+    writer.write_row(ROWS[0])
+
+  assert flushed == [ROWS[0]]
+
+def test_parquet_reads_back_columns_added_by_later_parts(tmp_path):
+  pq = pytest.importorskip("pyarrow.parquet")
+  directory = tmp_path / "scan_results"
+
+  with results_handler("parquet", directory, URLFileProcessor.column_order) as writer:
+    writer.flush_rows = 1
+    writer.write_row(ROWS[0])
+    writer.write_row(ROWS[1])
+  # A later run adds another column to the same dataset
+  with results_handler("parquet", directory, URLFileProcessor.column_order) as writer:
+    writer.write_row(ROWS[2])
+
+  table = pq.read_table(directory)
+  assert table.column_names == ["url", "generated_at", "ha_bfore_ai", "rf_static1_score", "rf_urlscan1", "date"]
+  rows = {row["url"]: row for row in table.to_pylist()}
+  assert rows["https://a.com/"]["rf_static1_score"] is None and rows["https://a.com/"]["rf_urlscan1"] is None
+  assert rows["https://b.com/"]["rf_static1_score"] == 3
+  assert rows["https://c.com/"]["rf_static1_score"] is None and rows["https://c.com/"]["rf_urlscan1"] == "reported"
+  assert pq.read_schema(directory / "_common_metadata").names == table.column_names[:-1]
+
+def test_parquet_flushes_every_flush_rows_across_dates(tmp_path):
+  pytest.importorskip("pyarrow")
+  flushed = []
+
+  with results_handler("parquet", tmp_path / "scan_results", on_flush=flushed.append) as writer:
+    writer.flush_rows = 2
+    writer.write_row(ROWS[0])
+    writer.write_row(ROWS[2])
+    # Two rows of two different dates reach the threshold together
+    assert sorted(len(rows) for rows in flushed) == [1, 1]
+    writer.write_row(ROWS[1])
+    assert len(flushed) == 2
+
+  assert len(flushed) == 3
+  assert len(list((tmp_path / "scan_results").glob("date=*/part-*.parquet"))) == 3
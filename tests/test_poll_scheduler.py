@@ -0,0 +1,42 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import time
+from src.core.poll_scheduler import PollScheduler
+
+def test_empty_scheduler_has_nothing_due():
+  scheduler = PollScheduler()
+
+  assert len(scheduler) == 0
+  assert scheduler.time_until_next() == 0.0
+  assert scheduler.pop_due() == []
+
+def test_pop_due_returns_only_due_items_in_time_order():
+  scheduler = PollScheduler()
+  scheduler.schedule("late", 60)
+  scheduler.schedule("second", -1, attempt=2)
+  scheduler.schedule("first", -2, attempt=1)
+
+  assert scheduler.pop_due() == [("first", 1), ("second", 2)]
+  assert len(scheduler) == 1
+  assert 59 < scheduler.time_until_next() <= 60
+
+def test_items_due_together_keep_their_scheduling_order():
+  scheduler = PollScheduler()
+  # Unorderable items: ties must never compare them
+  items = [{"scan": index} for index in range(5)]
+  for item in items:
+    scheduler.schedule(item, 0)
+
+  time.sleep(0.01)
+  assert [item for item, _ in scheduler.pop_due()] == items
+
+def test_time_until_next_never_goes_negative():
+  scheduler = PollScheduler()
+  scheduler.schedule("overdue", -10)
+
+  assert scheduler.time_until_next() == 0.0
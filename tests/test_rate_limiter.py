@@ -0,0 +1,66 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import asyncio
+import threading
+import time
+from src.core.rate_limiter import TokenBucket
+
+def test_capacity_defaults_to_the_rate_and_at_least_one_token():
+  assert TokenBucket(5).capacity == 5
+  assert TokenBucket(0.5).capacity == 1
+
+def test_burst_up_to_capacity_then_waits_for_refill():
+  bucket = TokenBucket(20, capacity=3)
+
+  assert [bucket._try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+  wait = bucket._try_acquire()
+  assert 0 < wait <= 1 / 20
+
+def test_acquire_holds_the_rate():
+  bucket = TokenBucket(50, capacity=1)
+  started = time.monotonic()
+
+  for _ in range(11):
+    bucket.acquire()
+
+  # The first token is free, the next ten arrive at 50 per second
+  assert time.monotonic() - started >= 10 / 50 * 0.9
+
+def test_rate_is_shared_between_threads():
+  bucket = TokenBucket(100, capacity=1)
+  started = time.monotonic()
+  threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert time.monotonic() - started >= 19 / 100 * 0.9
+
+def test_pause_blocks_every_caller_and_drops_the_tokens():
+  bucket = TokenBucket(1000, capacity=10)
+  bucket.pause(0.2)
+
+  wait = bucket._try_acquire()
+  assert 0.1 < wait <= 0.2
+
+  started = time.monotonic()
+  bucket.acquire()
+  assert time.monotonic() - started >= 0.15
+
+def test_acquire_async_waits_like_acquire():
+  bucket = TokenBucket(50, capacity=1)
+
+  async def run():
+    for _ in range(6):
+      await bucket.acquire_async()
+
+  started = time.monotonic()
+  asyncio.run(run())
+  assert time.monotonic() - started >= 5 / 50 * 0.9
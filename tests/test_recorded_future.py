@@ -0,0 +1,123 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import pytest
+import requests
+from benchmarks.mock_server import build_parser, create_server, state_options
+from src.scanners.recorded_future import RecordedFutureScanner
+
+@pytest.fixture
+def slow_mock_api():
+  """Mock API at its real pace, where no scan finishes within a test"""
+  server = create_server(**state_options(build_parser().parse_args(["--latency", "0", "--seed", "1"])))
+  thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+  thread.start()
+
+  yield f"http://127.0.0.1:{server.server_address[1]}", server.RequestHandlerClass.state
+
+  server.shutdown()
+  server.server_close()
+
+def calls(state):
+  return Counter(state.stats()["calls"])
+
+def submit(scanner, count):
+  return [scanner.scan_url(f"https://{index}.com")["id"] for index in range(count)]
+
+def finished_statuses(scanner, scan_ids):
+  # Scans of the fast mock finish within milliseconds of their submission
+  deadline = time.monotonic() + 5
+  while time.monotonic() < deadline:
+    results = scanner.retrieve_scan_statuses(scan_ids)
+    if all(result.get("completed") for result in results.values()):
+      return results
+    time.sleep(0.02)
+  pytest.fail("The mock scans did not finish")
+
+def test_finished_scans_are_found_in_the_list_and_their_summaries_read(scanners, mock_api):
+  _, state = mock_api
+  scanner = scanners["RecordedFuture"]
+  scan_ids = submit(scanner, 3)
+  finished_statuses(scanner, scan_ids)
+  before = calls(state)
+
+  results = scanner.retrieve_scan_statuses(scan_ids)
+
+  after = calls(state)
+  assert sorted(results) == sorted(scan_ids)
+  assert all(f"{scan_id}-static1" in results[scan_id]["tasks"] for scan_id in scan_ids)
+  assert after["rf_list"] - before["rf_list"] >= 1
+  assert after["rf_status"] - before["rf_status"] == 3
+
+def test_running_scans_only_cost_the_list(slow_mock_api):
+  base_url, state = slow_mock_api
+  scanner = RecordedFutureScanner("key", f"{base_url}/rf")
+  scan_ids = submit(scanner, 5)
+
+  results = scanner.retrieve_scan_statuses(scan_ids)
+
+  assert sorted(results) == sorted(scan_ids)
+  assert not any(result["completed"] for result in results.values())
+  assert calls(state)["rf_list"] == 1
+  assert calls(state)["rf_status"] == 0
+
+def test_unknown_scans_are_left_out(scanners, mock_api):
+  assert scanners["RecordedFuture"].retrieve_scan_statuses(["unknown"]) == {}
+
+def test_a_refused_list_falls_back_to_summaries_for_good(slow_mock_api, monkeypatch):
+  base_url, state = slow_mock_api
+  scanner = RecordedFutureScanner("key", f"{base_url}/rf")
+  scan_ids = submit(scanner, 2)
+  request = scanner._request
+
+  def refuse_list(method, path, **kwargs):
+    if path == "/samples" and method == "GET":
+      response = requests.Response()
+      response.status_code = 403
+      raise requests.exceptions.HTTPError("403 Forbidden", response=response)
+    return request(method, path, **kwargs)
+
+  monkeypatch.setattr(scanner, "_request", refuse_list)
+
+  assert sorted(scanner.retrieve_scan_statuses(scan_ids)) == sorted(scan_ids)
+  assert scanner.list_statuses is False
+  assert calls(state)["rf_status"] == 2
+
+@pytest.mark.parametrize("last_submitted, cursor", [("2024-05-02T10:00:00Z", None), ("2024-05-02T12:00:00Z", "20")])
+def test_the_list_is_read_back_to_the_oldest_submission(last_submitted, cursor):
+  scanner = RecordedFutureScanner("key", "http://127.0.0.1:9")
+  oldest = datetime(2024, 5, 2, 11, tzinfo=timezone.utc).timestamp()
+  page = {"data": [{"id": "other", "status": "running", "submitted": last_submitted}], "next": "20"}
+  statuses = {}
+
+  assert scanner._read_page(page, {"wanted"}, statuses, oldest) == cursor
+  assert statuses == {}
+
+def test_async_statuses(scanners, mock_api):
+  pytest.importorskip("aiohttp")
+  from src.core.async_http import AsyncHTTPClient
+
+  _, state = mock_api
+  scanner = scanners["RecordedFuture"]
+  scan_ids = submit(scanner, 2)
+  finished_statuses(scanner, scan_ids)
+  before = calls(state)
+
+  async def statuses():
+    async with AsyncHTTPClient() as client:
+      return await scanner.async_retrieve_scan_statuses(client, scan_ids + ["unknown"])
+
+  results = asyncio.run(statuses())
+
+  assert sorted(results) == sorted(scan_ids)
+  assert all(result["completed"] for result in results.values())
+  assert calls(state)["rf_list"] - before["rf_list"] >= 1
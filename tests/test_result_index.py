@@ -0,0 +1,70 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import argparse
+import csv
+import json
+import pytest
+import main
+from src.utils.result_index import ResultIndex
+from src.utils.url_file_processor import URLFileProcessor
+
+@pytest.fixture
+def index(workdir):
+  index = ResultIndex()
+  index.add("https://Example.com/", 100, [("HybridAnalysis", "1", {"ha_bfore_ai": "clean"}),
+                                          ("RecordedFuture", "2", {"rf_static1": "reported"})])
+  index.add("https://mail.example.com/inbox", 200, [("HybridAnalysis", "3", {"ha_bfore_ai": "malicious"})])
+  index.add("https://example.co.uk", 300, [("HybridAnalysis", "4", {"ha_bfore_ai": "clean"})])
+  yield index
+  index.close()
+
+def lookup(index, **query):
+  return [(result["url"], result["engine"]) for result in index.lookup(**query)]
+
+def test_urls_are_looked_up_by_their_normalized_form(index):
+  assert lookup(index, url="HTTPS://example.com#top") == [("https://example.com", "HybridAnalysis"),
+                                                          ("https://example.com", "RecordedFuture")]
+
+def test_a_domain_matches_its_subdomains_newest_first(index):
+  assert lookup(index, domain="example.com", engine="HybridAnalysis") == [
+    ("https://mail.example.com/inbox", "HybridAnalysis"), ("https://example.com", "HybridAnalysis")]
+  assert lookup(index, domain="mail.example.com") == [("https://mail.example.com/inbox", "HybridAnalysis")]
+  assert lookup(index, domain="example.co.uk") == [("https://example.co.uk", "HybridAnalysis")]
+
+def test_since_and_limit(index):
+  assert lookup(index, since=200) == [("https://example.co.uk", "HybridAnalysis"),
+                                      ("https://mail.example.com/inbox", "HybridAnalysis")]
+  assert len(lookup(index, limit=1)) == 1
+
+def test_results_are_exported_and_imported(index, workdir):
+  assert index.export_csv("export.csv", domain="example.com") == 3
+  with open("export.csv", newline="", encoding="utf-8") as file:
+    rows = list(csv.DictReader(file))
+  assert rows[0]["ha_bfore_ai"] == "malicious" and rows[0]["rf_static1"] == "No results"
+
+  (workdir / "scan_results.csv").write_text(
+    "url,generated_at,ha_bfore_ai,rf_static1\nhttps://new.com/,400,clean,No results\n", encoding="utf-8")
+  assert index.import_csv("scan_results.csv") == 1
+  assert [result["data"] for result in index.lookup(url="https://new.com")] == [{"ha_bfore_ai": "clean"}]
+
+def test_lookup_command(index, capsys):
+  main.lookup(argparse.Namespace(index_csv=None, lookup="mail.example.com", engine=None, since=None, limit=None, export=None))
+
+  results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+  assert [(result["url"], result["scan_id"], result["data"]) for result in results] == \
+    [("https://mail.example.com/inbox", "3", {"ha_bfore_ai": "malicious"})]
+
+def test_the_pipeline_indexes_every_written_url(scanners, mock_api, fast_polls, workdir):
+  (workdir / "urls.txt").write_text("https://a.com\nhttps://b.com\n", encoding="utf-8")
+
+  URLFileProcessor(scanners).process_file("urls.txt")
+
+  index = ResultIndex()
+  assert sorted(lookup(index)) == [(url, engine) for url in ("https://a.com", "https://b.com")
+                                   for engine in ("HybridAnalysis", "RecordedFuture")]
+  index.close()
@@ -0,0 +1,126 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import json
+import threading
+import time
+from concurrent.futures import Future
+from http.client import HTTPConnection
+import pytest
+from src.config.settings import settings
+from src.core.cache import VerdictCache
+from src.core.engines import registry
+from src.utils.scan_api import create_server
+from src.utils.scan_service import ScanService
+
+@pytest.fixture
+def service(scanners, workdir):
+  service = ScanService(scanners, VerdictCache(workdir / "cache.sqlite"), batch_interval=0)
+  service._poll_delay = lambda engine, attempt: 0.01
+  service.start()
+  yield service
+  service.stop()
+
+@pytest.fixture
+def api(service):
+  server = create_server(service, "127.0.0.1", 0)
+  thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+  thread.start()
+
+  def request(method, path, body=None, raw=None):
+    connection = HTTPConnection(*server.server_address, timeout=10)
+    payload = raw if raw is not None else (json.dumps(body).encode() if body is not None else None)
+    connection.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    status, content = response.status, json.loads(response.read() or b"null")
+    connection.close()
+    return status, content
+
+  yield request
+  server.shutdown()
+  server.server_close()
+
+@pytest.mark.parametrize("body, raw", [
+  (None, b"{not json"),
+  (None, b"[1, 2]"),
+  ({}, None),
+  ({"urls": []}, None),
+  ({"urls": "https://example.com"}, None),
+  ({"urls": ["https://example.com"], "engines": "HybridAnalysis"}, None),
+  ({"urls": ["https://example.com"], "engines": []}, None),
+  ({"urls": ["https://example.com"], "engines": ["HybridAnalysis", "VirusTotal"]}, None)
+])
+def test_bad_scan_requests_are_rejected(api, service, body, raw):
+  status, content = api("POST", "/scans", body, raw)
+
+  assert status == 400
+  assert content["error"]
+  # Nothing was queued
+  assert service.stats()["in_progress"] == 0
+
+def test_too_many_urls(api):
+  status, _ = api("POST", "/scans", {"urls": ["https://example.com"] * (settings.SERVE_MAX_REQUEST_URLS + 1)})
+  assert status == 413
+
+def test_unknown_paths_and_missing_url(api):
+  assert api("POST", "/nothing", {"urls": ["https://example.com"]})[0] == 404
+  assert api("GET", "/nothing")[0] == 404
+  assert api("GET", "/verdicts")[0] == 400
+
+def test_spellings_of_a_url_are_accepted_once_and_invalid_ones_rejected(api):
+  status, content = api("POST", "/scans", {
+    "urls": ["https://Example.com/", "https://example.com", "not a url"],
+    "engines": ["HybridAnalysis", "HybridAnalysis"]
+  })
+
+  assert status == 202
+  assert content["accepted"] == ["https://Example.com/"]
+  assert [rejected["reason"] for rejected in content["rejected"]] == ["invalid"]
+
+def test_scans_reach_a_verdict(api):
+  api("POST", "/scans", {"urls": ["https://example.com"]})
+
+  deadline = time.monotonic() + 10
+  while time.monotonic() < deadline:
+    _, verdict = api("GET", "/verdicts?url=https://example.com")
+    if verdict["status"] == "completed":
+      break
+    time.sleep(0.05)
+
+  assert verdict["status"] == "completed"
+  assert set(verdict["engines"]) == {"HybridAnalysis", "RecordedFuture"}
+  assert "ha_bfore_ai" in verdict["engines"]["HybridAnalysis"]["results"]
+
+def test_submission_without_a_scan_id_is_an_error(service):
+  service._tracked["HybridAnalysis", "https://example.com"] = None
+  answer = Future()
+  answer.set_result({"message": "accepted"})
+
+  service._submitted("HybridAnalysis", "https://example.com", answer)
+
+  verdict = service.verdict("https://example.com")["engines"]["HybridAnalysis"]
+  assert verdict["state"] == "error"
+  assert ("HybridAnalysis", "https://example.com") not in service._tracked
+
+def test_scans_without_a_verdict_fail_after_max_attempts(api, service, monkeypatch):
+  monkeypatch.setitem(registry.get("HybridAnalysis").poll_profile, "max_attempts", 3)
+  checks = []
+  monkeypatch.setattr(service.scanners["HybridAnalysis"], "retrieve_scan_statuses",
+                      lambda scan_ids: checks.append(scan_ids) or {})
+
+  api("POST", "/scans", {"urls": ["https://example.com"], "engines": ["HybridAnalysis"]})
+
+  deadline = time.monotonic() + 10
+  while time.monotonic() < deadline:
+    _, verdict = api("GET", "/verdicts?url=https://Example.com/")
+    if verdict["status"] == "error":
+      break
+    time.sleep(0.05)
+
+  assert verdict["url"] == "https://Example.com/"
+  assert verdict["engines"]["HybridAnalysis"] == {"state": "error", "detail": "No verdict after 3 status checks"}
+  assert len(checks) == 3
@@ -0,0 +1,130 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import csv
+import json
+import os
+import socket
+import subprocess
+import sys
+from functools import partial
+from pathlib import Path
+import pytest
+from src.scanners.hybrid_analysis import HybridAnalysisScanner
+from src.scanners.recorded_future import RecordedFutureScanner
+from src.utils.file_handlers import ResultsFileHandler
+from src.utils.sharded_runner import ShardedBatchRunner
+
+class Analyzer:
+  """Stands in for AddressAnalyzer in the shard processes, pointed at the mock API"""
+
+  def __init__(self, base_url, rate_scale=1.0):
+    self.scanners = {
+      "HybridAnalysis": HybridAnalysisScanner("key", f"{base_url}/ha"),
+      "RecordedFuture": RecordedFutureScanner("key", f"{base_url}/rf")
+    }
+    self.cache = None
+
+def finished_shards(runner, done=True):
+  """Writes the work directory of a sharded run whose shards each found two URLs and rejected one"""
+  for index in range(runner.shards):
+    shard_dir = runner.shard_dir(index)
+    shard_dir.mkdir(parents=True)
+    with open(shard_dir / "scan_results.jsonl", "w", encoding="utf-8") as file:
+      for number in range(2):
+        file.write(json.dumps({"url": f"https://{index}-{number}.com", "generated_at": 1700000000, "ha_bfore_ai": "clean"}) + "\n")
+    (shard_dir / "rejected_urls.csv").write_text(f"url,reason\nftp://{index}.com,scheme\n", encoding="utf-8")
+    if done:
+      (shard_dir / "done").touch()
+
+def merged_urls(output_format):
+  if output_format == "jsonl":
+    with open("scan_results.jsonl", "r", encoding="utf-8") as file:
+      return sorted(json.loads(line)["url"] for line in file)
+
+  urls = []
+  for segment in ResultsFileHandler("scan_results.csv").segments():
+    with open(segment, newline="", encoding="utf-8") as file:
+      urls.extend(row["url"] for row in csv.DictReader(file))
+  return sorted(urls)
+
+def test_merge_combines_every_shard(workdir, read_results):
+  runner = ShardedBatchRunner(None, 3, work_dir="shards")
+  finished_shards(runner)
+
+  runner.merge()
+
+  assert sorted(read_results()) == [f"https://{index}-{number}.com" for index in range(3) for number in range(2)]
+  assert (workdir / "rejected_urls.csv").read_text(encoding="utf-8").splitlines() == \
+    ["url,reason", "ftp://0.com,scheme", "ftp://1.com,scheme", "ftp://2.com,scheme"]
+  assert not runner.work_dir.exists()
+
+def test_merge_waits_for_every_shard(workdir):
+  runner = ShardedBatchRunner(None, 2, work_dir="shards")
+  finished_shards(runner)
+  (runner.shard_dir(1) / "done").unlink()
+
+  runner.merge()
+
+  assert not (workdir / "scan_results.csv").exists()
+  assert not (runner.work_dir / "merge.lock").exists()
+
+@pytest.mark.parametrize("output_format, crashing_move", [("jsonl", "scan_results.jsonl"), ("csv", "rejected_urls.csv")])
+def test_an_interrupted_merge_is_finished_by_the_next_one(workdir, monkeypatch, output_format, crashing_move):
+  (workdir / "rejected_urls.csv").write_text("url,reason\nftp://old.com,scheme\n", encoding="utf-8")
+  runner = ShardedBatchRunner(None, 2, work_dir="shards", output_format=output_format)
+  finished_shards(runner)
+  replace = os.replace
+
+  def crash(source, target):
+    if Path(target).name == crashing_move:
+      raise OSError("killed")
+    replace(source, target)
+
+  monkeypatch.setattr(os, "replace", crash)
+  with pytest.raises(OSError):
+    runner.merge()
+  monkeypatch.setattr(os, "replace", replace)
+  runner.merge()
+
+  assert merged_urls(output_format) == ["https://0-0.com", "https://0-1.com", "https://1-0.com", "https://1-1.com"]
+  assert (workdir / "rejected_urls.csv").read_text(encoding="utf-8").splitlines() == \
+    ["url,reason", "ftp://old.com,scheme", "ftp://0.com,scheme", "ftp://1.com,scheme"]
+  assert not runner.work_dir.exists()
+
+def test_the_lock_of_a_merge_that_died_is_taken_over(workdir, read_results):
+  runner = ShardedBatchRunner(None, 2, work_dir="shards")
+  finished_shards(runner)
+  dead = subprocess.Popen([sys.executable, "-c", ""])
+  dead.wait()
+  (runner.work_dir / "merge.lock").write_text(f"{socket.gethostname()} {dead.pid}\n", encoding="utf-8")
+
+  runner.merge()
+
+  assert len(read_results()) == 4
+
+@pytest.mark.parametrize("host", [None, "other-host"])
+def test_a_held_lock_is_respected(workdir, host):
+  runner = ShardedBatchRunner(None, 2, work_dir="shards")
+  finished_shards(runner)
+  (runner.work_dir / "merge.lock").write_text(f"{host or socket.gethostname()} {os.getpid()}\n", encoding="utf-8")
+
+  runner.merge()
+
+  assert not (workdir / "scan_results.csv").exists()
+  assert (runner.work_dir / "merge.lock").exists()
+
+def test_sharded_run(mock_api, fast_polls, read_results, workdir):
+  base_url, _ = mock_api
+  urls = [f"https://{index}.com" for index in range(6)]
+  (workdir / "urls.txt").write_text("\n".join(urls), encoding="utf-8")
+
+  ShardedBatchRunner(partial(Analyzer, base_url), 3, work_dir="shards").run("urls.txt")
+
+  results = read_results()
+  assert sorted(results) == urls
+  assert all(row["rf_static1"] == "reported" for row in results.values())
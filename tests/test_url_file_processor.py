@@ -0,0 +1,200 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import threading
+from collections import Counter
+import pytest
+from src.core.engines import registry
+from src.core.exceptions import APIError
+from src.utils.async_url_file_processor import AsyncURLFileProcessor
+from src.utils.url_file_processor import URLFileProcessor
+
+PROCESSORS = [URLFileProcessor, AsyncURLFileProcessor]
+
+@pytest.fixture(params=PROCESSORS, ids=["sync", "async"])
+def processor_class(request):
+  if request.param is AsyncURLFileProcessor:
+    pytest.importorskip("aiohttp")
+  return request.param
+
+@pytest.fixture
+def urls(workdir):
+  (workdir / "urls.txt").write_text("https://a.com\nhttps://b.com\n", encoding="utf-8")
+  return "urls.txt"
+
+@pytest.fixture
+def outstanding(scanners, monkeypatch):
+  """Counts each engine's scans between submission and verdict (or failure), returning (alive, peak)"""
+  alive, peak = Counter(), Counter()
+  lock = threading.Lock()
+
+  def started(engine):
+    with lock:
+      alive[engine] += 1
+      peak[engine] = max(peak[engine], alive[engine])
+
+  def ended(engine):
+    with lock:
+      alive[engine] -= 1
+
+  for engine, scanner in scanners.items():
+    def scan_url(url, validate=True, engine=engine, submit=scanner.scan_url):
+      started(engine)
+      return submit(url, validate)
+
+    async def async_scan_url(client, url, validate=True, engine=engine, submit=scanner.async_scan_url):
+      started(engine)
+      return await submit(client, url, validate)
+
+    monkeypatch.setattr(scanner, "scan_url", scan_url)
+    monkeypatch.setattr(scanner, "async_scan_url", async_scan_url)
+
+  scan_finished, fail_scan = URLFileProcessor._scan_finished, URLFileProcessor._fail_scan
+
+  def finished(self, url, engine=None, scan_id=None):
+    if engine:
+      ended(engine)
+    scan_finished(self, url, engine, scan_id)
+
+  def failed(self, engine, url, scan_id, detail):
+    ended(engine)
+    fail_scan(self, engine, url, scan_id, detail)
+
+  monkeypatch.setattr(URLFileProcessor, "_scan_finished", finished)
+  monkeypatch.setattr(URLFileProcessor, "_fail_scan", failed)
+  monkeypatch.setattr(URLFileProcessor, "_engine_max_outstanding", lambda self, engine: 2)
+  return alive, peak
+
+def answer_submissions(scanner, monkeypatch, result):
+  """Makes every submission of the scanner return result, in both pipelines"""
+  async def async_scan_url(client, url, validate=True):
+    return dict(result)
+
+  monkeypatch.setattr(scanner, "scan_url", lambda url, validate=True: dict(result))
+  monkeypatch.setattr(scanner, "async_scan_url", async_scan_url)
+
+def count_status_checks(scanner, monkeypatch, answer=None):
+  """Makes the scanner's status checks return answer (or nothing), returning the list of checked batches"""
+  checks = []
+
+  def retrieve(scan_ids):
+    checks.append(list(scan_ids))
+    return dict(answer or {})
+
+  async def async_retrieve(client, scan_ids):
+    return retrieve(scan_ids)
+
+  monkeypatch.setattr(scanner, "retrieve_scan_statuses", retrieve)
+  monkeypatch.setattr(scanner, "async_retrieve_scan_statuses", async_retrieve)
+  return checks
+
+def test_submissions_without_a_scan_id_fail_instead_of_being_polled(scanners, mock_api, urls, fast_polls,
+                                                                     read_results, processor_class, monkeypatch):
+  answer_submissions(scanners["HybridAnalysis"], monkeypatch, {"finished": False})
+  checks = count_status_checks(scanners["HybridAnalysis"], monkeypatch)
+
+  processor_class(scanners).process_file(urls)
+
+  results = read_results()
+  assert sorted(results) == ["https://a.com", "https://b.com"]
+  assert not any(column.startswith("ha_") for column in results["https://a.com"])
+  assert results["https://a.com"]["rf_static1"] == "reported"
+  assert checks == []
+
+def test_scans_without_a_verdict_fail_after_max_attempts(scanners, mock_api, urls, fast_polls, read_results,
+                                                         processor_class, monkeypatch):
+  monkeypatch.setitem(registry.get("HybridAnalysis").poll_profile, "max_attempts", 3)
+  checks = count_status_checks(scanners["HybridAnalysis"], monkeypatch)
+
+  processor_class(scanners).process_file(urls)
+
+  # Both scans are checked together until they give up after three checks each
+  assert sum(len(batch) for batch in checks) == 6
+  assert not any(column.startswith("ha_") for column in read_results()["https://b.com"])
+  assert read_results()["https://b.com"]["rf_static1"] == "reported"
+
+def test_submissions_that_come_back_finished_are_not_fetched_again(scanners, mock_api, urls, fast_polls, read_results,
+                                                                    processor_class, monkeypatch):
+  scanner = scanners["HybridAnalysis"]
+  answer_submissions(scanner, monkeypatch, {"id": "1", "finished": True, "scanners_v2": {"bfore_ai": {"status": "clean"}}})
+  checks = count_status_checks(scanner, monkeypatch)
+  monkeypatch.setattr(scanner, "retrieve_scan_results", lambda scan_id: pytest.fail("finished scan fetched again"))
+
+  processor_class(scanners).process_file(urls)
+
+  assert read_results()["https://a.com"]["ha_bfore_ai"] == "clean"
+  assert checks == []
+
+def test_unreadable_results_fail_the_scan_and_keep_the_other_engines(scanners, mock_api, urls, fast_polls,
+                                                                      read_results, processor_class, monkeypatch):
+  scan_data = URLFileProcessor._scan_data
+
+  def unreadable(self, engine, result, scan_id):
+    if engine == "HybridAnalysis":
+      raise KeyError("scanners_v2")
+    return scan_data(self, engine, result, scan_id)
+
+  monkeypatch.setattr(URLFileProcessor, "_scan_data", unreadable)
+
+  processor_class(scanners).process_file(urls)
+
+  results = read_results()
+  assert sorted(results) == ["https://a.com", "https://b.com"]
+  assert all(row["rf_static1"] == "reported" for row in results.values())
+  assert not any(column.startswith("ha_") for column in results["https://a.com"])
+
+def test_each_engine_keeps_at_most_max_outstanding_scans_alive(scanners, mock_api, fast_polls, read_results,
+                                                               processor_class, outstanding, workdir):
+  alive, peak = outstanding
+  urls = [f"https://{index}.com" for index in range(8)]
+  (workdir / "urls.txt").write_text("\n".join(urls), encoding="utf-8")
+
+  processor = processor_class(scanners)
+  processor.process_file("urls.txt")
+
+  assert sorted(read_results()) == urls
+  assert peak == {"HybridAnalysis": 2, "RecordedFuture": 2}
+  assert not any(alive.values())
+  assert not any(processor._engine_load.values())
+
+def test_failed_scans_free_their_slot(scanners, mock_api, fast_polls, read_results, processor_class, outstanding,
+                                      workdir, monkeypatch):
+  alive, peak = outstanding
+  urls = [f"https://{index}.com" for index in range(8)]
+  (workdir / "urls.txt").write_text("\n".join(urls), encoding="utf-8")
+  # Half of the submissions are refused and the other half never get a verdict
+  scanner = scanners["HybridAnalysis"]
+  scan_url, async_scan_url = scanner.scan_url, scanner.async_scan_url
+
+  def refuse(url):
+    if int(url[8:-4]) % 2:
+      raise APIError("Bad Request", 400)
+
+  def flaky_scan_url(url, validate=True):
+    result = scan_url(url, validate)
+    refuse(url)
+    return result
+
+  async def flaky_async_scan_url(client, url, validate=True):
+    result = await async_scan_url(client, url, validate)
+    refuse(url)
+    return result
+
+  monkeypatch.setattr(scanner, "scan_url", flaky_scan_url)
+  monkeypatch.setattr(scanner, "async_scan_url", flaky_async_scan_url)
+  monkeypatch.setitem(registry.get("HybridAnalysis").poll_profile, "max_attempts", 2)
+  count_status_checks(scanner, monkeypatch)
+
+  processor = processor_class(scanners)
+  processor.process_file("urls.txt")
+
+  results = read_results()
+  assert sorted(results) == urls
+  assert not any(column.startswith("ha_") for row in results.values() for column in row)
+  assert peak["HybridAnalysis"] == 2
+  assert not any(alive.values())
+  assert not any(processor._engine_load.values())
@@ -0,0 +1,57 @@
+# =========================================
+# Address Analyzing Terminal Tool
+# By Cesar Augusto Rodriguez Lara
+# https://github.com/MrCesar107
+# GNU GPL3 License
+# =========================================
+
+import pytest
+from src.core.exceptions import ConfigurationError
+from src.utils.url_file_processor import URLFileProcessor
+from src.utils.url_grouper import URLGrouper
+
+URLS = ["https://www.example.com/a", "https://www.example.com/b", "https://mail.example.com/", "https://www.example.com/c"]
+
+def leaders(grouper):
+  return [grouper.representative(url) for url in URLS]
+
+def test_all_scans_every_url():
+  assert leaders(URLGrouper("all", key="host")) == [None] * 4
+
+def test_one_per_host():
+  assert leaders(URLGrouper("one", key="host")) == [None, URLS[0], None, URLS[0]]
+
+def test_one_per_registrable_domain():
+  assert leaders(URLGrouper("one", key="domain")) == [None, URLS[0], URLS[0], URLS[0]]
+
+def test_k_per_group_follow_the_first_representative():
+  assert leaders(URLGrouper("k", per_group=2, key="host")) == [None, None, None, URLS[0]]
+
+@pytest.mark.parametrize("options", [{"policy": "some"}, {"policy": "one", "key": "path"}])
+def test_unknown_policies_and_keys_are_rejected(options):
+  with pytest.raises(ConfigurationError):
+    URLGrouper(**options)
+
+def test_followers_get_their_representatives_results(scanners, mock_api, fast_polls, read_results, workdir):
+  _, state = mock_api
+  (workdir / "urls.txt").write_text("\n".join(URLS), encoding="utf-8")
+
+  URLFileProcessor(scanners, grouper=URLGrouper("one", key="host")).process_file("urls.txt")
+
+  results = read_results()
+  assert sorted(results) == sorted(URLS)
+  assert state.stats()["calls"]["ha_submit"] == 2
+  for follower in (URLS[1], URLS[3]):
+    assert {column: value for column, value in results[follower].items() if column not in ("url", "generated_at")} == \
+      {column: value for column, value in results[URLS[0]].items() if column not in ("url", "generated_at")}
+
+def test_followers_of_a_failed_representative_are_skipped(scanners, mock_api, fast_polls, read_results, workdir,
+                                                          monkeypatch, caplog):
+  for scanner in scanners.values():
+    monkeypatch.setattr(scanner, "scan_url", lambda url, validate=True: {})
+  (workdir / "urls.txt").write_text("\n".join(URLS[:2]), encoding="utf-8")
+
+  URLFileProcessor(scanners, grouper=URLGrouper("one", key="host")).process_file("urls.txt")
+
+  assert read_results() == {}
+  assert "1 grouped URLs have no results" in caplog.text